@@ -0,0 +1,169 @@
+"""
+Headless runs in bulk, for balancing: every level played with every seed under every
+combination of the --set overrides of NPC_SETTINGS and WEAPON_SETTINGS, spread over a
+process pool. Workers send back one row of numbers per run as it finishes, the rows are
+gathered into columns and saved as an .npz, with a summary per overrides and level.
+
+    python -m batch [--levels 0 1] [--seeds 10] [--ticks 36000] [--workers 4]
+                    [--set NPC_SETTINGS.RAT_0.damage=2,5 ...] [--out results.npz]
+
+Overrides name a settings dict, an ID and a key, then the values to try, comma separated.
+"""
+import argparse
+import ast
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+import level_compiler
+from headless import run_simulation
+from settings import ID, NPC_SETTINGS, WEAPON_SETTINGS
+
+SETTINGS = {'NPC_SETTINGS': NPC_SETTINGS, 'WEAPON_SETTINGS': WEAPON_SETTINGS}
+# the row a worker sends back for each run, and the dtype of its column
+COLUMNS = {
+    'config': 'int32',
+    'level': 'int32',
+    'seed': 'int64',
+    'ticks': 'int32',
+    'is_cleared': 'bool',
+    'is_dead': 'bool',
+    'time_to_clear': 'float64',
+    'damage_taken': 'int32',
+    'shots_fired': 'int32',
+    'kills': 'int32',
+    'npcs': 'int32',
+    'ticks_per_sec': 'float64',
+}
+
+
+def parse_override(text):
+    # 'NPC_SETTINGS.RAT_0.damage=2,5' -> (('NPC_SETTINGS', 'RAT_0', 'damage'), [2, 5])
+    name, _, values = text.partition('=')
+    try:
+        table, id_name, key = name.split('.')
+    except ValueError:
+        raise ValueError(f'{text}: expected TABLE.ID.key=value[,value...]') from None
+    if table not in SETTINGS:
+        raise ValueError(f'{text}: {table} is not one of {", ".join(SETTINGS)}')
+    if id_name not in ID.__members__ or ID[id_name] not in SETTINGS[table]:
+        raise ValueError(f'{text}: {table} has no entry {id_name}')
+    if key not in SETTINGS[table][ID[id_name]]:
+        raise ValueError(f'{text}: {table}[{id_name}] has no key {key}')
+    try:
+        values = [ast.literal_eval(value) for value in values.split(',')]
+    except (ValueError, SyntaxError):
+        raise ValueError(f'{text}: values must be python literals') from None
+    return (table, id_name, key), values
+
+
+def get_configs(overrides):
+    # every combination of the override values, as {(table, id name, key): value}
+    names = [name for name, _ in overrides]
+    return [dict(zip(names, values)) for values in itertools.product(*(v for _, v in overrides))]
+
+
+def apply_config(config):
+    # set the overrides in this process, returning what they replaced
+    previous = {}
+    for (table, id_name, key), value in config.items():
+        settings = SETTINGS[table][ID[id_name]]
+        previous[table, id_name, key] = settings[key]
+        settings[key] = value
+    return previous
+
+
+def run_job(job):
+    config_index, config, num_level, seed, max_ticks = job
+    previous = apply_config(config)
+    try:
+        result = run_simulation(num_level, max_ticks, seed)
+    finally:
+        apply_config(previous)
+    result['config'] = config_index
+    return tuple(result[name] for name in COLUMNS)
+
+
+def run_batch(jobs, num_workers, chunksize=1):
+    """
+    Runs the (config index, config, level, seed, max ticks) jobs over num_workers
+    processes, returning the results as columns, in the order the runs finished
+    """
+    # workers map the compiled levels rather than each parsing the tmx
+    for num_level in sorted({job[2] for job in jobs}):
+        tmx_file = f'level_{num_level}.tmx'
+        if level_compiler.load_compiled_level(tmx_file) is None:
+            level_compiler.compile_level(tmx_file)
+
+    columns = {name: np.empty(len(jobs), dtype=dtype) for name, dtype in COLUMNS.items()}
+    with mp.Pool(num_workers) as pool:
+        for i, row in enumerate(pool.imap_unordered(run_job, jobs, chunksize=chunksize)):
+            for column, value in zip(columns.values(), row):
+                column[i] = value
+    return columns
+
+
+def save_results(path, columns, configs):
+    # one array per column, and the overrides of every config index as json
+    config_json = [
+        json.dumps({'.'.join(name): value for name, value in config.items()})
+        for config in configs
+    ]
+    np.savez(path, **columns, configs=np.array(config_json))
+
+
+def print_summary(columns, configs):
+    print(f'{"config":>6} {"level":>5} {"runs":>5} {"cleared":>8} {"died":>5} '
+          f'{"clear s":>8} {"damage":>7} {"shots":>6} {"ticks/s":>8}')
+    for config_index, num_level in sorted(set(zip(columns['config'].tolist(),
+                                                  columns['level'].tolist()))):
+        rows = (columns['config'] == config_index) & (columns['level'] == num_level)
+        cleared = columns['is_cleared'][rows]
+        clear_time = columns['time_to_clear'][rows][cleared]
+        print(f'{config_index:>6} {num_level:>5} {rows.sum():>5} {cleared.mean():>8.0%} '
+              f'{columns["is_dead"][rows].mean():>5.0%} '
+              f'{clear_time.mean() if len(clear_time) else float("nan"):>8.1f} '
+              f'{columns["damage_taken"][rows].mean():>7.1f} '
+              f'{columns["shots_fired"][rows].mean():>6.1f} '
+              f'{columns["ticks_per_sec"][rows].mean():>8.0f}')
+    for config_index, config in enumerate(configs):
+        overrides = ', '.join(f'{".".join(name)}={value!r}' for name, value in config.items())
+        print(f'config {config_index}: {overrides or "defaults"}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--levels', type=int, nargs='+', default=(0, 1))
+    parser.add_argument('--seeds', type=int, default=10, help='runs per level and config')
+    parser.add_argument('--ticks', type=int, default=36000, help='most ticks per run')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--set', action='append', default=[], metavar='TABLE.ID.key=values',
+                        help='settings values to sweep, e.g. NPC_SETTINGS.RAT_0.damage=2,5')
+    parser.add_argument('--out', default='results.npz')
+    args = parser.parse_args()
+    try:
+        overrides = [parse_override(text) for text in args.set]
+    except ValueError as error:
+        parser.error(str(error))
+
+    configs = get_configs(overrides)
+    jobs = [
+        (config_index, config, num_level, seed, args.ticks)
+        for config_index, config in enumerate(configs)
+        for num_level in args.levels
+        for seed in range(args.seeds)
+    ]
+    start = time.perf_counter()
+    columns = run_batch(jobs, args.workers)
+    run_time = time.perf_counter() - start
+    save_results(args.out, columns, configs)
+
+    print_summary(columns, configs)
+    print(f'{len(jobs)} runs, {columns["ticks"].sum()} ticks in {run_time:.1f} s on '
+          f'{args.workers} workers -> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Scaling of batch.run_batch with the number of worker processes: the same headless runs
+of level_0 (one per seed, capped at --ticks) over 1, 2, 4 ... workers up to the cpu count,
+wall time against the single worker. Runs share nothing but the compiled level file, so
+the speedup should track the cores until they run out.
+
+    python -m benchmarks.batch_scaling [--runs 16] [--ticks 3000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import time
+from batch import run_batch
+
+
+def get_default_workers():
+    workers, num_cpus = [1], os.cpu_count() or 1
+    while workers[-1] * 2 <= num_cpus:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != num_cpus:
+        workers.append(num_cpus)
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=16)
+    parser.add_argument('--ticks', type=int, default=3000)
+    parser.add_argument('--level', type=int, default=0)
+    parser.add_argument('--workers', type=int, nargs='+', default=get_default_workers())
+    args = parser.parse_args()
+
+    jobs = [(0, {}, args.level, seed, args.ticks) for seed in range(args.runs)]
+    print(f'{args.runs} runs of level_{args.level}.tmx, {os.cpu_count()} cpus')
+    print(f'{"workers":>8} {"wall s":>7} {"runs/s":>7} {"ticks/s":>8} {"speedup":>8} '
+          f'{"efficiency":>11}')
+    base_time = None
+    for num_workers in args.workers:
+        start = time.perf_counter()
+        columns = run_batch(jobs, num_workers)
+        wall_time = time.perf_counter() - start
+        base_time = base_time or wall_time
+        speedup = base_time / wall_time
+        print(f'{num_workers:>8} {wall_time:>7.2f} {args.runs / wall_time:>7.2f} '
+              f'{columns["ticks"].sum() / wall_time:>8.0f} {speedup:>8.2f} '
+              f'{speedup / num_workers:>11.0%}')
+
+
+if __name__ == '__main__':
+    main()
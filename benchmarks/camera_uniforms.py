@@ -0,0 +1,98 @@
+"""
+Per-frame cost of getting the camera to the 3d programs: m_view written into every
+program, as ShaderProgram.update did, against one write of the Camera uniform block
+that every program reads, for a growing number of programs.
+
+    python -m benchmarks.camera_uniforms [--programs 3 10 30] [--frames 2000]
+"""
+import argparse
+import time
+import glm
+from benchmarks.offscreen import create_context
+from shader_program import CameraBlock
+
+VERTEX_SHADER = '''
+#version 330 core
+layout (location = 0) in vec3 in_position;
+%s
+void main() {
+    gl_Position = %s * vec4(in_position, 1.0);
+}
+'''
+FRAGMENT_SHADER = '''
+#version 330 core
+out vec4 frag_color;
+void main() {
+    frag_color = vec4(1.0);
+}
+'''
+CAMERA_BLOCK = '''
+layout (std140) uniform Camera {
+    mat4 m_proj;
+    mat4 m_view;
+    mat4 m_view_proj;
+    vec3 cam_pos;
+    float time;
+};
+'''
+
+
+def make_camera(frame):
+    camera = glm.vec3(frame * 0.01, 0.5, 0)
+    return type('Camera', (), dict(
+        position=camera,
+        view_position=camera,
+        m_proj=glm.perspective(1.0, 1.6, 0.01, 2000),
+        m_view=glm.lookAt(camera, camera + glm.vec3(0, 0, 1), glm.vec3(0, 1, 0)),
+    ))
+
+
+def time_frames(update, frames):
+    for frame in range(frames // 10):
+        update(make_camera(frame))
+    start = time.perf_counter()
+    for frame in range(frames):
+        update(make_camera(frame))
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--programs', type=int, nargs='+', default=(3, 10, 30))
+    parser.add_argument('--frames', type=int, default=2000)
+    args = parser.parse_args()
+
+    ctx = create_context()
+    camera_block = CameraBlock(ctx)
+    baseline = time_frames(lambda camera: None, args.frames)
+
+    print(f'{"programs":>9} {"per program us":>15} {"camera block us":>16}')
+    for num_programs in args.programs:
+        programs = [
+            ctx.program(
+                vertex_shader=VERTEX_SHADER % ('uniform mat4 m_proj, m_view;', 'm_proj * m_view'),
+                fragment_shader=FRAGMENT_SHADER
+            )
+            for _ in range(num_programs)
+        ]
+        block_programs = [
+            ctx.program(
+                vertex_shader=VERTEX_SHADER % (CAMERA_BLOCK, 'm_view_proj'),
+                fragment_shader=FRAGMENT_SHADER
+            )
+            for _ in range(num_programs)
+        ]
+        for program in block_programs:
+            camera_block.bind(program)
+
+        def write_per_program(camera):
+            for program in programs:
+                program['m_view'].write(camera.m_view)
+
+        per_program = time_frames(write_per_program, args.frames) - baseline
+        block = time_frames(lambda camera: camera_block.update(camera, 0.0), args.frames) - baseline
+        print(f'{num_programs:>9} {per_program * 1e6:>15.2f} {block * 1e6:>16.2f}')
+
+
+if __name__ == '__main__':
+    main()
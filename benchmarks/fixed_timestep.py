@@ -0,0 +1,124 @@
+"""
+Frame rate independence of the simulation: the first level played for the same game time
+at several frame rates, with jittered frame times on a virtual clock, through the old loop
+(one update per frame stepping by the frame time, the 10 ms animation and 750 ms sound
+timers, hit chances rolled per frame) and through Game's fixed-timestep loop (TICK_RATE
+ticks, renders interpolated in between). Every npc has spotted the player, who stands
+still and cannot die. Each run is compared with the fixed loop at exactly 60 fps: how far
+the npcs ended up from where they are there, and the damage the player took.
+
+Runs the engine on an offscreen context, see benchmarks.offscreen.
+
+    python -m benchmarks.fixed_timestep [--fps 15 30 60 144] [--seconds 10] [--jitter 0.2]
+"""
+import argparse
+import random
+import time
+import numpy as np
+from benchmarks.offscreen import App, create_context, create_framebuffer, init_pygame
+from settings import TICK_RATE, MAX_TICKS_PER_FRAME, SOUND_PULSE, PLAYER_INIT_HEALTH
+
+HEALTH = 10 ** 9
+
+
+def make_engine(ctx, fbo, seed):
+    from engine import Engine
+    random.seed(seed)
+    app = App(ctx, fbo)
+    eng = app.engine = Engine(app)
+    for npc in eng.level_map.npc_list:
+        npc.is_player_spotted = True
+    eng.player.health = HEALTH
+    return app, eng
+
+
+def render(app, eng, alpha=1.0):
+    app.fbo.use()
+    app.ctx.clear(0.1, 0.1, 0.1)
+    eng.render(alpha)
+
+
+def run_variable(app, eng, frame_times):
+    # the old Game.run: the timers fire on their own clock, the events land in the next frame
+    elapsed = anim_time = sound_time = 0.0
+    for frame_time in frame_times:
+        elapsed += frame_time
+        app.anim_trigger = elapsed - anim_time >= 10
+        if app.anim_trigger:
+            anim_time = elapsed - (elapsed - anim_time) % 10
+        app.sound_trigger = elapsed - sound_time >= SOUND_PULSE
+        if app.sound_trigger:
+            sound_time = elapsed - (elapsed - sound_time) % SOUND_PULSE
+        eng.update()
+        app.delta_time = frame_time
+        render(app, eng)
+    return len(frame_times)
+
+
+def run_fixed(app, eng, frame_times, num_ticks):
+    # Game.update, stopping after num_ticks ticks
+    tick_time = app.tick_time
+    accumulator = 0.0
+    for frame_time in frame_times:
+        accumulator = min(accumulator + frame_time, MAX_TICKS_PER_FRAME * tick_time)
+        while accumulator >= tick_time and app.num_ticks < num_ticks:
+            app.step(eng)
+            accumulator -= tick_time
+        render(app, eng, accumulator / tick_time)
+    return app.num_ticks
+
+
+def get_frame_times(fps, seconds, jitter, rng):
+    frame_times = []
+    while sum(frame_times) < seconds * 1000:
+        frame_times.append(1000 / fps * (1 + rng.uniform(-jitter, jitter)))
+    return frame_times
+
+
+def get_state(eng):
+    positions = np.array([tuple(npc.pos) for npc in eng.level_map.npc_list], dtype='float64')
+    return positions, HEALTH - eng.player.health
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fps', type=float, nargs='+', default=(15, 30, 60, 144))
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--jitter', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    init_pygame()
+    ctx = create_context()
+    fbo = create_framebuffer(ctx)
+    num_ticks = int(args.seconds * TICK_RATE)
+
+    app, eng = make_engine(ctx, fbo, args.seed)
+    run_fixed(app, eng, [1000 / 60] * (int(args.seconds * 60) + 1), num_ticks)
+    ref_positions, ref_damage = get_state(eng)
+    print(f'{args.seconds:.0f} s of game time, tick rate {TICK_RATE} Hz, '
+          f'{len(ref_positions)} npcs, reference damage {ref_damage} '
+          f'({ref_damage / PLAYER_INIT_HEALTH:.1f} lives)')
+
+    print(f'{"loop":>9} {"fps":>5} {"frames":>7} {"updates":>8} {"npc drift max":>14} '
+          f'{"damage":>7} {"ms/frame":>9}')
+    for fps in args.fps:
+        frame_times = get_frame_times(fps, args.seconds, args.jitter, random.Random(args.seed))
+        for name in ('variable', 'fixed'):
+            app, eng = make_engine(ctx, fbo, args.seed)
+            start = time.perf_counter()
+            if name == 'variable':
+                num_updates = run_variable(app, eng, frame_times)
+            else:
+                # frames the clamp to MAX_TICKS_PER_FRAME dropped time from are made up for
+                padding = [1000 / fps] * int(fps)
+                num_updates = run_fixed(app, eng, frame_times + padding, num_ticks)
+            frame_time = (time.perf_counter() - start) / len(frame_times)
+            positions, damage = get_state(eng)
+            drift = np.max(np.linalg.norm(positions - ref_positions, axis=1))
+            print(f'{name:>9} {fps:>5.0f} {len(frame_times):>7} {num_updates:>8} '
+                  f'{drift:>14.3f} {damage:>7} {frame_time * 1e3:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Button input over a FakeGPIO: pin reads per frame of the old per-event polling in
+Player.handle_events against GPIOInput's edge callbacks as the event count per frame
+grows (mouse motion floods the queue), and the press and release events GPIOInput posts
+for bouncing clicks and for taps shorter than the bounce time, against the true count.
+
+    python -m benchmarks.gpio_input [--events 1 10 50 200] [--clicks 10] [--taps 5]
+"""
+import argparse
+import os
+import time
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame as pg
+from fake_gpio import FakeGPIO
+from gpio_input import GPIOInput
+
+SHOOT_PIN, DOOR_PIN, TOGGLE_PIN, FORWARD_PIN, BACKWARD_PIN = 15, 14, 27, 17, 4
+PINS = SHOOT_PIN, DOOR_PIN, TOGGLE_PIN, FORWARD_PIN, BACKWARD_PIN
+PRESS_EVENT, RELEASE_EVENT = pg.USEREVENT + 2, pg.USEREVENT + 3
+BOUNCE_TIME = 100  # ms
+
+
+def poll_frame(gpio, num_events, state):
+    # the reads of the old Player.handle_events for every event, then keyboard_control
+    for _ in range(num_events):
+        gpio.input(DOOR_PIN)
+        if gpio.input(TOGGLE_PIN) != state['toggle']:
+            gpio.input(TOGGLE_PIN)
+            state['toggle'] = gpio.input(TOGGLE_PIN)
+        if gpio.input(SHOOT_PIN) != state['shot']:
+            gpio.input(SHOOT_PIN)
+            state['shot'] = gpio.input(SHOOT_PIN)
+    gpio.input(FORWARD_PIN)
+    gpio.input(BACKWARD_PIN)
+
+
+def event_frame(gpio_input, num_events):
+    gpio_input.update()
+    for _ in range(num_events):
+        gpio_input.is_pressed(DOOR_PIN)
+    gpio_input.is_pressed(FORWARD_PIN)
+    gpio_input.is_pressed(BACKWARD_PIN)
+
+
+def make_input():
+    gpio = FakeGPIO()
+    gpio_input = GPIOInput(gpio, PINS, PRESS_EVENT, RELEASE_EVENT, bounce_time=BOUNCE_TIME)
+    gpio_input.start()
+    return gpio, gpio_input
+
+
+def count_events():
+    counts = {PRESS_EVENT: 0, RELEASE_EVENT: 0}
+    for event in pg.event.get((PRESS_EVENT, RELEASE_EVENT)):
+        counts[event.type] += 1
+    return counts[PRESS_EVENT], counts[RELEASE_EVENT]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, nargs='+', default=(1, 10, 50, 200))
+    parser.add_argument('--clicks', type=int, default=10)
+    parser.add_argument('--taps', type=int, default=5)
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+    pg.display.init()
+
+    print(f'{"events/frame":>12} {"poll reads":>11} {"poll us":>8} '
+          f'{"edge reads":>11} {"edge us":>8}')
+    for num_events in args.events:
+        gpio, gpio_input = make_input()
+        # the shoot button held down through the frames
+        gpio.press(SHOOT_PIN)
+        state = {'toggle': 1, 'shot': 1}
+        results = []
+        for frame in (lambda: poll_frame(gpio, num_events, state),
+                      lambda: event_frame(gpio_input, num_events)):
+            num_reads = gpio.num_reads
+            start = time.perf_counter()
+            for _ in range(args.frames):
+                frame()
+            results.append(((gpio.num_reads - num_reads) / args.frames,
+                            (time.perf_counter() - start) / args.frames))
+        (poll_reads, poll_time), (edge_reads, edge_time) = results
+        print(f'{num_events:>12} {poll_reads:>11.1f} {poll_time * 1e6:>8.1f} '
+              f'{edge_reads:>11.1f} {edge_time * 1e6:>8.1f}')
+        gpio_input.stop()
+    pg.event.clear()
+
+    # clicks chatter 3 times on press and release, taps release within the bounce time
+    gpio, gpio_input = make_input()
+    for _ in range(args.clicks):
+        gpio.press(SHOOT_PIN, bounces=3)
+        time.sleep(1.5 * BOUNCE_TIME / 1000)
+        gpio.release(SHOOT_PIN, bounces=3)
+        time.sleep(1.5 * BOUNCE_TIME / 1000)
+    for _ in range(args.taps):
+        gpio.press(SHOOT_PIN, bounces=2)
+        time.sleep(0.3 * BOUNCE_TIME / 1000)
+        gpio.release(SHOOT_PIN)
+        time.sleep(1.5 * BOUNCE_TIME / 1000)
+    presses, releases = count_events()
+    print(f'\n{args.clicks} clicks and {args.taps} taps: {gpio_input.num_edges} edges reported '
+          f'by the driver, {presses} press and {releases} release events posted')
+    gpio_input.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+I2C cost of the imu over a FakeSMBus that takes --latency seconds per transaction:
+transactions and time per accel + gyro sample of byte reads (as read_word used to do),
+one burst read and a FIFO drain; the time the game loop spends on the imu per frame,
+reading the MPU9250 on the frame as Player used to against reading the latest sample of
+an IMUService; and the rate the service thread achieves in each mode.
+
+    python -m benchmarks.imu [--rates 200 500 1000] [--latency 0.0002] [--seconds 2]
+"""
+import argparse
+import time
+from fake_smbus import FakeSMBus
+from imu_service import IMUService
+from mpu9250 import MPU9250
+
+FIFO_SAMPLES = 8
+
+
+def read_bytes(mpu):
+    # 12 single register reads of accel and gyro
+    for register in (*range(mpu.ACCEL_XOUT_H, mpu.ACCEL_XOUT_H + 6),
+                     *range(mpu.GYRO_XOUT_H, mpu.GYRO_XOUT_H + 6)):
+        mpu.num_transactions += 1
+        mpu.bus.read_byte_data(mpu.MPU9250_ADDR, register)
+    return 1
+
+
+def read_burst(mpu):
+    mpu.read_accel_gyro()
+    return 1
+
+
+def read_fifo(mpu):
+    return len(mpu.read_fifo(max_samples=FIFO_SAMPLES)[0])
+
+
+def time_reads(mpu, read, wait=0.0, num_reads=100):
+    # only the reads are timed, not the wait for samples to queue
+    num_transactions = mpu.num_transactions
+    num_samples, total_time = 0, 0.0
+    for _ in range(num_reads):
+        time.sleep(wait)
+        start = time.perf_counter()
+        num_samples += read(mpu)
+        total_time += time.perf_counter() - start
+    return (mpu.num_transactions - num_transactions) / num_samples, total_time / num_samples
+
+
+def time_frames(read, num_frames=200):
+    start = time.perf_counter()
+    for _ in range(num_frames):
+        read()
+    return (time.perf_counter() - start) / num_frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rates', type=int, nargs='+', default=(200, 500, 1000))
+    parser.add_argument('--latency', type=float, default=0.0002)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    mpu = MPU9250(bus=FakeSMBus(latency=args.latency))
+
+    print(f'{"read":>6} {"transactions/sample":>20} {"ms/sample":>10}')
+    mpu.enable_fifo(1000)
+    for name, read, wait in (('bytes', read_bytes, 0.0), ('burst', read_burst, 0.0),
+                             ('fifo', read_fifo, FIFO_SAMPLES / 1000)):
+        transactions, sample_time = time_reads(mpu, read, wait)
+        print(f'{name:>6} {transactions:>20.2f} {sample_time * 1e3:>10.3f}')
+    mpu.disable_fifo()
+
+    def read_blocking():
+        mpu.get_sensor_data()
+        mpu.get_sensor_data()
+
+    print(f'\nblocking reads in the frame: {time_frames(read_blocking) * 1e3:.3f} ms/frame')
+    print(f'{"mode":>6} {"rate Hz":>8} {"achieved Hz":>12} {"ms/frame":>9} {"overruns":>9}')
+    for use_fifo in (False, True):
+        for rate in args.rates:
+            imu = IMUService(
+                mpu, sample_rate=rate, use_fifo=use_fifo, fifo_samples=FIFO_SAMPLES
+            )
+            imu.start()
+            time.sleep(args.seconds)
+            frame_time = time_frames(lambda: (imu.get_orientation(), imu.get_orientation()))
+            imu.stop()
+            print(f'{"fifo" if use_fifo else "burst":>6} {rate:>8} '
+                  f'{imu.get_sample_rate():>12.1f} {frame_time * 1e3:>9.4f} '
+                  f'{imu.num_overruns:>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Drift and latency of the imu orientation on synthetic traces fed through a FakeSMBus into
+IMUService: 'rest' holds the sensor still at a tilt with a biased, noisy gyro, 'turns'
+swings it in yaw and roll. Each fusion filter, with and without the magnetometer, is
+compared with the old pipeline (accel tilt, gyro z integrated into yaw, then Player's
+per-frame dead zone and smoothing at 60 fps). Drift is the error at the end of the trace,
+lag the shift of the estimate that best matches the true yaw and roll.
+
+A trace recorded on the Pi with IMUService.save_samples, the sensor at rest, is replayed
+with --trace and reports how far each estimate wanders from where calibration left it.
+
+    python -m benchmarks.imu_fusion [--rate 500] [--seconds 30] [--trace rest.npz]
+"""
+import argparse
+import math
+import random
+import time
+import numpy as np
+from fake_smbus import FakeSMBus
+from imu_fusion import get_euler_angles
+from imu_service import IMUService
+from mpu9250 import MPU9250
+
+G = 9.80665
+# earth magnetic field, north along x and dipping down, in magnetometer lsb
+EARTH_MAG = (330 * math.cos(math.radians(60)), 0.0, -330 * math.sin(math.radians(60)))
+GYRO_BIAS = (0.5, -0.8, 1.2)  # deg/s
+GYRO_NOISE = 0.05  # deg/s
+ACCEL_NOISE = 0.05  # m/s^2
+CALIBRATION_TIME = 1.0  # s
+FRAME_RATE = 60
+
+
+def rotate_to_sensor(q, v):
+    # earth frame vector v in the sensor frame of orientation q
+    w, x, y, z = q
+    return (
+        (1 - 2 * (y * y + z * z)) * v[0] + 2 * (x * y + w * z) * v[1] + 2 * (x * z - w * y) * v[2],
+        2 * (x * y - w * z) * v[0] + (1 - 2 * (x * x + z * z)) * v[1] + 2 * (y * z + w * x) * v[2],
+        2 * (x * z + w * y) * v[0] + 2 * (y * z - w * x) * v[1] + (1 - 2 * (x * x + y * y)) * v[2],
+    )
+
+
+def rotate_by_rates(q, rates, dt):
+    # q turned by body rates (rad/s) for dt
+    angle = math.sqrt(sum(r * r for r in rates)) * dt
+    if angle == 0.0:
+        return q
+    s = math.sin(angle / 2) / (angle / dt)
+    b0, b1, b2, b3 = math.cos(angle / 2), rates[0] * s, rates[1] * s, rates[2] * s
+    w, x, y, z = q
+    return (
+        w * b0 - x * b1 - y * b2 - z * b3,
+        w * b1 + x * b0 + y * b3 - z * b2,
+        w * b2 - x * b3 + y * b0 + z * b1,
+        w * b3 + x * b2 - y * b1 + z * b0,
+    )
+
+
+def make_trace(kind, rate, seconds, rng):
+    # true orientations and the sensor readings they produce, as the fake bus takes them
+    dt = 1.0 / rate
+    q = (math.cos(math.radians(5)), math.sin(math.radians(5)), 0.0, 0.0)  # 10 deg roll
+    trace = []
+    for i in range(int(seconds * rate)):
+        t = i * dt - CALIBRATION_TIME
+        rates = (0.0, 0.0, 0.0)
+        if kind == 'turns' and t > 0:
+            rates = (
+                math.radians(40) * math.pi * math.cos(math.pi * t),
+                0.0,
+                math.radians(90) * 0.5 * math.pi * math.cos(0.5 * math.pi * t),
+            )
+        for _ in range(4):
+            q = rotate_by_rates(q, rates, dt / 4)
+        accel = [G * c + rng.gauss(0, ACCEL_NOISE) for c in rotate_to_sensor(q, (0, 0, 1))]
+        gyro = [
+            math.degrees(r) + b + rng.gauss(0, GYRO_NOISE) for r, b in zip(rates, GYRO_BIAS)
+        ]
+        mx, my, mz = rotate_to_sensor(q, EARTH_MAG)
+        # in the AK8963 axes
+        trace.append((q, accel, gyro, (my, mx, -mz)))
+    return trace
+
+
+def run_service(trace, rate, fusion, use_magnetometer):
+    bus = FakeSMBus()
+    imu = IMUService(
+        MPU9250(bus=bus), sample_rate=rate, fusion=fusion, use_magnetometer=use_magnetometer,
+        calibration_samples=int(CALIBRATION_TIME * rate)
+    )
+    estimates = []
+    start = time.perf_counter()
+    for q, accel, gyro, mag in trace:
+        bus.set_accel(*accel)
+        bus.set_gyro(*gyro)
+        bus.set_magnetometer(*mag)
+        imu.sample()
+        estimates.append(get_euler_angles(imu.get_quaternion()))
+    sample_time = (time.perf_counter() - start) / len(trace)
+    return np.degrees(estimates), sample_time
+
+
+def run_legacy(trace, rate):
+    # MPU9250.calculate_orientation per sample, Player's old smoothing per frame
+    bus = FakeSMBus()
+    mpu = MPU9250(bus=bus)
+    scale, alpha = 0.02, 0.25
+
+    def dead_zone(x):
+        return x * min(1, 1 / (1 + math.exp(-30 * (math.fabs(x) - 0.1))))
+
+    smoothed = [0.0, 0.0, 0.0]
+    frame_samples = rate // FRAME_RATE
+    estimates = []
+    start = time.perf_counter()
+    for i, (q, accel, gyro, mag) in enumerate(trace):
+        bus.set_accel(*accel)
+        bus.set_gyro(*gyro)
+        orientation = mpu.update_yaw(1.0 / rate)
+        if i % frame_samples == 0:
+            smoothed = [
+                prev + alpha * dead_zone(value * scale - prev)
+                for prev, value in zip(smoothed, orientation)
+            ]
+        estimates.append([value / scale for value in smoothed])
+    sample_time = (time.perf_counter() - start) / len(trace)
+    return np.array(estimates), sample_time
+
+
+def get_lag(truth, estimate, rate, max_lag=0.5):
+    # shift in ms of the estimate that best matches the truth
+    errors = [
+        np.mean(np.abs((truth[:len(truth) - shift] - estimate[shift:] + 180) % 360 - 180))
+        for shift in range(int(max_lag * rate))
+    ]
+    return int(np.argmin(errors)) * 1e3 / rate
+
+
+def get_pipelines(rate):
+    return {
+        'legacy': lambda trace: run_legacy(trace, rate),
+        'madgwick': lambda trace: run_service(trace, rate, 'madgwick', False),
+        'mahony': lambda trace: run_service(trace, rate, 'mahony', False),
+        'madgwick+mag': lambda trace: run_service(trace, rate, 'madgwick', True),
+        'mahony+mag': lambda trace: run_service(trace, rate, 'mahony', True),
+    }
+
+
+def run_synthetic(rate, seconds):
+    print(f'{"trace":>6} {"pipeline":>13} {"drift r/p/y deg":>22} {"rms deg":>8} '
+          f'{"lag ms":>7} {"us/sample":>10}')
+    for kind in ('rest', 'turns'):
+        trace = make_trace(kind, rate, seconds, random.Random(0))
+        truth = np.degrees([get_euler_angles(q) for q, *_ in trace])
+        settled = int(CALIBRATION_TIME * rate)
+        for name, run in get_pipelines(rate).items():
+            estimate, sample_time = run(trace)
+            error = (estimate - truth + 180) % 360 - 180
+            drift = '/'.join(f'{e:.1f}' for e in error[-1])
+            rms = np.sqrt(np.mean(error[settled:] ** 2))
+            lag = ''
+            if kind == 'turns':
+                # mean of the roll and yaw lags
+                lag = np.mean([
+                    get_lag(truth[settled:, axis], estimate[settled:, axis], rate)
+                    for axis in (0, 2)
+                ])
+                lag = f'{lag:.0f}'
+            print(f'{kind:>6} {name:>13} {drift:>22} {rms:>8.2f} {lag:>7} '
+                  f'{sample_time * 1e6:>10.1f}')
+
+
+def run_recorded(path):
+    recording = np.load(path)
+    rate = int(recording['sample_rate'])
+    trace = [
+        (None, accel.tolist(), (gyro * MPU9250.GYRO_SCALE).tolist(), (0.0, 0.0, 0.0))
+        for accel, gyro in zip(recording['accel'], recording['gyro'])
+    ]
+    settled = int(CALIBRATION_TIME * rate)
+    print(f'{path}: {len(trace)} samples at {rate} Hz')
+    print(f'{"pipeline":>13} {"drift r/p/y deg":>22}')
+    for name, run in get_pipelines(rate).items():
+        if name.endswith('+mag'):
+            continue
+        estimate = run(trace)[0]
+        drift = estimate[-1] - estimate[settled]
+        print(f'{name:>13} {"/".join(f"{e:.1f}" for e in drift):>22}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=int, default=500)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--trace', help='npz of IMUService.save_samples, recorded at rest')
+    args = parser.parse_args()
+
+    if args.trace:
+        run_recorded(args.trace)
+    else:
+        run_synthetic(args.rate, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+GPU objects created per frame and frame time of InstancedQuadMesh against the old
+rebuild-every-frame path (a model matrix per object, new instance buffers and a new vao
+per render), on a headless context with a few moving and mostly static billboards, and
+with all of them static. Also checks that the persistent buffers hold the same data as
+the rebuilt ones.
+
+    python -m benchmarks.instanced_quad_mesh [--objects 10 100 1000 10000] [--frames 200]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+import glm
+import numpy as np
+from benchmarks.offscreen import create_context
+from game_objects.game_object import GameObject
+from game_objects.instance_store import Instance, InstanceStore
+from meshes.instanced_quad_mesh import InstancedQuadMesh
+from shader_program import ProgramRegistry
+
+
+class Billboard(Instance):
+    def __init__(self, pos, tex_id):
+        super().__init__()
+        self.pos = pos
+        self.rot = 0
+        self.scale = glm.vec3(0.5)
+        self.tex_id = tex_id
+
+
+class CountingContext:
+    # forwards to a moderngl context, counting the calls that allocate gpu objects
+    ALLOCATING = ('buffer', 'vertex_array')
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.num_allocations = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.ctx, name)
+        if name in self.ALLOCATING:
+            def counted(*args, **kwargs):
+                self.num_allocations += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+def get_program(ctx, shader_name='instanced_billboard'):
+    vertex_shader, fragment_shader = ProgramRegistry.read_sources(shader_name)
+    return ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
+
+
+def make_objects(rng, num_objects, instances):
+    objects = []
+    for _ in range(num_objects):
+        obj = Billboard(glm.vec3(rng.uniform(0, 64), 0, rng.uniform(0, 64)), rng.randrange(80))
+        instances.add(obj)
+        objects.append(obj)
+    return objects
+
+
+def move_objects(rng, objects, num_moving):
+    # a few npcs walk, the rest (items, closed doors) stay put
+    for obj in objects[:num_moving]:
+        obj.pos.x += rng.uniform(-0.05, 0.05)
+        obj.mark_dirty()
+        obj.tex_id = rng.randrange(80)
+
+
+def render_rebuilt(ctx, program, quad_vbo, objects):
+    # InstancedQuadMesh.render before persistent buffers and the instance store
+    m_model_list, tex_id_list = [], []
+    for obj in objects:
+        m_model_list += sum(GameObject.get_model_matrix(obj).to_list(), [])
+        tex_id_list += [obj.tex_id]
+    m_model_vbo = ctx.buffer(np.array(m_model_list, dtype='float32'))
+    tex_id_vbo = ctx.buffer(np.array(tex_id_list, dtype='int32'))
+    vao = ctx.vertex_array(
+        program,
+        [
+            (quad_vbo, '4f 2f /v', 'in_position', 'in_uv'),
+            (m_model_vbo, '16f /i', 'm_model',),
+            (tex_id_vbo, '1i /i', 'in_tex_id'),
+        ],
+        skip_errors=True
+    )
+    vao.render(instances=len(objects))
+    return m_model_vbo, tex_id_vbo
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--objects', type=int, nargs='+', default=(10, 100, 1000, 10000))
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--moving', type=float, default=0.1)
+    args = parser.parse_args()
+
+    ctx = CountingContext(create_context())
+    ctx.gc_mode = 'auto'
+    fbo = ctx.simple_framebuffer((320, 200))
+    fbo.use()
+    program = get_program(ctx)
+    eng = SimpleNamespace(app=SimpleNamespace(ctx=ctx))
+
+    print(f'{"objects":>8} {"rebuilt, allocs/frame":>22} {"ms/frame":>9} '
+          f'{"persistent, allocs/frame":>25} {"ms/frame":>9} {"all static, ms/frame":>21}')
+    for num_objects in args.objects:
+        rng = random.Random(0)
+        instances = InstanceStore()
+        objects = make_objects(rng, num_objects, instances)
+        num_moving = max(1, int(num_objects * args.moving))
+
+        mesh = InstancedQuadMesh(eng, instances, program)
+        mesh.render()
+        ctx.num_allocations = 0
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            move_objects(rng, objects, num_moving)
+            mesh.render()
+        ctx.finish()
+        persistent_time = (time.perf_counter() - start) / args.frames
+        persistent_allocs = ctx.num_allocations / args.frames
+
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            mesh.render()
+        ctx.finish()
+        static_time = (time.perf_counter() - start) / args.frames
+
+        ctx.num_allocations = 0
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            move_objects(rng, objects, num_moving)
+            render_rebuilt(ctx, program, mesh.quad_vbo, objects)
+        ctx.finish()
+        rebuilt_time = (time.perf_counter() - start) / args.frames
+        rebuilt_allocs = ctx.num_allocations / args.frames
+
+        # spawned and picked up objects: the buffers grow without a new vao
+        objects += make_objects(rng, num_objects + 1, instances)
+        for obj in rng.sample(objects, num_objects // 2):
+            instances.remove(obj)
+        objects = instances.objects
+        vao = mesh.vao
+        mesh.render()
+        m_model_vbo, tex_id_vbo = render_rebuilt(ctx, program, mesh.quad_vbo, objects)
+        assert mesh.vao is vao
+        assert np.allclose(
+            np.frombuffer(mesh.m_model_vbo.read(m_model_vbo.size), dtype='float32'),
+            np.frombuffer(m_model_vbo.read(), dtype='float32'), atol=1e-5
+        )
+        assert mesh.tex_id_vbo.read(tex_id_vbo.size) == tex_id_vbo.read()
+
+        print(f'{num_objects:>8} {rebuilt_allocs:>22.1f} {rebuilt_time * 1e3:>9.3f} '
+              f'{persistent_allocs:>25.1f} {persistent_time * 1e3:>9.3f} {static_time * 1e3:>21.3f}')
+
+
+if __name__ == '__main__':
+    main()
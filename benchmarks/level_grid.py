@@ -0,0 +1,84 @@
+"""
+Memory and lookup time of the tuple-keyed tile maps against LevelGrid.
+
+    python -m benchmarks.level_grid [--sizes 16x9 256x256 2048x2048] [--probes 200000]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from level_grid import LevelGrid
+
+DEFAULT_SIZES = ('16x9', '256x256', '2048x2048')
+
+
+def make_tile_maps(width, depth, seed=0):
+    rng = random.Random(seed)
+    wall_map, door_map = {}, {}
+    for x in range(width):
+        for z in range(depth):
+            if x in (0, width - 1) or z in (0, depth - 1) or rng.random() < 0.3:
+                wall_map[(x, z)] = rng.randrange(12)
+            elif rng.random() < 0.01:
+                door_map[(x, z)] = rng.random() < 0.5  # is_closed
+    return wall_map, door_map
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def time_lookups(lookup, probes):
+    start = time.perf_counter()
+    for x, z in probes:
+        lookup(x, z)
+    return (time.perf_counter() - start) / len(probes) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--probes', type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f'{"map":>10} {"dicts, MB":>10} {"grid, MB":>10} '
+          f'{"dict, ns":>9} {"grid, ns":>9} {"cells, ns":>10}')
+    for size in args.sizes:
+        width, depth = map(int, size.split('x'))
+        (wall_map, door_map), dict_bytes = measure_memory(lambda: make_tile_maps(width, depth))
+
+        def build_grid():
+            grid = LevelGrid.from_tile_maps(width, depth, wall_map)
+            for (x, z), is_closed in door_map.items():
+                grid.add_door(x, z, is_closed)
+            return grid
+
+        grid, grid_bytes = measure_memory(build_grid)
+
+        rng = random.Random(1)
+        probes = [(rng.randrange(width), rng.randrange(depth)) for _ in range(args.probes)]
+
+        # the question every collision test asks: is this tile a wall or a closed door
+        def dict_lookup(x, z):
+            tile = (x, z)
+            if tile in door_map:
+                return door_map[tile]
+            return tile in wall_map
+
+        cells, solid = grid.cells, LevelGrid.SOLID
+
+        def cells_lookup(x, z):
+            return cells[x * depth + z] & solid
+
+        print(f'{size:>10} {dict_bytes / 2 ** 20:>10.2f} {grid_bytes / 2 ** 20:>10.2f} '
+              f'{time_lookups(dict_lookup, probes):>9.1f} '
+              f'{time_lookups(grid.is_solid, probes):>9.1f} '
+              f'{time_lookups(cells_lookup, probes):>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
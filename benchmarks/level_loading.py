@@ -0,0 +1,74 @@
+"""
+Level load time from the tmx against the compiled level: LevelMap (tile layers, player
+spawn, doors, items and npcs), the level vertex buffer and the navigation graph. Compiles
+the levels first and checks that both paths load the same level.
+
+    python -m benchmarks.level_loading [--levels level_0.tmx level_1.tmx] [--runs 20]
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+from types import SimpleNamespace
+import glm
+import numpy as np
+import level_compiler
+from level_map import LevelMap
+from path_finding import PathFinder
+from meshes.vectorized_level_mesh_builder import VectorizedLevelMeshBuilder
+
+
+def make_eng():
+    player = SimpleNamespace(position=glm.vec3(), tile_pos=(0, 0), health=0, weapon_id=0)
+    sound = SimpleNamespace(play=lambda sound: None)
+    return SimpleNamespace(app=SimpleNamespace(), player=player, sound=sound)
+
+
+def load_level(eng, tmx_file, use_compiled):
+    # what Engine.new_game does for the level, minus the gpu uploads
+    eng.level_map = LevelMap(eng, tmx_file=tmx_file, use_compiled=use_compiled)
+    assert (eng.level_map.vertex_data is not None) == use_compiled
+    vertex_data = eng.level_map.vertex_data
+    if vertex_data is None:
+        vertex_data = VectorizedLevelMeshBuilder(SimpleNamespace(eng=eng)).build_mesh()
+    path_finder = PathFinder(eng, nav_graph=eng.level_map.nav_graph)
+    return eng.level_map, bytes(vertex_data), path_finder.graph
+
+
+def time_load(eng, tmx_file, use_compiled, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        level = load_level(eng, tmx_file, use_compiled)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), level
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--levels', nargs='+', default=sorted(
+        os.path.basename(path) for path in glob.glob(f'{level_compiler.LEVEL_DIR}/*.tmx')
+    ))
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    eng = make_eng()
+    print(f'{"level":>12} {"tmx ms":>8} {"compiled ms":>12} {"speedup":>8}')
+    for tmx_file in args.levels:
+        level_compiler.compile_level(tmx_file)
+        tmx_time, (tmx_map, tmx_vertices, tmx_graph) = time_load(eng, tmx_file, False, args.runs)
+        compiled_time, (compiled_map, compiled_vertices, compiled_graph) = time_load(
+            eng, tmx_file, True, args.runs
+        )
+        assert tmx_vertices == compiled_vertices and tmx_graph == compiled_graph
+        assert np.array_equal(tmx_map.grid.flags, compiled_map.grid.flags)
+        assert list(tmx_map.door_map) == list(compiled_map.door_map)
+        assert list(tmx_map.item_map) == list(compiled_map.item_map)
+        assert list(tmx_map.npc_map) == list(compiled_map.npc_map)
+        print(f'{tmx_file:>12} {tmx_time * 1e3:>8.2f} {compiled_time * 1e3:>12.2f} '
+              f'{tmx_time / compiled_time:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Compares LevelMeshBuilder with VectorizedLevelMeshBuilder on generated maps.
+
+    python -m benchmarks.level_mesh_builder [--sizes 16x9 64x64 ...] [--skip-reference 512]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+from level_grid import LevelGrid
+from meshes.level_mesh_builder import LevelMeshBuilder
+from meshes.vectorized_level_mesh_builder import VectorizedLevelMeshBuilder
+
+DEFAULT_SIZES = ('16x9', '64x64', '256x256', '512x512', '1024x1024')
+
+
+def make_mesh(width, depth, wall_density=0.3, seed=0):
+    rng = random.Random(seed)
+    wall_map, floor_map, ceil_map = {}, {}, {}
+    for x in range(width):
+        for z in range(depth):
+            border = x in (0, width - 1) or z in (0, depth - 1)
+            if border or rng.random() < wall_density:
+                wall_map[(x, z)] = rng.randrange(12)
+                continue
+            floor_map[(x, z)] = rng.randrange(4, 8)
+            if rng.random() < 0.9:
+                ceil_map[(x, z)] = rng.randrange(4, 8)
+
+    level_map = SimpleNamespace(
+        width=width, depth=depth, wall_map=wall_map, floor_map=floor_map, ceil_map=ceil_map,
+        grid=LevelGrid.from_tile_maps(width, depth, wall_map, floor_map, ceil_map)
+    )
+    return SimpleNamespace(eng=SimpleNamespace(level_map=level_map), fmt_size=7)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--skip-reference', type=int, default=0,
+                        help='only run the python builder on maps with fewer tiles than this side^2')
+    args = parser.parse_args()
+
+    print(f'{"map":>10} {"vertices":>10} {"python, s":>10} {"numpy, s":>10} {"speedup":>8} identical')
+    for size in args.sizes:
+        width, depth = map(int, size.split('x'))
+        mesh = make_mesh(width, depth)
+
+        fast, fast_time = timed(VectorizedLevelMeshBuilder(mesh).build_mesh)
+        if args.skip_reference and width * depth >= args.skip_reference ** 2:
+            print(f'{size:>10} {len(fast) // 7:>10} {"-":>10} {fast_time:>10.4f} {"-":>8} -')
+            continue
+
+        ref, ref_time = timed(LevelMeshBuilder(mesh).build_mesh)
+        identical = ref.tobytes() == fast.tobytes()
+        print(f'{size:>10} {len(fast) // 7:>10} {ref_time:>10.4f} {fast_time:>10.4f} '
+              f'{ref_time / fast_time:>7.1f}x {identical}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Stall of a level transition: the time Engine.new_game blocks the main thread when the
+player goes through the key door into the next level, from the tmx or the compiled
+level, loaded synchronously or prefetched since the key was picked up. Runs the engine
+on an offscreen context, see benchmarks.offscreen, and leaves out the 300 ms wait of the door itself. Counts the shader programs compiled.
+
+    python -m benchmarks.level_transition [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import time
+import level_compiler
+from benchmarks.offscreen import App, create_context, create_framebuffer, init_pygame
+from settings import NUM_LEVELS
+
+
+def time_transition(eng, is_prefetched):
+    if is_prefetched:
+        # the worker has had the whole walk from the key to the door to finish
+        eng.prefetch_next_level()
+        tmx_file = f'level_{(eng.player_attribs.num_level + 1) % NUM_LEVELS}.tmx'
+        eng.level_prefetcher.pending[tmx_file].result()
+
+    start = time.perf_counter()
+    eng.player_attribs.num_level = (eng.player_attribs.num_level + 1) % NUM_LEVELS
+    eng.new_game()
+    eng.update()
+    eng.render()
+    eng.ctx.finish()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    init_pygame()
+    from engine import Engine
+    ctx = create_context()
+    app = App(ctx, create_framebuffer(ctx))
+    eng = app.engine = Engine(app)
+
+    compiled_paths = [
+        level_compiler.get_compiled_path(f'level_{num_level}.tmx')
+        for num_level in range(NUM_LEVELS)
+    ]
+    print(f'{"levels":>9} {"prefetch":>9} {"stall ms":>9} {"max ms":>8} {"compiles":>9}')
+    for is_compiled in (False, True):
+        for path in compiled_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        if is_compiled:
+            for num_level in range(NUM_LEVELS):
+                level_compiler.compile_level(f'level_{num_level}.tmx')
+        for is_prefetched in (False, True):
+            num_compiles = eng.program_registry.num_compiles
+            stalls = [time_transition(eng, is_prefetched) for _ in range(args.runs)]
+            num_compiles = eng.program_registry.num_compiles - num_compiles
+            print(f'{"compiled" if is_compiled else "tmx":>9} {"yes" if is_prefetched else "no":>9} '
+                  f'{statistics.median(stalls) * 1e3:>9.1f} {max(stalls) * 1e3:>8.1f} '
+                  f'{num_compiles:>9}')
+
+
+if __name__ == '__main__':
+    main()
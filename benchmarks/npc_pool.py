@@ -0,0 +1,89 @@
+"""
+NPC updates per second of NPCPool.update for growing hordes chasing the player across
+an open arena: line of sight, flow-field steps, attacks, movement with collisions and
+animation for every npc, sounds muted.
+
+    python -m benchmarks.npc_pool [--npcs 10 100 1000 10000] [--size 128] [--frames 50]
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+import glm
+from level_grid import LevelGrid
+from path_finding import PathFinder
+from ray_casting import RayCasting
+from texture_id import ID
+from game_objects.instance_store import InstanceStore
+from game_objects.npc import NPC
+from game_objects.npc_pool import NPCPool
+
+
+class Silence:
+    def play(self, sound):
+        pass
+
+    def __getattr__(self, name):
+        return defaultdict(type(None))
+
+
+def make_level(rng, size, num_npcs):
+    grid = LevelGrid(size, size)
+    for x in range(size):
+        for z in range(size):
+            if x in (0, size - 1) or z in (0, size - 1) or rng.random() < 0.05:
+                grid.wall[x, z] = 0
+    grid.flags[grid.wall >= 0] |= LevelGrid.WALL
+    open_tiles = [(x, z) for x in range(size) for z in range(size) if grid.wall[x, z] < 0]
+
+    player_tile = open_tiles[len(open_tiles) // 2]
+    player = SimpleNamespace(
+        position=glm.vec3(player_tile[0] + 0.5, 0.5, player_tile[1] + 0.5),
+        tile_pos=player_tile, health=10 ** 9, weapon_id=ID.PISTOL_0
+    )
+    app = SimpleNamespace(delta_time=16.0, anim_trigger=True, sound_trigger=False)
+    eng = SimpleNamespace(app=app, player=player, sound=Silence())
+    level_map = SimpleNamespace(
+        eng=eng, grid=grid, wall_map=LevelGrid.to_tile_map(grid.wall),
+        door_map={}, item_map={}, npc_map={},
+        item_instances=InstanceStore(), npc_instances=InstanceStore()
+    )
+    level_map.npc_pool = NPCPool(eng, level_map)
+    eng.level_map = level_map
+
+    npc_ids = (ID.SOLDIER_BLUE_0, ID.SOLDIER_BROWN_0, ID.RAT_0)
+    npc_tiles = rng.sample([tile for tile in open_tiles if tile != player_tile], num_npcs)
+    for x, z in npc_tiles:
+        npc = NPC(level_map, rng.choice(npc_ids), x, z)
+        npc.is_player_spotted = True
+    grid.set_npc_tiles(npc_tiles)
+
+    eng.path_finder = PathFinder(eng)
+    eng.ray_casting = RayCasting(eng)
+    return eng
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--npcs', type=int, nargs='+', default=(10, 100, 1000, 10000))
+    parser.add_argument('--size', type=int, default=128)
+    parser.add_argument('--frames', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f'{"npcs":>6} {"ms/frame":>9} {"npc updates/s":>14}')
+    for num_npcs in args.npcs:
+        eng = make_level(random.Random(0), args.size, num_npcs)
+        pool = eng.level_map.npc_pool
+        pool.update()
+
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            pool.update()
+            eng.level_map.npc_instances.update()
+        frame_time = (time.perf_counter() - start) / args.frames
+        print(f'{num_npcs:>6} {frame_time * 1e3:>9.3f} {num_npcs / frame_time:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Offscreen rendering for the benchmarks that need a gl context: a standalone context, on
+egl where there is no display, a framebuffer the size of the window to draw into, and an
+App standing in for Game to run an Engine against, with pygame on a dummy window and the
+music muted (the theme is not part of the assets).
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import moderngl as mgl
+import pygame as pg
+from fixed_step import FixedStep
+from settings import WIN_RES
+
+
+def create_context():
+    try:
+        return mgl.create_standalone_context()
+    except Exception:
+        return mgl.create_standalone_context(backend='egl')
+
+
+def create_framebuffer(ctx):
+    # with the depth test and blending Game enables on its window
+    ctx.enable(flags=mgl.DEPTH_TEST | mgl.BLEND)
+    fbo = ctx.simple_framebuffer(tuple(map(int, WIN_RES)))
+    fbo.use()
+    return fbo
+
+
+def init_pygame():
+    pg.init()
+    pg.display.set_mode((8, 8))
+    pg.mixer.music.load = lambda path: None
+    pg.mixer.music.play = lambda *args, **kwargs: None
+
+
+class App(FixedStep):
+    """
+    The part of Game the Engine reads, drawing into fbo
+    """
+    def __init__(self, ctx, fbo):
+        super().__init__()
+        self.ctx = ctx
+        self.fbo = fbo
+        self.time = 0
+        self.fps_value = 60
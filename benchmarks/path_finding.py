@@ -0,0 +1,151 @@
+"""
+Per-frame path finding cost for many NPCs chasing the player: one bfs per NPC
+(PathFinder.find without its cache) against one shared flow field. Then node expansions
+and time per find() for the bfs, a* and jps search engines on open arenas and mazes,
+and the cost of building the navigation graph against patching it with set_blocked.
+
+    python -m benchmarks.path_finding [--size 64] [--npcs 10 100 300] [--queries 200]
+                                      [--graph-sizes 64 256 1024]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+from level_grid import LevelGrid
+from path_finding import PathFinder
+
+
+def make_level(rng, size, wall_density):
+    grid = LevelGrid(size, size)
+    for x in range(size):
+        for z in range(size):
+            if x in (0, size - 1) or z in (0, size - 1) or rng.random() < wall_density:
+                grid.wall[x, z] = 0
+    return make_eng(grid)
+
+
+def make_maze(rng, size):
+    # recursive backtracker on the odd tiles, walls everywhere else
+    grid = LevelGrid(size, size)
+    grid.wall[:] = 0
+    stack = [(1, 1)]
+    grid.wall[1, 1] = -1
+    while stack:
+        x, z = stack[-1]
+        options = [
+            (x + dx, z + dz, dx // 2, dz // 2) for dx, dz in ((2, 0), (-2, 0), (0, 2), (0, -2))
+            if 0 < x + dx < size - 1 and 0 < z + dz < size - 1 and grid.wall[x + dx, z + dz] >= 0
+        ]
+        if not options:
+            stack.pop()
+            continue
+        next_x, next_z, dx, dz = rng.choice(options)
+        grid.wall[x + dx, z + dz] = grid.wall[next_x, next_z] = -1
+        stack.append((next_x, next_z))
+    return make_eng(grid)
+
+
+def make_eng(grid):
+    size = grid.width
+    grid.flags[grid.wall >= 0] |= LevelGrid.WALL
+    open_tiles = [(x, z) for x in range(size) for z in range(size) if grid.wall[x, z] < 0]
+
+    level_map = SimpleNamespace(
+        grid=grid, width=size, depth=size, wall_map=LevelGrid.to_tile_map(grid.wall), npc_map={}
+    )
+    return SimpleNamespace(level_map=level_map), open_tiles
+
+
+def compare_searches(size, num_queries):
+    print(f'\n{"map":>6} {"engine":>6} {"expanded/find":>14} {"ms/find":>8} {"reached":>8}')
+    for name, (eng, open_tiles) in (
+        ('arena', make_level(random.Random(0), size, 0.05)),
+        ('maze', make_maze(random.Random(0), size | 1)),
+    ):
+        path_finder = PathFinder(eng)
+        rng = random.Random(1)
+        queries = [(rng.choice(open_tiles), rng.choice(open_tiles)) for _ in range(num_queries)]
+        for search in ('bfs', 'astar', 'jps'):
+            path_finder.search = search
+            expanded = reached = 0
+            start = time.perf_counter()
+            for start_pos, end_pos in queries:
+                step = path_finder.search_path(start_pos, end_pos)[0]
+                expanded += path_finder.num_expanded
+                reached += step != end_pos or start_pos == end_pos
+            elapsed = time.perf_counter() - start
+            print(f'{name:>6} {search:>6} {expanded / num_queries:>14.1f} '
+                  f'{elapsed / num_queries * 1e3:>8.3f} {reached:>8}')
+
+
+def compare_graph_updates(sizes, num_updates):
+    print(f'\n{"size":>6} {"per-tile build, ms":>19} {"vectorized build, ms":>21} '
+          f'{"set_blocked, us":>16}')
+    for size in sizes:
+        eng, open_tiles = make_level(random.Random(0), size, 0.2)
+        path_finder = PathFinder(eng)
+
+        start = time.perf_counter()
+        graph = [path_finder.get_next_nodes(x, z) for x in range(size) for z in range(size)]
+        per_tile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        path_finder.update_graph()
+        vectorized_time = time.perf_counter() - start
+        assert path_finder.graph == graph
+
+        tiles = random.Random(1).sample(open_tiles, min(num_updates, len(open_tiles)))
+        start = time.perf_counter()
+        for tile in tiles:
+            path_finder.set_blocked(tile, True)
+        for tile in tiles:
+            path_finder.set_blocked(tile, False)
+        patch_time = (time.perf_counter() - start) / (2 * len(tiles))
+        assert path_finder.graph == graph
+
+        print(f'{size:>6} {per_tile_time * 1e3:>19.2f} {vectorized_time * 1e3:>21.2f} '
+              f'{patch_time * 1e6:>16.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--npcs', type=int, nargs='+', default=(10, 100, 300))
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--graph-sizes', type=int, nargs='+', default=(64, 256, 1024))
+    args = parser.parse_args()
+
+    for name, wall_density in (('arena', 0.05), ('maze', 0.3)):
+        print(f'\n{name}, {args.size}x{args.size}, {wall_density:.0%} walls')
+        print(f'{"npcs":>6} {"bfs per npc, ms/frame":>22} {"flow field, ms/frame":>21} {"speedup":>8}')
+        for num_npcs in args.npcs:
+            rng = random.Random(0)
+            eng, open_tiles = make_level(rng, args.size, wall_density)
+            path_finder = PathFinder(eng)
+            npc_tiles = rng.sample(open_tiles, num_npcs)
+            eng.level_map.grid.set_npc_tiles(npc_tiles)
+            # the player changes tile every frame, the worst case for the flow field
+            player_tiles = [rng.choice(open_tiles) for _ in range(args.frames)]
+
+            start = time.perf_counter()
+            for player_tile in player_tiles:
+                for tile in npc_tiles:
+                    path_finder.search_path(tile, player_tile)
+            bfs_time = (time.perf_counter() - start) / args.frames
+
+            start = time.perf_counter()
+            for player_tile in player_tiles:
+                for tile in npc_tiles:
+                    path_finder.get_flow_step(tile, player_tile)
+            flow_time = (time.perf_counter() - start) / args.frames
+
+            print(f'{num_npcs:>6} {bfs_time * 1e3:>22.2f} {flow_time * 1e3:>21.2f} '
+                  f'{bfs_time / flow_time:>7.1f}x')
+
+    compare_searches(args.size, args.queries)
+    compare_graph_updates(args.graph_sizes, args.queries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Checks RayCasting.trace_batch against the scalar RayCasting.trace on random maps and rays,
+times both for growing numbers of NPC-to-player rays, and reports how many traces the
+visibility cache saves for a crowd of NPCs chasing the player.
+
+    python -m benchmarks.ray_casting [--maps 20] [--rays 500]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+import glm
+import numpy as np
+from level_grid import LevelGrid
+from ray_casting import RayCasting
+
+
+def make_level(rng, width, depth, wall_density=0.15):
+    grid = LevelGrid(width, depth)
+    open_tiles = []
+    for x in range(width):
+        for z in range(depth):
+            if x in (0, width - 1) or z in (0, depth - 1) or rng.random() < wall_density:
+                grid.wall[x, z] = 0
+                grid.set_flag(x, z, LevelGrid.WALL, True)
+            elif rng.random() < 0.03:
+                grid.add_door(x, z, is_closed=rng.random() < 0.5)
+            else:
+                open_tiles.append((x, z))
+
+    player = SimpleNamespace(tile_pos=None, position=None)
+    level_map = SimpleNamespace(grid=grid, wall_map={}, door_map={}, npc_map={})
+    ray_casting = RayCasting(SimpleNamespace(level_map=level_map, player=player))
+    return ray_casting, player, open_tiles
+
+
+def random_point(rng, tile, y):
+    return glm.vec3(tile[0] + rng.random(), y, tile[1] + rng.random())
+
+
+def make_rays(rng, player, open_tiles, num_rays):
+    origins, directions = [], []
+    for _ in range(num_rays):
+        pos = random_point(rng, rng.choice(open_tiles), rng.choice((0.0, rng.random())))
+        if rng.random() < 0.8:
+            direction = glm.normalize(player.position - pos)
+        else:
+            direction = glm.normalize(glm.vec3(rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1, 1)))
+        origins.append(pos)
+        directions.append(direction)
+    return origins, directions
+
+
+def check_agreement(num_maps, num_rays):
+    rng = random.Random(0)
+    mismatches = total = 0
+    for _ in range(num_maps):
+        ray_casting, player, open_tiles = make_level(rng, rng.randrange(8, 64), rng.randrange(8, 64))
+        player.position = random_point(rng, rng.choice(open_tiles), 0.6)
+        player.tile_pos = int(player.position.x), int(player.position.z)
+
+        origins, directions = make_rays(rng, player, open_tiles, num_rays)
+        max_dists = [rng.choice((2, 10, 20, 30)) for _ in origins]
+        batch = ray_casting.trace_batch(origins, directions, max_dists)
+        for i, (pos, direction, max_dist) in enumerate(zip(origins, directions, max_dists)):
+            total += 1
+            mismatches += bool(ray_casting.trace(pos, direction, max_dist)) != batch[i]
+    return mismatches, total
+
+
+def crowd_cache_stats(num_npcs=200, num_frames=300, door_period=60):
+    # npcs and the player wander at game speeds, a door toggles every door_period frames
+    rng = random.Random(2)
+    ray_casting, player, open_tiles = make_level(rng, 64, 64, wall_density=0.05)
+    door = next(zip(*np.nonzero(ray_casting.grid.flags & LevelGrid.DOOR)))
+    npcs = [random_point(rng, rng.choice(open_tiles), 0.0) for _ in range(num_npcs)]
+    player.position = random_point(rng, rng.choice(open_tiles), 0.6)
+
+    def wander(pos, speed):
+        step = glm.vec3(rng.uniform(-speed, speed), 0, rng.uniform(-speed, speed))
+        tile = int(pos.x + step.x), int(pos.z + step.z)
+        return pos + step if not ray_casting.grid.is_solid(*tile) else pos
+
+    for frame in range(num_frames):
+        player.position = wander(player.position, 0.06)
+        player.tile_pos = int(player.position.x), int(player.position.z)
+        npcs = [wander(pos, 0.07) for pos in npcs]
+        if frame % door_period == 0:
+            ray_casting.grid.set_door_closed(*door, frame // door_period % 2 == 0)
+
+        directions = [glm.normalize(player.position - pos) for pos in npcs]
+        ray_casting.run_batch(np.array(npcs), np.array(directions))
+
+    cache = ray_casting.visibility_cache
+    print(f'\nvisibility cache, {num_npcs} npcs over {num_frames} frames: '
+          f'{cache.hits} hits, {cache.misses} misses ({cache.hit_rate:.0%} of traces saved)')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--maps', type=int, default=20)
+    parser.add_argument('--rays', type=int, default=500)
+    args = parser.parse_args()
+
+    mismatches, total = check_agreement(args.maps, args.rays)
+    print(f'agreement: {total - mismatches}/{total} rays match trace()')
+
+    for name, wall_density in (('maze', 0.15), ('arena', 0.02)):
+        rng = random.Random(1)
+        ray_casting, player, open_tiles = make_level(rng, 64, 64, wall_density)
+        player.position = random_point(rng, rng.choice(open_tiles), 0.6)
+        player.tile_pos = int(player.position.x), int(player.position.z)
+
+        print(f'\n{name}, {wall_density:.0%} walls')
+        print(f'{"npcs":>6} {"trace(), ms":>12} {"trace_batch(), ms":>18} {"speedup":>8}')
+        for num_rays in (10, 30, 100, 300, 1000, 3000):
+            origins, directions = make_rays(rng, player, open_tiles, num_rays)
+
+            start = time.perf_counter()
+            for pos, direction in zip(origins, directions):
+                ray_casting.trace(pos, direction)
+            scalar_time = time.perf_counter() - start
+
+            origins, directions = np.array(origins), np.array(directions)
+            start = time.perf_counter()
+            ray_casting.trace_batch(origins, directions)
+            batch_time = time.perf_counter() - start
+
+            print(f'{num_rays:>6} {scalar_time * 1e3:>12.2f} {batch_time * 1e3:>18.2f} '
+                  f'{scalar_time / batch_time:>7.1f}x')
+
+    crowd_cache_stats()
+
+
+if __name__ == '__main__':
+    main()
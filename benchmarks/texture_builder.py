@@ -0,0 +1,74 @@
+"""
+Cold build time of TextureArrayBuilder.build across pool sizes, decoding on threads and
+on processes that share the layers array. Runs on assets/textures and on generated packs
+of larger tiles, upscaled from those textures. The png export is not included.
+
+    python -m benchmarks.texture_builder [--workers 1 2 4 8] [--tex-sizes 512 1024]
+                                         [--layers 256] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import numpy as np
+import pygame as pg
+from settings import TEX_SIZE
+from texture_builder import TextureArrayBuilder
+
+
+def make_pack(path, tex_size, num_layers):
+    sources = TextureArrayBuilder.get_texture_paths()
+    for i in range(num_layers):
+        texture = pg.image.load(sources[i % len(sources)])
+        pg.image.save(pg.transform.scale(texture, (tex_size, tex_size)), f'{path}/{i}.png')
+
+
+def time_build(load_path, tex_size, num_workers, use_processes, runs):
+    builder = TextureArrayBuilder(
+        should_build=False, num_workers=num_workers, use_processes=use_processes
+    )
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        layers = builder.build(load_path, tex_size)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), layers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=(1, 2, 4, 8))
+    parser.add_argument('--tex-sizes', type=int, nargs='+', default=(512, 1024))
+    parser.add_argument('--layers', type=int, default=256)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{os.cpu_count()} cpus')
+    print(f'{"pack":>16} {"pool":>8} {"workers":>8} {"build ms":>10} {"speedup":>8}')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        packs = [('assets/textures', TEX_SIZE)]
+        for tex_size in args.tex_sizes:
+            path = f'{tmp_dir}/{tex_size}'
+            os.mkdir(path)
+            make_pack(path, tex_size, args.layers)
+            packs.append((path, tex_size))
+
+        for path, tex_size in packs:
+            num_layers = len(TextureArrayBuilder.get_texture_paths(path))
+            name = f'{num_layers}x{tex_size}px'
+            # the plain loop of a single thread is the baseline for both pools
+            baseline, reference = time_build(path, tex_size, 1, False, args.runs)
+            for use_processes in (False, True):
+                for num_workers in args.workers:
+                    build_time, layers = time_build(
+                        path, tex_size, num_workers, use_processes, args.runs
+                    )
+                    assert np.array_equal(layers, reference)
+                    print(f'{name:>16} {"process" if use_processes else "thread":>8} '
+                          f'{num_workers:>8} {build_time * 1e3:>10.1f} '
+                          f'{baseline / build_time:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
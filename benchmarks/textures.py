@@ -0,0 +1,106 @@
+"""
+Startup cost of Textures: a cold start with no texture cache (build the texture array and
+sprite sheet pngs from assets/textures, then upload) against a warm start that maps the
+cached layers straight into ctx.texture_array. Also checks that the cached layers match
+the textures blitted one by one into a stacked surface, as the old startup built them.
+Then the layers each level makes resident, over a few level transitions under a few
+texture memory budgets.
+
+    python -m benchmarks.textures [--runs 5] [--budgets-mib 64 25] [--levels 0 1 0 1]
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+import glm
+import pygame as pg
+from benchmarks.offscreen import create_context
+from settings import NUM_LEVELS
+from level_map import LevelMap
+from textures import Textures
+from texture_residency import TextureResidency
+from texture_builder import TextureArrayBuilder
+from texture_cache import TextureArrayCache
+
+
+def time_startup(eng):
+    start = time.perf_counter()
+    textures = Textures(eng)
+    textures.residency.make_resident(range(textures.size[2]))
+    eng.ctx.finish()
+    elapsed = time.perf_counter() - start
+    textures.residency.release()
+    # let the background png export of a cold start finish before the next run
+    for thread in threading.enumerate():
+        if thread is not threading.main_thread():
+            thread.join()
+    return elapsed
+
+
+def get_reference_layer_data(tex_size):
+    texture_paths = TextureArrayBuilder.get_texture_paths()
+    texture_array = pg.Surface([tex_size, tex_size * len(texture_paths)], pg.SRCALPHA, 32)
+    for i, path in enumerate(texture_paths):
+        texture_array.blit(pg.image.load(path), (0, i * tex_size))
+    return Textures.get_layer_data(texture_array)
+
+
+def make_level_eng(ctx):
+    player = SimpleNamespace(position=glm.vec3(), tile_pos=(0, 0), health=0, weapon_id=0)
+    sound = SimpleNamespace(play=lambda sound: None)
+    return SimpleNamespace(ctx=ctx, app=SimpleNamespace(), player=player, sound=sound)
+
+
+def report_levels(eng, budget, levels):
+    textures = Textures(eng)
+    textures.residency = TextureResidency(textures, memory_budget=budget)
+    print(f'budget {budget / 2 ** 20:.0f} MiB, {textures.residency.max_layers} layers')
+    for num_level in levels:
+        level_map = LevelMap(eng, tmx_file=f'level_{num_level % NUM_LEVELS}.tmx')
+        start = time.perf_counter()
+        stats = textures.load_level(level_map)
+        eng.ctx.finish()
+        print(f'  level {num_level}: {(time.perf_counter() - start) * 1e3:6.1f} ms, '
+              f'{stats["used_layers"] / textures.size[2]:.0%} of the layers used')
+    textures.residency.release()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budgets-mib', type=int, nargs='+', default=(64, 25))
+    parser.add_argument('--levels', type=int, nargs='+', default=(0, 1, 0, 1))
+    args = parser.parse_args()
+
+    pg.init()
+    eng = SimpleNamespace(ctx=create_context())
+    cache = TextureArrayCache(TextureArrayBuilder.get_texture_paths())
+
+    cold_times, warm_times = [], []
+    for _ in range(args.runs):
+        for path in (cache.cache_path, cache.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        cold_times.append(time_startup(eng))
+        warm_times.append(time_startup(eng))
+
+    size, data = cache.load()
+    with data:
+        reference_size, reference_data = get_reference_layer_data(size[0])
+        assert size == reference_size and data[:] == reference_data
+
+    cold, warm = statistics.median(cold_times), statistics.median(warm_times)
+    print(f'{size[2]} layers of {size[0]}x{size[1]}, '
+          f'{os.path.getsize(cache.cache_path) / 2 ** 20:.1f} MiB cached')
+    print(f'cold start {cold * 1e3:8.1f} ms')
+    print(f'warm start {warm * 1e3:8.1f} ms  ({cold / warm:.1f}x faster)')
+
+    level_eng = make_level_eng(eng.ctx)
+    for budget_mib in args.budgets_mib:
+        report_levels(level_eng, budget_mib * 2 ** 20, args.levels)
+
+
+if __name__ == '__main__':
+    main()
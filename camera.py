@@ -1,4 +1,10 @@
 from settings import *
+from imu_fusion import get_euler_angles
+
+
+def get_angle_diff(a, b):
+    # a - b wrapped to [-pi, pi)
+    return (a - b + math.pi) % math.tau - math.pi
 
 
 class Camera:
@@ -13,25 +19,55 @@ class Camera:
         self.forward = glm.vec3(0, 0, -1)
 
         self.m_proj = glm.perspective(V_FOV, ASPECT_RATIO, NEAR, FAR)
+        # view of the last render and the position it was built at, see interpolate
         self.m_view = glm.mat4()
+        self.view_position = glm.vec3(self.position)
+        # position and angles at the start of the last simulation tick
+        self.prev_state = glm.vec3(self.position), self.yaw, self.pitch, self.roll
 
     def update(self):
         self.update_vectors()
         self.update_view_matrix()
 
     def update_view_matrix(self):
-        roll_matrix = glm.rotate(glm.mat4(1.0), self.roll, self.forward)
-        up = glm.vec3(roll_matrix * glm.vec4(self.up, 1.0))
-        self.m_view = glm.lookAt(self.position, self.position + self.forward, up)
+        self.m_view = self.get_view_matrix(self.position, self.forward, self.up, self.roll)
+        self.view_position = glm.vec3(self.position)
 
-    def update_vectors(self):
-        self.forward.x = glm.cos(self.yaw) * glm.cos(self.pitch)
-        self.forward.y = glm.sin(self.pitch)
-        self.forward.z = glm.sin(self.yaw) * glm.cos(self.pitch)
+    @staticmethod
+    def get_view_matrix(position, forward, up, roll):
+        roll_matrix = glm.rotate(glm.mat4(1.0), roll, forward)
+        up = glm.vec3(roll_matrix * glm.vec4(up, 1.0))
+        return glm.lookAt(position, position + forward, up)
 
-        self.forward = glm.normalize(self.forward)
-        self.right = glm.normalize(glm.cross(self.forward, glm.vec3(0, 1, 0)))
-        self.up = glm.normalize(glm.cross(self.right, self.forward))
+    def update_vectors(self):
+        self.forward, self.right, self.up = self.get_vectors(self.yaw, self.pitch)
+
+    @staticmethod
+    def get_vectors(yaw, pitch):
+        forward = glm.normalize(glm.vec3(
+            glm.cos(yaw) * glm.cos(pitch), glm.sin(pitch), glm.sin(yaw) * glm.cos(pitch)
+        ))
+        right = glm.normalize(glm.cross(forward, glm.vec3(0, 1, 0)))
+        up = glm.normalize(glm.cross(right, forward))
+        return forward, right, up
+
+    def save_state(self):
+        # at the start of every simulation tick
+        self.prev_state = glm.vec3(self.position), self.yaw, self.pitch, self.roll
+
+    def interpolate(self, alpha):
+        # view alpha of the way from the saved state to the current one, for the render
+        # between this tick and the next. Angles take the short way round, alpha 1 gives
+        # the current view exactly and the simulation state is left as it is
+        prev_position, prev_yaw, prev_pitch, prev_roll = self.prev_state
+        t = 1.0 - alpha
+        position = self.position + (prev_position - self.position) * t
+        yaw = self.yaw + get_angle_diff(prev_yaw, self.yaw) * t
+        pitch = self.pitch + (prev_pitch - self.pitch) * t
+        roll = self.roll + get_angle_diff(prev_roll, self.roll) * t
+        forward, right, up = self.get_vectors(yaw, pitch)
+        self.m_view = self.get_view_matrix(position, forward, up, roll)
+        self.view_position = position
 
     def rotate_pitch(self, delta_y):
         self.pitch -= delta_y
@@ -47,6 +83,15 @@ class Camera:
     def set_yaw(self, yaw):
         self.yaw = yaw
 
+    def set_orientation(self, quaternion, yaw_offset=0.0, pitch_offset=0.0):
+        # follow a (w, x, y, z) imu orientation: turning the sensor left turns the camera
+        # left, tilting it pitches and rolls the camera. The offsets add the turns made
+        # otherwise, e.g. with the mouse
+        roll, pitch, yaw = get_euler_angles(quaternion)
+        self.yaw = yaw_offset - yaw
+        self.pitch = glm.clamp(pitch_offset + pitch, -PITCH_MAX, PITCH_MAX)
+        self.roll = -roll
+
     def move_left(self, velocity):
         return -self.right.xz * velocity
 
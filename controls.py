@@ -0,0 +1,96 @@
+import pygame as pg
+from gpio_input import GPIOInput
+from imu_service import IMUService
+from mpu9250 import MPU9250
+from settings import (GPIO_PINS, GPIO_PRESS_EVENT, GPIO_RELEASE_EVENT, GPIO_BOUNCE_TIME,
+                      IMU_SAMPLE_RATE, IMU_BUFFER_SIZE, IMU_USE_FIFO, IMU_FIFO_SAMPLES,
+                      IMU_FUSION, IMU_USE_MAGNETOMETER, IMU_CALIBRATION_TIME)
+
+
+def create_gpio_input():
+    # the buttons, or off the pi (desktops) a stand-in with them never pressed
+    try:
+        import RPi.GPIO as GPIO
+    except ImportError:
+        from fake_gpio import FakeGPIO
+        GPIO = FakeGPIO()
+    return GPIOInput(
+        GPIO, pins=GPIO_PINS, press_event=GPIO_PRESS_EVENT, release_event=GPIO_RELEASE_EVENT,
+        bounce_time=GPIO_BOUNCE_TIME
+    )
+
+
+def create_imu():
+    # the mpu, or off the pi a stand-in lying still
+    try:
+        mpu = MPU9250()
+    except (ImportError, OSError):
+        from fake_smbus import FakeSMBus
+        mpu = MPU9250(bus=FakeSMBus())
+    return IMUService(
+        mpu, sample_rate=IMU_SAMPLE_RATE, buffer_size=IMU_BUFFER_SIZE,
+        use_fifo=IMU_USE_FIFO, fifo_samples=IMU_FIFO_SAMPLES,
+        fusion=IMU_FUSION, use_magnetometer=IMU_USE_MAGNETOMETER,
+        calibration_samples=int(IMU_CALIBRATION_TIME * IMU_SAMPLE_RATE)
+    )
+
+
+class Controls:
+    """
+    The input Player steers by, as of the start of the tick: the pressed control keys and
+    buttons, the mouse motion since the last tick and the imu orientation. update takes the
+    tick's snapshot; this base holds still input, LiveControls reads the devices
+    """
+    def __init__(self, keys, pins):
+        self.keys = tuple(keys)
+        self.pins = tuple(pins)
+        #
+        self.pressed_keys = frozenset()
+        self.pressed_pins = frozenset()
+        self.mouse_rel = (0, 0)
+        # roll, pitch, yaw in degrees and the (w, x, y, z) quaternion of the imu
+        self.orientation = (0.0, 0.0, 0.0)
+        self.quaternion = (1.0, 0.0, 0.0, 0.0)
+
+    def update(self):
+        pass
+
+    def is_key_pressed(self, key):
+        return key in self.pressed_keys
+
+    def is_pin_pressed(self, pin):
+        return pin in self.pressed_pins
+
+
+class LiveControls(Controls):
+    """
+    Controls read from the keyboard and mouse through pygame, the buttons through a
+    GPIOInput and the orientation from an IMUService, see create_gpio_input and
+    create_imu. The game starts and stops the devices
+    """
+    def __init__(self, keys, gpio_input, imu):
+        super().__init__(keys, gpio_input.pins)
+        self.gpio_input = gpio_input
+        self.imu = imu
+        self.quaternion = tuple(imu.get_quaternion())
+
+    def start(self):
+        # buttons report their edges as events, the imu is sampled in the background
+        self.gpio_input.start()
+        self.imu.start()
+
+    def stop(self):
+        self.imu.stop()
+        self.gpio_input.stop()
+
+    def update_buttons(self):
+        # button states for the frame, before its events are handled
+        self.gpio_input.update()
+
+    def update(self):
+        key_state = pg.key.get_pressed()
+        self.pressed_keys = frozenset(key for key in self.keys if key_state[key])
+        self.pressed_pins = frozenset(pin for pin in self.pins if self.gpio_input.is_pressed(pin))
+        self.mouse_rel = pg.mouse.get_rel()
+        self.orientation = tuple(self.imu.get_orientation())
+        self.quaternion = tuple(self.imu.get_quaternion())
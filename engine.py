@@ -1,22 +1,33 @@
 from player import Player, PlayerAttribs
 from scene import Scene
-from shader_program import ShaderProgram
+from world import World
+from shader_program import ShaderProgram, ProgramRegistry, CameraBlock
 from path_finding import PathFinder
 from ray_casting import RayCasting
 from level_map import LevelMap
+from level_prefetcher import LevelPrefetcher
 from textures import Textures
 from sound import Sound
+from controls import LiveControls, create_gpio_input, create_imu
+from settings import NUM_LEVELS, KEYS
 import pygame as pg
 
 
 class Engine:
-    def __init__(self, app):
+    def __init__(self, app, controls=None):
         self.app = app
         self.ctx = app.ctx
         self.num_level = 0
 
         self.textures = Textures(self)
+        self.program_registry = ProgramRegistry(self.ctx)
+        self.camera_block = CameraBlock(self.ctx)
         self.sound = Sound()
+        self.level_prefetcher = LevelPrefetcher()
+        # the player's input, read from the devices unless given
+        self.controls = controls if controls is not None else LiveControls(
+            KEYS.values(), create_gpio_input(), create_imu()
+        )
 
         self.player_attribs = PlayerAttribs()
         self.player: Player = None
@@ -26,18 +37,33 @@ class Engine:
         self.level_map: LevelMap = None
         self.ray_casting: RayCasting = None
         self.path_finder: PathFinder = None
+        self.world: World = None
         self.new_game()
 
     def new_game(self):
         pg.mixer.music.play(-1)
         self.player = Player(self)
         self.shader_program = ShaderProgram(self)
+        self.load_level()
+        self.textures.load_level(self.level_map)
+        self.shader_program.set_texture_layers(self.textures.layer_by_id)
+        self.scene = Scene(self)
+        # the first render of a level starts from where the level put things
+        self.save_state()
+
+    def load_level(self):
+        # the simulated part of the level, no gl, see HeadlessEngine
+        tmx_file = f'level_{self.player_attribs.num_level}.tmx'
         self.level_map = LevelMap(
-            self, tmx_file=f'level_{self.player_attribs.num_level}.tmx'
+            self, tmx_file=tmx_file, level_data=self.level_prefetcher.take(tmx_file)
         )
         self.ray_casting = RayCasting(self)
-        self.path_finder = PathFinder(self)
-        self.scene = Scene(self)
+        self.path_finder = PathFinder(self, nav_graph=self.level_map.nav_graph)
+        self.world = World(self)
+
+    def prefetch_next_level(self):
+        num_level = (self.player_attribs.num_level + 1) % NUM_LEVELS
+        self.level_prefetcher.prefetch(f'level_{num_level}.tmx')
 
     def update_npc_map(self):
         new_npc_map = {}
@@ -48,15 +74,33 @@ class Engine:
                 self.level_map.npc_list.remove(npc)
         #
         self.level_map.npc_map = new_npc_map
+        self.level_map.grid.set_npc_tiles(list(new_npc_map.keys()))
 
     def handle_events(self, event):
         self.player.handle_events(event=event)
 
+    def save_state(self):
+        # what moves between ticks, for the renders to interpolate from
+        self.player.save_state()
+        self.level_map.npc_instances.save_state()
+        self.level_map.door_instances.save_state()
+
     def update(self):
+        # one simulation tick
+        self.save_state()
+        self.update_world()
+        self.scene.update()
+
+    def update_world(self):
+        # the tick less the interpolation state and the hud, no gl, see HeadlessEngine
         self.update_npc_map()
         self.player.update()
-        self.shader_program.update()
-        self.scene.update()
+        self.world.update()
 
-    def render(self):
+    def render(self, alpha=1.0):
+        # alpha: how far the frame is between the last tick and the next
+        self.player.interpolate(alpha)
+        self.level_map.npc_instances.interpolate(alpha)
+        self.level_map.door_instances.interpolate(alpha)
+        self.shader_program.update()
         self.scene.render()
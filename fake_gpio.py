@@ -0,0 +1,83 @@
+import threading
+import time
+
+
+class FakeGPIO:
+    """
+    Stand-in for the RPi.GPIO module for running the button code off the Pi. set_input
+    drives a pin, at an optional time in seconds, and runs the edge callbacks the way the
+    driver does: an edge within bouncetime of the last reported edge of the pin is dropped.
+    Callbacks run on the calling thread rather than a driver thread
+    """
+    BCM, BOARD = 11, 10
+    IN, OUT = 1, 0
+    PUD_OFF, PUD_DOWN, PUD_UP = 20, 21, 22
+    LOW, HIGH = 0, 1
+    FALLING, RISING, BOTH = 32, 31, 33
+
+    def __init__(self):
+        self.mode = None
+        self.levels = {}
+        # pin -> (edge, callback, bouncetime ms)
+        self.event_detects = {}
+        self.last_edge_time = {}
+        self.lock = threading.Lock()
+        self.num_reads = 0
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=PUD_OFF):
+        self.levels.setdefault(pin, self.HIGH if pull_up_down == self.PUD_UP else self.LOW)
+
+    def input(self, pin):
+        self.num_reads += 1
+        return self.levels[pin]
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=0):
+        if pin in self.event_detects:
+            raise RuntimeError(f'edge detection already enabled for pin {pin}')
+        self.event_detects[pin] = edge, callback, bouncetime
+
+    def remove_event_detect(self, pin):
+        self.event_detects.pop(pin, None)
+        self.last_edge_time.pop(pin, None)
+
+    def cleanup(self, pins=None):
+        for pin in list(self.event_detects) if pins is None else pins:
+            self.remove_event_detect(pin)
+
+    def set_input(self, pin, level, timestamp=None):
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self.lock:
+            if self.levels.get(pin) == level:
+                return
+            self.levels[pin] = level
+            if pin not in self.event_detects:
+                return
+            edge, callback, bouncetime = self.event_detects[pin]
+            if edge != self.BOTH and edge != (self.RISING if level else self.FALLING):
+                return
+            last_time = self.last_edge_time.get(pin)
+            if last_time is not None and (timestamp - last_time) * 1000 < bouncetime:
+                return
+            self.last_edge_time[pin] = timestamp
+        if callback is not None:
+            callback(pin)
+
+    def press(self, pin, bounces=0, bounce_interval=0.001, timestamp=None):
+        # a press of a button pulled up, chattering bounces times before it settles low
+        self.set_edges(pin, self.LOW, bounces, bounce_interval, timestamp)
+
+    def release(self, pin, bounces=0, bounce_interval=0.001, timestamp=None):
+        self.set_edges(pin, self.HIGH, bounces, bounce_interval, timestamp)
+
+    def set_edges(self, pin, level, bounces, bounce_interval, timestamp):
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        for i in range(2 * bounces + 1):
+            # alternate the levels, ending on level
+            self.set_input(pin, level if i % 2 == 0 else 1 - level, timestamp)
+            timestamp += bounce_interval
@@ -0,0 +1,118 @@
+import math
+import struct
+import time
+from mpu9250 import MPU9250
+
+
+class FakeSMBus:
+    """
+    Stand-in for smbus2.SMBus holding the registers of an MPU9250 at rest, for running the
+    imu code off the Pi. set_accel, set_gyro and set_magnetometer write readings in the
+    units MPU9250 returns them in, latency emulates the time of one bus transaction.
+    With the FIFO enabled, the current readings are queued at the configured sample rate,
+    a full FIFO overwriting its oldest bytes as the chip's does
+    """
+    ACCEL_SCALE = 16384.0 / 9.80665  # lsb per m/s^2 at +-2 g
+    GYRO_SCALE = 131.0  # lsb per deg/s at +-250 dps
+    BLOCK_MAX = 32  # bytes per block read, as smbus2
+
+    def __init__(self, bus_number=1, latency=0.0):
+        self.bus_number = bus_number
+        self.latency = latency
+        # 256 registers per device address
+        self.registers = {}
+        self.fifo = bytearray()
+        self.fifo_time = time.perf_counter()
+        self.set_accel(0.0, 0.0, 9.80665)
+        self.set_gyro(0.0, 0.0, 0.0)
+
+    def get_registers(self, device):
+        if device not in self.registers:
+            self.registers[device] = bytearray(256)
+        return self.registers[device]
+
+    def write_words(self, device, register, values, byte_order='>'):
+        # signed 16 bit words, clamped like a saturated sensor
+        words = [max(-0x8000, min(0x7FFF, int(round(value)))) for value in values]
+        self.get_registers(device)[register: register + 2 * len(words)] = struct.pack(
+            f'{byte_order}{len(words)}h', *words
+        )
+
+    def set_accel(self, ax, ay, az):
+        self.write_words(
+            MPU9250.MPU9250_ADDR, MPU9250.ACCEL_XOUT_H, [v * self.ACCEL_SCALE for v in (ax, ay, az)]
+        )
+
+    def set_gyro(self, gx, gy, gz):
+        self.write_words(
+            MPU9250.MPU9250_ADDR, MPU9250.GYRO_XOUT_H, [v * self.GYRO_SCALE for v in (gx, gy, gz)]
+        )
+
+    def set_magnetometer(self, mx, my, mz):
+        # raw AK8963 readings, in its own axes and byte order
+        self.write_words(
+            MPU9250.MAGNETOMETER_ADDR, MPU9250.MAGNETOMETER_DATA_ADDR, (mx, my, mz), '<'
+        )
+
+    def set_tilt(self, roll, pitch):
+        # gravity as seen by the accelerometer at roll and pitch degrees
+        roll, pitch = math.radians(roll), math.radians(pitch)
+        g = 9.80665
+        self.set_accel(
+            -g * math.sin(pitch),
+            g * math.cos(pitch) * math.sin(roll),
+            g * math.cos(pitch) * math.cos(roll)
+        )
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def fill_fifo(self):
+        # queue the current accel and gyro registers for every sample period elapsed
+        registers = self.get_registers(MPU9250.MPU9250_ADDR)
+        now = time.perf_counter()
+        if not (registers[MPU9250.USER_CTRL] & MPU9250.USER_CTRL_FIFO_EN and
+                registers[MPU9250.FIFO_EN] == MPU9250.FIFO_EN_ACCEL_GYRO):
+            self.fifo_time = now
+            return
+        rate = 1000 / (1 + registers[MPU9250.SMPLRT_DIV])
+        num_samples = int((now - self.fifo_time) * rate)
+        self.fifo_time += num_samples / rate
+        # more records than fit leave the same bytes behind as the fitting ones
+        num_samples = min(num_samples, MPU9250.FIFO_SIZE // MPU9250.FIFO_RECORD_SIZE + 1)
+        start = MPU9250.ACCEL_XOUT_H
+        record = registers[start: start + 6] + registers[start + 8: start + 14]
+        self.fifo += record * num_samples
+        # a full FIFO overwrites its oldest bytes, cutting the oldest record left short
+        del self.fifo[:max(0, len(self.fifo) - MPU9250.FIFO_SIZE)]
+
+    def write_byte_data(self, device, register, value):
+        self.wait()
+        self.get_registers(device)[register] = value & 0xFF
+        if device == MPU9250.MPU9250_ADDR and register == MPU9250.USER_CTRL:
+            if value & MPU9250.USER_CTRL_FIFO_RST:
+                self.fifo.clear()
+                self.fifo_time = time.perf_counter()
+            self.fill_fifo()
+
+    def read_byte_data(self, device, register):
+        return self.read_i2c_block_data(device, register, 1)[0]
+
+    def read_i2c_block_data(self, device, register, length):
+        if length > self.BLOCK_MAX:
+            raise ValueError(f'block reads are limited to {self.BLOCK_MAX} bytes')
+        self.wait()
+        if device == MPU9250.MPU9250_ADDR:
+            if register == MPU9250.FIFO_COUNTH:
+                self.fill_fifo()
+                return list(struct.pack('>H', len(self.fifo)))[:length]
+            if register == MPU9250.FIFO_R_W:
+                # the fifo register doesn't auto-increment: a block read pops the queue
+                data = self.fifo[:length].ljust(length, b'\0')
+                del self.fifo[:length]
+                return list(data)
+        return list(self.get_registers(device)[register: register + length])
+
+    def close(self):
+        pass
@@ -0,0 +1,24 @@
+from settings import TICK_RATE, SYNC_PULSE, SOUND_PULSE
+
+
+class FixedStep:
+    """
+    The simulation clock of the apps an engine runs in (Game, HeadlessApp, the benchmark
+    App): ticks of tick_time ms, the game objects stepping by delta_time, one tick, and the
+    animation and sound triggers they read set every so many ticks. step runs one tick
+    """
+    def __init__(self, tick_rate=TICK_RATE):
+        self.tick_time = 1000 / tick_rate
+        self.delta_time = self.tick_time
+        self.num_ticks = 0
+        # animation steps and attack sounds every so many ticks
+        self.anim_trigger = False
+        self.anim_ticks = max(1, round(SYNC_PULSE / self.tick_time))
+        self.sound_trigger = False
+        self.sound_ticks = max(1, round(SOUND_PULSE / self.tick_time))
+
+    def step(self, engine):
+        self.anim_trigger = self.num_ticks % self.anim_ticks == 0
+        self.sound_trigger = self.num_ticks % self.sound_ticks == 0
+        engine.update()
+        self.num_ticks += 1
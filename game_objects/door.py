@@ -6,12 +6,23 @@ class Door(GameObject):
     def __init__(self, level_map, tex_id, x, z):
         super().__init__(level_map, tex_id, x, z)
         self.level_map = level_map
+        self.tile_pos = x, z
         #
         self.rot = self.get_rot(x, z)
-        self.m_model = self.get_model_matrix()
         #
-        self.is_closed = True
+        self._is_closed = True
         self.is_moving = False
+        #
+        level_map.door_instances.add(self)
+
+    @property
+    def is_closed(self):
+        return self._is_closed
+
+    @is_closed.setter
+    def is_closed(self, value):
+        self._is_closed = value
+        self.level_map.grid.set_door_closed(*self.tile_pos, value)
 
     def update(self):
         if not self.is_moving:
@@ -20,12 +31,12 @@ class Door(GameObject):
         if self.is_closed and self.pos.y < WALL_SIZE - ANIM_DOOR_SPEED:
             if self.app.anim_trigger:
                 self.pos.y += ANIM_DOOR_SPEED
-                self.m_model = self.get_model_matrix()
+                self.mark_dirty()
 
         elif not self.is_closed and self.pos.y > 0:
             if self.app.anim_trigger:
                 self.pos.y -= ANIM_DOOR_SPEED
-                self.m_model = self.get_model_matrix()
+                self.mark_dirty()
         else:
             self.is_moving = False
             self.is_closed = not self.is_closed
@@ -1,9 +1,13 @@
 import glm
 from settings import H_WALL_SIZE
+from game_objects.instance_store import Instance
 
 
-class GameObject:
+class GameObject(Instance):
+    __slots__ = ('eng', 'app', 'pos', 'rot', 'scale')
+
     def __init__(self, level_map, tex_id, x, z):
+        super().__init__()
         self.eng = level_map.eng
         self.app = self.eng.app
         self.tex_id = tex_id
@@ -11,8 +15,6 @@ class GameObject:
         self.pos = glm.vec3(x + H_WALL_SIZE, 0, z + H_WALL_SIZE)  # center of the tile
         self.rot = 0
         self.scale = glm.vec3(1)
-        #
-        self.m_model: glm.mat4 = None
 
     def get_model_matrix(self):
         m_model = glm.translate(glm.mat4(), self.pos)
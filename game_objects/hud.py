@@ -1,20 +1,19 @@
 from meshes.quad_mesh import QuadMesh
-from game_objects.game_object import GameObject
+from game_objects.instance_store import Instance, InstanceStore
 from settings import *
 
 
-class HUDObject:
+class HUDObject(Instance):
     def __init__(self, hud, tex_id):
+        super().__init__()
         self.tex_id = tex_id
         self.pos = glm.vec3(HUD_SETTINGS[tex_id]['pos'], 0)
         self.rot = 0
         #
-        hud.objects.append(self)
-        #
         scale = HUD_SETTINGS[tex_id]['scale']
         self.scale = glm.vec3(scale / ASPECT_RATIO, scale, 0)
         #
-        self.m_model = GameObject.get_model_matrix(self)
+        hud.instances.add(self)
 
 
 class HUD:
@@ -22,7 +21,7 @@ class HUD:
         self.eng = eng
         self.app = eng.app
         #
-        self.objects = []
+        self.instances = InstanceStore()
         #
         self.health = HUDObject(self, ID.MED_KIT)
         self.ammo = HUDObject(self, ID.AMMO)
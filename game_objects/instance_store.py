@@ -0,0 +1,183 @@
+import numpy as np
+
+
+class Instance:
+    """
+    Object drawn through an InstanceStore: it keeps pos, rot and scale as glm values,
+    marks its slot dirty after changing them and writes its tex_id through to the store
+    """
+    __slots__ = ('instances', 'slot', '_tex_id')
+
+    def __init__(self):
+        self.instances: InstanceStore = None
+        self.slot = -1
+        self._tex_id = 0
+
+    @property
+    def tex_id(self):
+        # the store may have been written to directly, see InstanceStore.set_tex_ids
+        if self.instances is not None:
+            return self.instances.tex_id[self.slot].item()
+        return self._tex_id
+
+    @tex_id.setter
+    def tex_id(self, value):
+        self._tex_id = value
+        if self.instances is not None:
+            self.instances.set_tex_id(self.slot, value)
+
+    def mark_dirty(self):
+        if self.instances is not None:
+            self.instances.is_dirty[self.slot] = True
+
+
+class InstanceStore:
+    """
+    Struct-of-arrays store of the instances drawn by one InstancedQuadMesh. Slots are
+    packed, model matrices are rebuilt in one vectorized pass for the dirty slots only,
+    and the range of slots changed since the last upload is kept for the mesh. The
+    positions at the start of the last simulation tick are kept too, for interpolate
+    """
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+        self.objects = []
+        #
+        self.pos = np.zeros((capacity, 3), dtype='float32')
+        self.rot = np.zeros(capacity, dtype='float32')
+        self.scale = np.ones((capacity, 3), dtype='float32')
+        self.tex_id = np.zeros(capacity, dtype='int32')
+        # model matrices in opengl column-major order, m_model[slot, column, row]
+        self.m_model = np.zeros((capacity, 4, 4), dtype='float32')
+        self.is_dirty = np.zeros(capacity, dtype='bool')
+        # moved through move(): the position is already in self.pos
+        self.is_moved = np.zeros(capacity, dtype='bool')
+        # positions as of save_state, and the slots whose m_model interpolate last moved
+        self.prev_pos = np.zeros((capacity, 3), dtype='float32')
+        self.is_interpolated = np.zeros(capacity, dtype='bool')
+        # slots [upload_first, upload_last) changed since the last take_upload_range
+        self.upload_first, self.upload_last = capacity, 0
+        # bumped when the arrays are reallocated and the gpu buffers must grow
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.objects)
+
+    def grow(self):
+        self.capacity *= 2
+        for name in ('pos', 'rot', 'scale', 'tex_id', 'm_model', 'is_dirty', 'is_moved',
+                     'prev_pos', 'is_interpolated'):
+            old = getattr(self, name)
+            new = np.zeros((self.capacity, *old.shape[1:]), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self.generation += 1
+
+    def add(self, obj):
+        slot = len(self.objects)
+        if slot == self.capacity:
+            self.grow()
+        self.tex_id[slot] = obj.tex_id
+        # nothing to interpolate from before the object appeared
+        self.prev_pos[slot] = obj.pos
+        self.is_interpolated[slot] = False
+        self.objects.append(obj)
+        obj.instances, obj.slot = self, slot
+        #
+        self.is_dirty[slot] = True
+
+    def remove(self, obj):
+        # the last slot moves into the freed one to keep the slots packed
+        obj._tex_id = obj.tex_id
+        slot, last = obj.slot, len(self.objects) - 1
+        moved = self.objects.pop()
+        if slot != last:
+            self.objects[slot] = moved
+            moved.slot = slot
+            for array in (self.pos, self.rot, self.scale, self.tex_id, self.m_model,
+                          self.is_dirty, self.is_moved, self.prev_pos, self.is_interpolated):
+                array[slot] = array[last]
+            self.mark_upload(slot, slot + 1)
+        obj.instances, obj.slot = None, -1
+
+    def set_tex_id(self, slot, tex_id):
+        if self.tex_id[slot] != tex_id:
+            self.tex_id[slot] = tex_id
+            self.mark_upload(slot, slot + 1)
+
+    def set_tex_ids(self, slots, tex_ids):
+        is_changed = self.tex_id[slots] != tex_ids
+        if is_changed.any():
+            changed = slots[is_changed]
+            self.tex_id[changed] = tex_ids[is_changed]
+            self.mark_upload(int(changed.min()), int(changed.max()) + 1)
+
+    def move(self, slots, pos):
+        # new positions of many slots at once, without reading them back from the objects
+        self.pos[slots] = pos
+        self.is_moved[slots] = True
+
+    def mark_upload(self, first, last):
+        self.upload_first = min(self.upload_first, first)
+        self.upload_last = max(self.upload_last, last)
+
+    def take_upload_range(self):
+        first, last = self.upload_first, min(self.upload_last, len(self.objects))
+        self.upload_first, self.upload_last = self.capacity, 0
+        return first, last
+
+    @staticmethod
+    def get_model_matrices(pos, rot, scale):
+        # translate * rotate around y * scale, as GameObject.get_model_matrix
+        cos, sin = np.cos(rot), np.sin(rot)
+        m_model = np.zeros((len(pos), 4, 4), dtype='float32')
+        m_model[:, 0, 0] = cos * scale[:, 0]
+        m_model[:, 0, 2] = -sin * scale[:, 0]
+        m_model[:, 1, 1] = scale[:, 1]
+        m_model[:, 2, 0] = sin * scale[:, 2]
+        m_model[:, 2, 2] = cos * scale[:, 2]
+        m_model[:, 3, :3] = pos
+        m_model[:, 3, 3] = 1.0
+        return m_model
+
+    def update(self):
+        n = len(self.objects)
+        slots = np.flatnonzero(self.is_dirty[:n] | self.is_moved[:n])
+        if not len(slots):
+            return None
+
+        for slot in np.flatnonzero(self.is_dirty[:n]).tolist():
+            obj = self.objects[slot]
+            self.pos[slot] = obj.pos
+            self.rot[slot] = obj.rot
+            self.scale[slot] = obj.scale
+
+        self.m_model[slots] = self.get_model_matrices(
+            self.pos[slots], self.rot[slots], self.scale[slots]
+        )
+        self.is_dirty[slots] = self.is_moved[slots] = self.is_interpolated[slots] = False
+        self.mark_upload(int(slots[0]), int(slots[-1]) + 1)
+
+    def save_state(self):
+        # at the start of every simulation tick
+        self.update()
+        n = len(self.objects)
+        self.prev_pos[:n] = self.pos[:n]
+
+    def interpolate(self, alpha):
+        # model matrices of the slots that moved in the last tick, alpha of the way from
+        # their saved positions, for the render between this tick and the next one. The
+        # simulation state in self.pos is left as it is
+        self.update()
+        n = len(self.objects)
+        is_moving = (self.prev_pos[:n] != self.pos[:n]).any(axis=1)
+        # slots interpolated by the last render that have since stopped get their matrices back
+        slots = np.flatnonzero(is_moving | self.is_interpolated[:n])
+        if not len(slots):
+            return None
+
+        pos = self.pos[slots]
+        # alpha 1 gives the current positions exactly
+        pos = pos + (self.prev_pos[slots] - pos) * np.float32(1.0 - alpha)
+        self.m_model[slots] = self.get_model_matrices(pos, self.rot[slots], self.scale[slots])
+        self.is_interpolated[:n] = is_moving
+        self.mark_upload(int(slots[0]), int(slots[-1]) + 1)
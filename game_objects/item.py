@@ -9,4 +9,4 @@ class Item(GameObject):
 
         self.scale = glm.vec3(ITEM_SETTINGS[tex_id]['scale'])
         #
-        self.m_model = self.get_model_matrix()
+        level_map.item_instances.add(self)
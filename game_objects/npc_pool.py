@@ -0,0 +1,303 @@
+import random
+import numpy as np
+from settings import NPC_SETTINGS, WEAPON_SETTINGS, H_WALL_SIZE, TICK_RATE, BASE_TICK_RATE
+from level_grid import LevelGrid
+from game_objects.item import Item
+
+STATES = ('walk', 'attack', 'hurt', 'death')
+WALK, ATTACK, HURT, DEATH = range(len(STATES))
+
+
+class PoolField:
+    # attribute of an npc view that lives in a column of its pool
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, npc, owner=None):
+        if npc is None:
+            return self
+        return getattr(npc.pool, self.name)[npc.row].item()
+
+    def __set__(self, npc, value):
+        getattr(npc.pool, self.name)[npc.row] = value
+
+
+class NPCPool:
+    """
+    Struct-of-arrays state of every npc of a level, one row per npc. update() runs the
+    state machine, animation counters and movement of all npcs as array operations.
+    Sounds, hit rolls, doors and dropped items stay per npc, for the rows that need them
+    """
+    COLUMNS = {
+        # name: (dtype, shape of a row)
+        'npc_id': ('int32', ()),
+        'slot': ('int32', ()),
+        'pos': ('float32', (3,)),
+        'tile': ('int32', (2,)),
+        # npc settings
+        'speed': ('float32', ()),
+        'size': ('float64', ()),
+        'attack_dist': ('float32', ()),
+        'damage': ('int32', ()),
+        'hit_probability': ('float64', ()),
+        'anim_periods': ('int32', ()),
+        'drop_item': ('int32', ()),
+        'num_frames_by_state': ('int32', (len(STATES),)),
+        'state_tex_id_by_state': ('int32', (len(STATES),)),
+        # current state
+        'health': ('int32', ()),
+        'state': ('int8', ()),
+        'num_frames': ('int32', ()),
+        'state_tex_id': ('int32', ()),
+        'frame': ('int32', ()),
+        'anim_counter': ('int32', ()),
+        'is_animate': ('bool', ()),
+        'is_alive': ('bool', ()),
+        'is_hurt': ('bool', ()),
+        'is_player_spotted': ('bool', ()),
+        'has_path': ('bool', ()),
+        'path_to_player': ('int32', (2,)),
+        # line of sight to the player for this frame: -1 until traced, then 0 or 1
+        'player_in_sight': ('int8', ()),
+    }
+
+    def __init__(self, eng, level_map, capacity=16):
+        self.eng = eng
+        self.app = eng.app
+        self.level_map = level_map
+        self.player = eng.player
+        self.sound = eng.sound
+        self.play = eng.sound.play
+        #
+        self.num_npcs = 0
+        self.capacity = capacity
+        for name, (dtype, shape) in self.COLUMNS.items():
+            setattr(self, name, np.zeros((capacity, *shape), dtype=dtype))
+
+    def __len__(self):
+        return self.num_npcs
+
+    def grow(self):
+        self.capacity *= 2
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros((self.capacity, *old.shape[1:]), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, npc_id, x, z):
+        if self.num_npcs == self.capacity:
+            self.grow()
+        row = self.num_npcs
+        self.num_npcs += 1
+        #
+        settings = NPC_SETTINGS[npc_id]
+        self.npc_id[row] = npc_id
+        self.pos[row] = x + H_WALL_SIZE, 0, z + H_WALL_SIZE
+        self.tile[row] = x, z
+        for name in ('speed', 'size', 'attack_dist', 'damage', 'anim_periods', 'health'):
+            getattr(self, name)[row] = settings[name]
+        # hit chance per tick, rolled every tick: the same chance per second at any tick rate
+        self.hit_probability[row] = 1 - (1 - settings['hit_probability']) ** (
+            BASE_TICK_RATE / TICK_RATE
+        )
+        self.drop_item[row] = -1 if settings['drop_item'] is None else settings['drop_item']
+        self.num_frames_by_state[row] = [settings['num_frames'][state] for state in STATES]
+        self.state_tex_id_by_state[row] = [settings['state_tex_id'][state] for state in STATES]
+        #
+        self.frame[row] = self.anim_counter[row] = 0
+        self.is_animate[row] = self.is_alive[row] = True
+        self.is_hurt[row] = self.is_player_spotted[row] = self.has_path[row] = False
+        self.player_in_sight[row] = -1
+        self.set_state(np.array([row]), WALK)
+        return row
+
+    def set_state(self, rows, state):
+        self.state[rows] = state
+        self.num_frames[rows] = self.num_frames_by_state[rows, state]
+        self.state_tex_id[rows] = self.state_tex_id_by_state[rows, state]
+        self.frame[rows] %= self.num_frames[rows]
+
+    def update(self):
+        n = self.num_npcs
+        if not n:
+            return None
+        self.update_visibility()
+        #
+        is_hurt = self.is_hurt[:n]
+        is_active = ~is_hurt & (self.health[:n] > 0)
+        self.set_state(np.flatnonzero(is_hurt), HURT)
+
+        rows = np.flatnonzero(is_active)
+        if len(rows):
+            self.tile[rows] = self.pos[rows][:, [0, 2]].astype('int32')
+            self.ray_to_player(rows)
+            self.get_path_to_player(rows)
+            is_attacking = self.attack(rows)
+            self.move_to_player(rows[~is_attacking])
+
+        dead = np.flatnonzero(~is_hurt & ~is_active)
+        self.is_alive[dead] = False
+        self.set_state(dead, DEATH)
+        #
+        self.animate()
+        # set current texture
+        instances = self.level_map.npc_instances
+        instances.set_tex_ids(self.slot[:n], self.state_tex_id[:n] + self.frame[:n])
+        #
+        self.player_in_sight[:n] = -1
+
+    def get_dist_to_player(self, rows):
+        to_player = np.array(self.player.position.xz, dtype='float32') - self.pos[rows][:, [0, 2]]
+        return np.sqrt((to_player * to_player).sum(axis=1))
+
+    def update_visibility(self):
+        # one batched ray cast for every npc that will look for the player this frame:
+        # not hurt or dying, and either not spotted it yet or within attack distance
+        n = self.num_npcs
+        rows = np.flatnonzero(~self.is_hurt[:n] & (self.health[:n] > 0))
+        is_near = self.get_dist_to_player(rows) <= self.attack_dist[rows]
+        rows = rows[~self.is_player_spotted[rows] | is_near]
+        self.trace_player(rows)
+
+    def trace_player(self, rows):
+        if not len(rows):
+            return None
+        origins = self.pos[rows]
+        to_player = np.array(self.player.position, dtype='float32') - origins
+        directions = to_player / np.sqrt((to_player * to_player).sum(axis=1))[:, None]
+        self.player_in_sight[rows] = self.eng.ray_casting.run_batch(origins, directions)
+
+    def is_player_in_sight(self, rows):
+        self.trace_player(rows[self.player_in_sight[rows] == -1])
+        return self.player_in_sight[rows] == 1
+
+    def ray_to_player(self, rows):
+        rows = rows[~self.is_player_spotted[rows]]
+        spotted = rows[self.is_player_in_sight(rows)]
+        self.is_player_spotted[spotted] = True
+        #
+        for npc_id in self.npc_id[spotted].tolist():
+            self.play(self.sound.spotted[npc_id])
+
+    def get_path_to_player(self, rows):
+        rows = rows[self.is_player_spotted[rows]]
+        if not len(rows):
+            return None
+        self.path_to_player[rows] = self.eng.path_finder.next_steps(
+            start_tiles=self.tile[rows],
+            end_pos=self.player.tile_pos
+        )
+        self.has_path[rows] = True
+
+    def attack(self, rows):
+        # mask over rows of the npcs attacking this tick, which then don't move
+        is_attacking = self.is_player_spotted[rows].copy()
+        is_attacking[is_attacking] = (
+            self.get_dist_to_player(rows[is_attacking]) <= self.attack_dist[rows[is_attacking]]
+        )
+        is_attacking[is_attacking] = self.is_player_in_sight(rows[is_attacking])
+        attackers = rows[is_attacking]
+        self.set_state(attackers, ATTACK)
+
+        # hit rolls in npc order, as the npcs did one by one
+        for row in attackers.tolist():
+            if self.app.sound_trigger:
+                self.play(self.sound.enemy_attack[int(self.npc_id[row])])
+
+            if random.random() < self.hit_probability[row]:
+                self.player.health -= int(self.damage[row])
+                self.player.damage_taken += int(self.damage[row])
+                #
+                self.play(self.sound.player_hurt)
+        return is_attacking
+
+    def move_to_player(self, rows):
+        rows = rows[self.has_path[rows]]
+        if not len(rows):
+            return None
+
+        # set state
+        self.set_state(rows, WALK)
+
+        # step to player
+        pos = self.pos[rows]
+        to_step = (self.path_to_player[rows] + H_WALL_SIZE).astype('float32') - pos[:, [0, 2]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dir_vec = to_step / np.sqrt((to_step * to_step).sum(axis=1))[:, None]
+        delta_vec = dir_vec * self.speed[rows, None] * np.float32(self.app.delta_time)
+
+        # collisions, x first then z from the new x, as two single-axis moves
+        is_free = ~self.is_collide(rows, pos, dx=delta_vec[:, 0])
+        pos[is_free, 0] += delta_vec[is_free, 0]
+        is_free = ~self.is_collide(rows, pos, dz=delta_vec[:, 1])
+        pos[is_free, 2] += delta_vec[is_free, 1]
+        self.pos[rows] = pos
+
+        # open door
+        grid = self.level_map.grid
+        tiles = self.tile[rows]
+        on_door = grid.flags[tiles[:, 0], tiles[:, 1]] & LevelGrid.DOOR
+        for tile_pos in tiles[on_door.astype('bool')].tolist():
+            door = self.level_map.door_map[tuple(tile_pos)]
+            if door.is_closed and not door.is_moving:
+                door.is_moving = True
+                #
+                self.play(self.sound.open_door)
+
+        # translate
+        self.level_map.npc_instances.move(self.slot[rows], pos)
+
+    def is_collide(self, rows, pos, dx=0.0, dz=0.0):
+        # float64 like the python floats of the per-npc test
+        size = self.size[rows]
+        pos = pos.astype('float64')
+        x = (pos[:, 0] + dx + np.sign(dx) * size).astype('int64')
+        z = (pos[:, 2] + dz + np.sign(dz) * size).astype('int64')
+        #
+        grid = self.level_map.grid
+        inside = (x >= 0) & (x < grid.width) & (z >= 0) & (z < grid.depth)
+        flags = np.zeros(len(rows), dtype='uint8')
+        flags[inside] = grid.flags[x[inside], z[inside]]
+        #
+        tiles = self.tile[rows]
+        is_own_tile = (x == tiles[:, 0]) & (z == tiles[:, 1])
+        return (flags & LevelGrid.WALL != 0) | ((flags & LevelGrid.NPC != 0) & ~is_own_tile)
+
+    def animate(self):
+        if not self.app.anim_trigger:
+            return None
+
+        rows = np.flatnonzero(self.is_animate[:self.num_npcs])
+        self.anim_counter[rows] += 1
+        #
+        rows = rows[self.anim_counter[rows] == self.anim_periods[rows]]
+        self.anim_counter[rows] = 0
+        self.frame[rows] = (self.frame[rows] + 1) % self.num_frames[rows]
+        #
+        was_hurt = self.is_hurt[rows]
+        self.is_hurt[rows[was_hurt]] = False
+        #
+        rows = rows[~was_hurt]
+        died = rows[~self.is_alive[rows] & (self.frame[rows] == self.num_frames[rows] - 1)]
+        self.is_animate[died] = False
+        for row in died.tolist():
+            self.to_drop_item(row)
+            #
+            self.play(self.eng.sound.death[int(self.npc_id[row])])
+
+    def to_drop_item(self, row):
+        if self.drop_item[row] == -1:
+            return None
+        tile_pos = tuple(self.tile[row].tolist())
+        item_map = self.level_map.item_map
+        if tile_pos in item_map:
+            self.level_map.item_instances.remove(item_map[tile_pos])
+        item_map[tile_pos] = Item(self.level_map, int(self.drop_item[row]), x=tile_pos[0], z=tile_pos[1])
+        self.level_map.grid.set_item(*tile_pos, True)
+
+    def get_damage(self, row):
+        self.health[row] -= WEAPON_SETTINGS[self.player.weapon_id]['damage']
+        self.is_hurt[row] = True
+        #
+        self.is_player_spotted[row] = True
@@ -0,0 +1,75 @@
+import threading
+import pygame as pg
+
+
+class GPIOInput:
+    """
+    Follows the buttons through edge interrupts instead of polling the pins. RPi.GPIO
+    debounces every pin in its driver (bouncetime) and calls on_edge from its event
+    thread, which records the new level and posts a press or release pygame event.
+    update takes one snapshot of the levels per frame, so every is_pressed check in a
+    frame agrees. Buttons pull up: a pressed button reads low
+    """
+    def __init__(self, gpio, pins, press_event, release_event, bounce_time=100):
+        self.gpio = gpio
+        self.pins = tuple(pins)
+        self.press_event = press_event
+        self.release_event = release_event
+        self.bounce_time = bounce_time  # ms
+        # latest level of every pin, written on the gpio thread
+        self.levels = {pin: gpio.HIGH for pin in self.pins}
+        self.lock = threading.Lock()
+        # pressed state of every pin as of the last update
+        self.snapshot = {pin: False for pin in self.pins}
+        self.num_edges = 0
+        self.num_events = 0
+        self.is_started = False
+
+    def start(self):
+        if self.is_started:
+            return
+        self.gpio.setmode(self.gpio.BCM)
+        for pin in self.pins:
+            self.gpio.setup(pin, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+            self.levels[pin] = self.gpio.input(pin)
+            self.gpio.add_event_detect(
+                pin, self.gpio.BOTH, callback=self.on_edge, bouncetime=self.bounce_time
+            )
+        self.is_started = True
+        self.update()
+
+    def stop(self):
+        if not self.is_started:
+            return
+        for pin in self.pins:
+            self.gpio.remove_event_detect(pin)
+        self.is_started = False
+
+    def on_edge(self, pin):
+        self.num_edges += 1
+        self.set_level(pin, self.gpio.input(pin))
+        # the driver drops edges within bouncetime of this one, and with them the edge of
+        # a release that quick: look at the pin again once it has settled
+        timer = threading.Timer(self.bounce_time / 1000, self.settle, args=(pin,))
+        timer.daemon = True
+        timer.start()
+
+    def settle(self, pin):
+        self.set_level(pin, self.gpio.input(pin))
+
+    def set_level(self, pin, level):
+        with self.lock:
+            if level == self.levels[pin]:
+                return
+            self.levels[pin] = level
+        self.num_events += 1
+        pg.event.post(pg.event.Event(
+            self.press_event if level == self.gpio.LOW else self.release_event, pin=pin
+        ))
+
+    def update(self):
+        # once per frame, before the events are handled
+        self.snapshot = {pin: level == self.gpio.LOW for pin, level in self.levels.items()}
+
+    def is_pressed(self, pin):
+        return self.snapshot[pin]
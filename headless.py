@@ -0,0 +1,223 @@
+"""
+Headless simulation: a level played by a scripted player with no window, gl context,
+mixer or hardware, stepped at TICK_RATE as fast as the cpu allows, for balancing runs on
+machines without a display.
+
+    python -m headless [--level 0] [--ticks 36000] [--seed 0]
+"""
+import argparse
+import math
+import random
+import time
+import glm
+import pygame as pg
+from camera import get_angle_diff
+from controls import Controls
+from engine import Engine
+from fixed_step import FixedStep
+from imu_fusion import get_quaternion
+from level_map import LevelMap
+from level_prefetcher import LevelPrefetcher
+from path_finding import PathFinder
+from player import Player, PlayerAttribs
+from ray_casting import RayCasting
+from sound import SilentSound
+from world import World
+from settings import KEYS, ID, WEAPON_SETTINGS, TICK_RATE, GPIO_PINS
+
+
+class HeadlessApp(FixedStep):
+    """
+    The part of Game the simulation reads, with game time counted in ticks
+    """
+    def __init__(self):
+        super().__init__(TICK_RATE)
+        self.time = 0.0
+        self.fps_value = 0
+
+    def tick(self, engine):
+        self.step(engine)
+        self.time = self.num_ticks * self.tick_time * 0.001
+
+
+class HeadlessEngine(Engine):
+    """
+    Engine without rendering: no textures, shaders or Scene, silent sound and the player
+    steered by the given controls. Levels load and tick as in Engine, through load_level
+    and update_world. The next level is not prefetched, going through the key door loads
+    it synchronously
+    """
+    def __init__(self, controls, num_level=0):
+        self.app = HeadlessApp()
+        self.ctx = None
+        self.sound = SilentSound()
+        self.level_prefetcher = LevelPrefetcher()
+        self.controls = controls
+
+        self.player_attribs = PlayerAttribs()
+        self.player_attribs.num_level = num_level
+        self.player: Player = None
+        self.level_map: LevelMap = None
+        self.ray_casting: RayCasting = None
+        self.path_finder: PathFinder = None
+        self.world: World = None
+        self.new_game()
+
+    def new_game(self):
+        self.player = Player(self)
+        self.load_level()
+
+    def prefetch_next_level(self):
+        pass
+
+    def update(self):
+        self.update_world()
+
+    def get_num_alive(self):
+        pool = self.level_map.npc_pool
+        return int(pool.is_alive[:len(pool)].sum())
+
+
+def key_event(key):
+    return pg.event.Event(pg.KEYDOWN, key=key)
+
+
+class Bot(Controls):
+    """
+    Scripted player: heads for the nearest live npc along PathFinder's paths, turning at
+    most turn_speed (rad/s), opens the doors on the way, fires whenever an npc is in the
+    line of fire and goes back to the knife when out of ammo. It steers the way the game
+    is played, through the imu heading and the forward key. think is called before every
+    tick and returns the events of the tick
+    """
+    KNIFE_REACH = 1.0
+
+    def __init__(self, turn_speed=math.radians(360)):
+        super().__init__(KEYS.values(), GPIO_PINS)
+        self.turn_speed = turn_speed
+
+    def think(self, eng):
+        player = eng.player
+        events = []
+        self.pressed_keys = frozenset()
+        npcs = [npc for npc in eng.level_map.npc_list if npc.is_alive]
+        if not npcs:
+            return events
+
+        if player.weapon_id != ID.KNIFE_0 and (
+                player.ammo < WEAPON_SETTINGS[player.weapon_id]['ammo_consumption']):
+            events.append(key_event(KEYS['WEAPON_1']))
+            weapon_id = ID.KNIFE_0
+        else:
+            weapon_id = player.weapon_id
+        max_dist = WEAPON_SETTINGS[weapon_id]['max_dist']
+        # fire once the view lines up with an npc
+        if not player.is_shot and eng.ray_casting.run(
+                player.position, player.forward, max_dist, npc_to_player_flag=False):
+            events.append(pg.event.Event(pg.MOUSEBUTTONDOWN, button=1))
+
+        position = player.position.xz
+        target = min(npcs, key=lambda npc: glm.distance2(npc.pos.xz, position))
+        to_target = target.pos.xz - position
+        dist = glm.length(to_target)
+        direction = glm.vec3(to_target.x, 0, to_target.y) / max(dist, 1e-6)
+        door = None
+        if dist <= max_dist and eng.ray_casting.run(
+                player.position, direction, max_dist,
+                npc_to_player_flag=False) == target.tile_pos:
+            aim = target.pos.xz
+            is_walking = weapon_id == ID.KNIFE_0 and dist > self.KNIFE_REACH
+        else:
+            step = self.get_step(eng, (int(position.x), int(position.y)), target.tile_pos)
+            aim = glm.vec2(step) + 0.5
+            is_walking = True
+            door = eng.level_map.door_map.get(tuple(step))
+
+        # turn towards the aim, walking once roughly facing it
+        diff = get_angle_diff(math.atan2(aim.y - position.y, aim.x - position.x), player.yaw)
+        max_turn = self.turn_speed * eng.app.tick_time * 0.001
+        yaw = player.yaw + max(-max_turn, min(max_turn, diff))
+        imu_yaw = player.imu_yaw_offset - yaw
+        self.orientation = (0.0, 0.0, math.degrees(imu_yaw))
+        self.quaternion = tuple(get_quaternion(0.0, 0.0, imu_yaw))
+        is_facing = abs(diff) < math.radians(30)
+        if is_walking and is_facing:
+            self.pressed_keys = frozenset((KEYS['FORWARD'],))
+        # the key door would take the player to the next level
+        if door is not None and door.is_closed and not door.is_moving and is_facing and not (
+                player.key and door.tex_id == ID.KEY_DOOR):
+            events.append(key_event(KEYS['INTERACT']))
+        return events
+
+    @staticmethod
+    def get_step(eng, start_pos, end_pos):
+        # next tile from start_pos towards end_pos, down the flow field the npcs follow to
+        # the player from end_pos, built for them anyway
+        path_finder, grid = eng.path_finder, eng.level_map.grid
+        if start_pos != path_finder.flow_goal:
+            path_finder.update_flow_field(start_pos)
+        start, node = grid.index(*start_pos), grid.index(*end_pos)
+        if node == start or path_finder.flow_dist[node] == -1:
+            return end_pos
+        while (next_node := int(path_finder.flow_field[node])) != start:
+            node = next_node
+        return divmod(node, grid.depth)
+
+
+def run_simulation(num_level=0, max_ticks=36000, seed=0, bot=None):
+    """
+    One seeded run of a level by a bot, until the player clears it of npcs, dies or runs
+    out of ticks. Returns the outcome and the simulation speed
+    """
+    random.seed(seed)
+    bot = bot if bot is not None else Bot()
+    eng = HeadlessEngine(bot, num_level=num_level)
+    num_npcs = eng.get_num_alive()
+    is_cleared = False
+
+    start = time.perf_counter()
+    while eng.app.num_ticks < max_ticks:
+        for event in bot.think(eng):
+            eng.handle_events(event)
+        eng.app.tick(eng)
+        # checked before the next tick, where a dead player would restart the game
+        is_cleared = not eng.get_num_alive()
+        if is_cleared or eng.player.health <= 0:
+            break
+    run_time = time.perf_counter() - start
+
+    num_ticks = eng.app.num_ticks
+    return {
+        'level': num_level,
+        'seed': seed,
+        'ticks': num_ticks,
+        'is_cleared': is_cleared,
+        'is_dead': eng.player.health <= 0,
+        'time_to_clear': num_ticks / TICK_RATE if is_cleared else math.nan,
+        'damage_taken': eng.player.damage_taken,
+        'shots_fired': eng.player.num_shots,
+        'kills': num_npcs - eng.get_num_alive(),
+        'npcs': num_npcs,
+        'ticks_per_sec': num_ticks / run_time if run_time else math.inf,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--level', type=int, default=0)
+    parser.add_argument('--ticks', type=int, default=36000, help='most ticks to run')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    result = run_simulation(args.level, args.ticks, args.seed)
+    outcome = (f'cleared in {result["time_to_clear"]:.1f} s' if result['is_cleared'] else
+               'died' if result['is_dead'] else 'ran out of ticks')
+    print(f'level_{args.level}.tmx seed {args.seed}: {outcome}, {result["kills"]}/'
+          f'{result["npcs"]} npcs killed, {result["damage_taken"]} damage taken, '
+          f'{result["shots_fired"]} shots fired')
+    print(f'{result["ticks"]} ticks ({result["ticks"] / TICK_RATE:.1f} s simulated): '
+          f'{result["ticks_per_sec"]:.0f} ticks/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Orientation filters fusing gyro, accel and optionally magnetometer samples taken at a fixed
+rate into a (w, x, y, z) quaternion rotating the sensor frame into the earth frame (z up).
+Gyro rates are in rad/s, accel and magnetometer in any unit, only their directions count.
+"""
+import math
+
+
+def normalize(*v):
+    norm = math.sqrt(sum(c * c for c in v))
+    if norm == 0.0:
+        return None
+    return [c / norm for c in v]
+
+
+def get_euler_angles(quaternion):
+    # roll, pitch, yaw in radians (z, y, x order) of a quaternion
+    w, x, y, z = quaternion
+    roll = math.atan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    pitch = math.asin(max(-1.0, min(1.0, 2 * (w * y - z * x))))
+    yaw = math.atan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return roll, pitch, yaw
+
+
+def get_quaternion(roll, pitch, yaw):
+    cr, sr = math.cos(roll / 2), math.sin(roll / 2)
+    cp, sp = math.cos(pitch / 2), math.sin(pitch / 2)
+    cy, sy = math.cos(yaw / 2), math.sin(yaw / 2)
+    return [
+        cr * cp * cy + sr * sp * sy,
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+    ]
+
+
+class OrientationFilter:
+    """
+    Integrates the gyro at a fixed sample period and pulls the estimate towards the
+    direction of gravity, and of magnetic north when given. Subclasses implement the
+    correction as update(gyro, accel, mag=None), returning the new quaternion, see
+    MadgwickFilter and MahonyFilter
+    """
+    def __init__(self, sample_period):
+        self.sample_period = sample_period
+        self.quaternion = [1.0, 0.0, 0.0, 0.0]
+
+    def reset(self, accel, mag=None):
+        # start at the tilt of accel and the heading of mag, instead of converging to them
+        ax, ay, az = accel
+        roll = math.atan2(ay, az)
+        pitch = math.atan2(-ax, math.sqrt(ay * ay + az * az))
+        yaw = 0.0
+        if mag is not None and any(mag):
+            mx, my, mz = mag
+            # magnetometer rotated back to level
+            hx = (mx * math.cos(pitch) + my * math.sin(roll) * math.sin(pitch) +
+                  mz * math.cos(roll) * math.sin(pitch))
+            hy = my * math.cos(roll) - mz * math.sin(roll)
+            yaw = math.atan2(-hy, hx)
+        self.quaternion = get_quaternion(roll, pitch, yaw)
+
+    def integrate(self, q_dot):
+        q = [c + dc * self.sample_period for c, dc in zip(self.quaternion, q_dot)]
+        self.quaternion = normalize(*q) or [1.0, 0.0, 0.0, 0.0]
+        return self.quaternion
+
+    def get_rate_of_change(self, gx, gy, gz):
+        # derivative of the quaternion rotating at the gyro rates
+        q0, q1, q2, q3 = self.quaternion
+        return [
+            0.5 * (-q1 * gx - q2 * gy - q3 * gz),
+            0.5 * (q0 * gx + q2 * gz - q3 * gy),
+            0.5 * (q0 * gy - q1 * gz + q3 * gx),
+            0.5 * (q0 * gz + q1 * gy - q2 * gx),
+        ]
+
+    def get_euler_angles(self):
+        return get_euler_angles(self.quaternion)
+
+
+class MadgwickFilter(OrientationFilter):
+    """
+    Madgwick's gradient descent filter: every step moves the gyro integration by beta
+    (rad/s) down the gradient of the error between the measured and predicted gravity and
+    magnetic field directions
+    """
+    def __init__(self, sample_period, beta=0.1):
+        super().__init__(sample_period)
+        self.beta = beta
+
+    def update(self, gyro, accel, mag=None):
+        q_dot = self.get_rate_of_change(*gyro)
+        accel = normalize(*accel)
+        if accel is not None:
+            step = self.get_gradient(accel, normalize(*mag) if mag is not None else None)
+            if step is not None:
+                q_dot = [dc - self.beta * s for dc, s in zip(q_dot, step)]
+        return self.integrate(q_dot)
+
+    def get_gradient(self, accel, mag):
+        q0, q1, q2, q3 = self.quaternion
+        ax, ay, az = accel
+        # error of the gravity direction, and its jacobian
+        f = [
+            2 * (q1 * q3 - q0 * q2) - ax,
+            2 * (q0 * q1 + q2 * q3) - ay,
+            2 * (0.5 - q1 * q1 - q2 * q2) - az,
+        ]
+        j = [
+            [-2 * q2, 2 * q3, -2 * q0, 2 * q1],
+            [2 * q1, 2 * q0, 2 * q3, 2 * q2],
+            [0.0, -4 * q1, -4 * q2, 0.0],
+        ]
+        if mag is not None:
+            mx, my, mz = mag
+            # earth field in the earth frame, its horizontal part along x
+            hx = 2 * (mx * (0.5 - q2 * q2 - q3 * q3) + my * (q1 * q2 - q0 * q3) +
+                      mz * (q1 * q3 + q0 * q2))
+            hy = 2 * (mx * (q1 * q2 + q0 * q3) + my * (0.5 - q1 * q1 - q3 * q3) +
+                      mz * (q2 * q3 - q0 * q1))
+            bx = math.sqrt(hx * hx + hy * hy)
+            bz = 2 * (mx * (q1 * q3 - q0 * q2) + my * (q2 * q3 + q0 * q1) +
+                      mz * (0.5 - q1 * q1 - q2 * q2))
+            f += [
+                2 * bx * (0.5 - q2 * q2 - q3 * q3) + 2 * bz * (q1 * q3 - q0 * q2) - mx,
+                2 * bx * (q1 * q2 - q0 * q3) + 2 * bz * (q0 * q1 + q2 * q3) - my,
+                2 * bx * (q0 * q2 + q1 * q3) + 2 * bz * (0.5 - q1 * q1 - q2 * q2) - mz,
+            ]
+            j += [
+                [-2 * bz * q2, 2 * bz * q3,
+                 -4 * bx * q2 - 2 * bz * q0, -4 * bx * q3 + 2 * bz * q1],
+                [-2 * bx * q3 + 2 * bz * q1, 2 * bx * q2 + 2 * bz * q0,
+                 2 * bx * q1 + 2 * bz * q3, -2 * bx * q0 + 2 * bz * q2],
+                [2 * bx * q2, 2 * bx * q3 - 4 * bz * q1,
+                 2 * bx * q0 - 4 * bz * q2, 2 * bx * q1],
+            ]
+        # j^T f, normalized
+        return normalize(*(sum(row[i] * e for row, e in zip(j, f)) for i in range(4)))
+
+
+class MahonyFilter(OrientationFilter):
+    """
+    Mahony's complementary filter: the cross product of the measured and predicted gravity
+    and magnetic field directions feeds back into the gyro rates through a proportional
+    gain kp and an integral gain ki, which also soaks up residual gyro bias
+    """
+    def __init__(self, sample_period, kp=1.0, ki=0.0):
+        super().__init__(sample_period)
+        self.kp = kp
+        self.ki = ki
+        self.integral = [0.0, 0.0, 0.0]
+
+    def update(self, gyro, accel, mag=None):
+        gx, gy, gz = gyro
+        accel = normalize(*accel)
+        if accel is not None:
+            ex, ey, ez = self.get_error(accel, normalize(*mag) if mag is not None else None)
+            if self.ki > 0:
+                self.integral = [
+                    i + self.ki * e * self.sample_period
+                    for i, e in zip(self.integral, (ex, ey, ez))
+                ]
+            gx += self.kp * ex + self.integral[0]
+            gy += self.kp * ey + self.integral[1]
+            gz += self.kp * ez + self.integral[2]
+        return self.integrate(self.get_rate_of_change(gx, gy, gz))
+
+    def get_error(self, accel, mag):
+        q0, q1, q2, q3 = self.quaternion
+        ax, ay, az = accel
+        # predicted gravity direction in the sensor frame
+        vx = 2 * (q1 * q3 - q0 * q2)
+        vy = 2 * (q0 * q1 + q2 * q3)
+        vz = 2 * (q0 * q0 - 0.5 + q3 * q3)
+        ex, ey, ez = ay * vz - az * vy, az * vx - ax * vz, ax * vy - ay * vx
+        if mag is not None:
+            mx, my, mz = mag
+            hx = 2 * (mx * (0.5 - q2 * q2 - q3 * q3) + my * (q1 * q2 - q0 * q3) +
+                      mz * (q1 * q3 + q0 * q2))
+            hy = 2 * (mx * (q1 * q2 + q0 * q3) + my * (0.5 - q1 * q1 - q3 * q3) +
+                      mz * (q2 * q3 - q0 * q1))
+            bx = math.sqrt(hx * hx + hy * hy)
+            bz = 2 * (mx * (q1 * q3 - q0 * q2) + my * (q2 * q3 + q0 * q1) +
+                      mz * (0.5 - q1 * q1 - q2 * q2))
+            # predicted magnetic field direction in the sensor frame
+            wx = 2 * (bx * (0.5 - q2 * q2 - q3 * q3) + bz * (q1 * q3 - q0 * q2))
+            wy = 2 * (bx * (q1 * q2 - q0 * q3) + bz * (q0 * q1 + q2 * q3))
+            wz = 2 * (bx * (q0 * q2 + q1 * q3) + bz * (0.5 - q1 * q1 - q2 * q2))
+            ex += my * wz - mz * wy
+            ey += mz * wx - mx * wz
+            ez += mx * wy - my * wx
+        return ex, ey, ez
+
+
+FILTERS = {'madgwick': MadgwickFilter, 'mahony': MahonyFilter}
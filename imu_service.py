@@ -0,0 +1,204 @@
+import math
+import threading
+import time
+import numpy as np
+from imu_fusion import FILTERS, get_euler_angles
+
+
+class IMUService:
+    """
+    Samples the MPU9250 on its own thread at a fixed rate into a ring buffer of timestamped
+    accel, gyro and orientation rows, so the game loop never waits on the I2C bus.
+    get_orientation returns the latest roll, pitch and yaw without locking: the sampling
+    thread publishes every sample as a new tuple, which a reader sees whole or not at all.
+    With use_fifo, the sensor times the samples into its FIFO and the thread drains
+    fifo_samples of them at a time.
+
+    The orientation is fused by a filter of imu_fusion stepped once per sample at the
+    sample period, after the first calibration_samples have measured the gyro bias with
+    the sensor at rest; get_quaternion returns it for the camera
+    """
+    MIN_RATE, MAX_RATE = 200, 1000  # Hz
+
+    def __init__(self, mpu, sample_rate=500, buffer_size=1024, use_fifo=False, fifo_samples=8,
+                 fusion='madgwick', use_magnetometer=False, calibration_samples=500):
+        if not self.MIN_RATE <= sample_rate <= self.MAX_RATE:
+            raise ValueError(
+                f'imu sample rate {sample_rate} Hz is outside {self.MIN_RATE}-{self.MAX_RATE} Hz'
+            )
+        self.mpu = mpu
+        self.sample_rate = sample_rate
+        self.period = 1.0 / sample_rate
+        self.use_fifo = use_fifo
+        # time between reads of the bus
+        self.poll_period = self.period * (fifo_samples if use_fifo else 1)
+        #
+        self.filter = FILTERS[fusion](sample_period=self.period)
+        self.use_magnetometer = use_magnetometer
+        # the magnetometer measures at a lower rate than the samples are taken
+        self.mag_interval = max(1, round(sample_rate / mpu.MAGNETOMETER_RATE))
+        self.mag = None
+        if use_magnetometer:
+            mpu.enable_magnetometer()
+        # gyro bias in raw lsb, averaged over the samples until calibration_end
+        self.gyro_bias = (0.0, 0.0, 0.0)
+        self.calibration_samples = calibration_samples
+        self.calibration_end = 0
+        self.calibration_sums = None
+        #
+        self.buffer_size = buffer_size
+        self.timestamps = np.zeros(buffer_size, dtype='float64')  # time.perf_counter s
+        self.accel = np.zeros((buffer_size, 3), dtype='float32')  # m/s^2
+        self.gyro = np.zeros((buffer_size, 3), dtype='float32')  # raw lsb
+        self.orientation = np.zeros((buffer_size, 3), dtype='float32')  # roll, pitch, yaw deg
+        self.quaternion = np.zeros((buffer_size, 4), dtype='float32')  # w, x, y, z
+        # samples written so far, the latest is at (num_samples - 1) % buffer_size
+        self.num_samples = 0
+        self.num_errors = 0
+        self.num_overruns = 0
+        #
+        self.thread = None
+        self.stop_event = threading.Event()
+        # one sample up front, so readers have an orientation before the thread runs
+        self.latest = None
+        self.calibrate()
+        self.sample()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        if self.use_fifo:
+            self.mpu.enable_fifo(self.sample_rate)
+        self.thread = threading.Thread(target=self.run, name='imu', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        if self.use_fifo:
+            self.mpu.disable_fifo()
+
+    def run(self):
+        # absolute deadlines keep the rate from drifting with the time a sample takes,
+        # a late sample moves the schedule instead of bursting to catch up
+        next_time = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                if self.use_fifo:
+                    self.drain_fifo()
+                else:
+                    self.sample()
+            except OSError:
+                # a missed ack on the bus drops one read, not the thread
+                self.num_errors += 1
+            next_time += self.poll_period
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            elif delay < -self.poll_period:
+                self.num_overruns += 1
+                next_time = time.perf_counter()
+
+    def calibrate(self):
+        # measure the gyro bias over the next calibration_samples, the sensor must rest
+        self.calibration_end = self.num_samples + self.calibration_samples
+        self.calibration_sums = [0.0] * 6
+
+    def sample(self):
+        timestamp = time.perf_counter()
+        accel, gyro = self.mpu.read_accel_gyro()
+        if self.use_magnetometer and self.num_samples % self.mag_interval == 0:
+            self.mag = self.read_magnetometer()
+        self.add_sample(timestamp, accel, gyro)
+
+    def drain_fifo(self):
+        timestamp = time.perf_counter()
+        accel, gyro = self.mpu.read_fifo()
+        if self.use_magnetometer:
+            self.mag = self.read_magnetometer()
+        # the newest record is the last, and records are a sample period apart
+        num = len(accel)
+        for i, (sample_accel, sample_gyro) in enumerate(zip(accel.tolist(), gyro.tolist())):
+            self.add_sample(
+                timestamp - (num - 1 - i) * self.period, tuple(sample_accel), tuple(sample_gyro)
+            )
+
+    def read_magnetometer(self):
+        # the AK8963 x and y axes are the accel y and x, its z points the other way
+        mx, my, mz = self.mpu.get_magnetometer_data()
+        return my, mx, -mz
+
+    def add_sample(self, timestamp, accel, gyro):
+        if self.num_samples < self.calibration_end:
+            # hold still at the averaged tilt while measuring the bias
+            self.calibration_sums = [
+                total + value for total, value in zip(self.calibration_sums, accel + gyro)
+            ]
+            num = self.num_samples - (self.calibration_end - self.calibration_samples) + 1
+            self.gyro_bias = tuple(total / num for total in self.calibration_sums[3:])
+            self.filter.reset([total / num for total in self.calibration_sums[:3]], self.mag)
+        else:
+            gyro_rates = [
+                math.radians((value - bias) * self.mpu.GYRO_SCALE)
+                for value, bias in zip(gyro, self.gyro_bias)
+            ]
+            self.filter.update(gyro_rates, accel, self.mag)
+        quaternion = tuple(self.filter.quaternion)
+        orientation = tuple(math.degrees(angle) for angle in get_euler_angles(quaternion))
+        #
+        i = self.num_samples % self.buffer_size
+        self.timestamps[i] = timestamp
+        self.accel[i] = accel
+        self.gyro[i] = gyro
+        self.orientation[i] = orientation
+        self.quaternion[i] = quaternion
+        self.num_samples += 1
+        self.latest = (timestamp, accel, gyro, orientation, quaternion)
+
+    def get_orientation(self):
+        # roll, pitch, yaw in degrees of the latest sample
+        return self.latest[3]
+
+    def get_quaternion(self):
+        # (w, x, y, z) rotation of the sensor into the earth frame, z up
+        return self.latest[4]
+
+    def get_accel_data(self):
+        return self.latest[1]
+
+    def get_timestamp(self):
+        return self.latest[0]
+
+    def get_samples(self, num_samples=None):
+        # copies of the latest timestamps, accel, gyro, orientation and quaternion rows,
+        # oldest first
+        while True:
+            end = self.num_samples
+            num = min(end, self.buffer_size, num_samples or self.buffer_size)
+            rows = np.arange(end - num, end) % self.buffer_size
+            samples = (
+                self.timestamps[rows], self.accel[rows], self.gyro[rows], self.orientation[rows],
+                self.quaternion[rows]
+            )
+            # retry if the sampling thread lapped the rows while they were copied
+            if self.num_samples - end <= self.buffer_size - num:
+                return samples
+
+    def get_sample_rate(self):
+        # measured over the samples in the buffer
+        timestamps = self.get_samples()[0]
+        if len(timestamps) < 2:
+            return 0.0
+        return (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+    def save_samples(self, path, num_samples=None):
+        # the latest samples as an npz trace, see benchmarks.imu_fusion
+        timestamps, accel, gyro, orientation, quaternion = self.get_samples(num_samples)
+        np.savez(
+            path, timestamps=timestamps, accel=accel, gyro=gyro, orientation=orientation,
+            quaternion=quaternion, sample_rate=self.sample_rate
+        )
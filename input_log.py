@@ -0,0 +1,155 @@
+"""
+Binary log of a play session's input, for replaying it tick for tick: the rng seed, then
+per frame the events the engine handled and the Controls snapshot of every tick run,
+then the state the session ended in, to check replays against.
+
+    header  magic b'SDIN', version, seed, tick rate, the control keys and button pins
+            the bitmasks below index, the imu quaternion the player was created with
+    frame   b'F', event count, tick count, render alpha,
+            events: (type, value), value being the key, button, wheel y or pin
+            ticks: (key bits, pin bits, mouse dx, dy, orientation, quaternion)
+    end     b'E', ticks, player position and health
+"""
+import struct
+import pygame as pg
+from controls import Controls
+from settings import GPIO_PRESS_EVENT
+
+MAGIC = b'SDIN'
+VERSION = 1
+HEADER = struct.Struct('<4sHQH')  # magic, version, seed, tick rate
+COUNT = struct.Struct('<B')
+KEY = struct.Struct('<i')
+QUATERNION = struct.Struct('<4d')
+FRAME = struct.Struct('<HHf')  # events, ticks, alpha
+EVENT = struct.Struct('<Hi')
+TICK = struct.Struct('<IH2h3d4d')
+END = struct.Struct('<I3di')
+# events Player.handle_events reads, and their attribute written as the event value
+EVENT_VALUES = {
+    pg.KEYDOWN: 'key',
+    pg.MOUSEBUTTONDOWN: 'button',
+    pg.MOUSEWHEEL: 'y',
+    GPIO_PRESS_EVENT: 'pin',
+}
+
+
+class InputRecorder:
+    """
+    Writes the input of a session as it is played: add_event for every event handed to
+    the engine, add_tick after every tick with the controls it read, end_frame once the
+    frame's ticks are done. Frames are written out whole, a session cut short still
+    replays up to its last frame
+    """
+    def __init__(self, path, seed, tick_rate, controls):
+        self.file = open(path, 'wb')
+        self.keys = controls.keys
+        self.pins = controls.pins
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, tick_rate))
+        self.file.write(COUNT.pack(len(self.keys)))
+        self.file.write(b''.join(KEY.pack(key) for key in self.keys))
+        self.file.write(COUNT.pack(len(self.pins)))
+        self.file.write(b''.join(COUNT.pack(pin) for pin in self.pins))
+        self.file.write(QUATERNION.pack(*controls.quaternion))
+        #
+        self.events = []
+        self.ticks = []
+        self.num_ticks = 0
+
+    def add_event(self, event):
+        if event.type in EVENT_VALUES:
+            self.events.append(EVENT.pack(event.type, getattr(event, EVENT_VALUES[event.type])))
+
+    def add_tick(self, controls):
+        key_bits = sum(1 << i for i, key in enumerate(self.keys) if key in controls.pressed_keys)
+        pin_bits = sum(1 << i for i, pin in enumerate(self.pins) if pin in controls.pressed_pins)
+        self.ticks.append(TICK.pack(
+            key_bits, pin_bits, *controls.mouse_rel, *controls.orientation, *controls.quaternion
+        ))
+        self.num_ticks += 1
+
+    def end_frame(self, alpha):
+        self.file.write(b'F' + FRAME.pack(len(self.events), len(self.ticks), alpha))
+        self.file.write(b''.join(self.events))
+        self.file.write(b''.join(self.ticks))
+        self.events.clear()
+        self.ticks.clear()
+
+    def close(self, player):
+        self.file.write(b'E' + END.pack(self.num_ticks, *player.position, player.health))
+        self.file.close()
+
+
+class InputLog:
+    """
+    A recorded session read back: seed, tick_rate, keys, pins and quaternion from the
+    header, frames as (events, ticks, alpha) and end, (ticks, position, health), if the
+    session closed its log
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, self.seed, self.tick_rate = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path}: not an input log of version {VERSION}')
+        offset = HEADER.size
+        (num_keys,), offset = COUNT.unpack_from(data, offset), offset + COUNT.size
+        self.keys = [KEY.unpack_from(data, offset + i * KEY.size)[0] for i in range(num_keys)]
+        offset += num_keys * KEY.size
+        (num_pins,), offset = COUNT.unpack_from(data, offset), offset + COUNT.size
+        self.pins = list(data[offset:offset + num_pins])
+        offset += num_pins
+        self.quaternion = QUATERNION.unpack_from(data, offset)
+        offset += QUATERNION.size
+
+        self.frames = []
+        self.end = None
+        while offset < len(data):
+            record, offset = data[offset:offset + 1], offset + 1
+            if record == b'E':
+                num_ticks, x, y, z, health = END.unpack_from(data, offset)
+                self.end = num_ticks, (x, y, z), health
+                break
+            if record != b'F' or offset + FRAME.size > len(data):
+                raise ValueError(f'{path}: bad record at byte {offset - 1}')
+            num_events, num_ticks, alpha = FRAME.unpack_from(data, offset)
+            offset += FRAME.size
+            size = num_events * EVENT.size + num_ticks * TICK.size
+            if offset + size > len(data):
+                # the session was cut short while writing this frame
+                break
+            events = list(EVENT.iter_unpack(data[offset:offset + num_events * EVENT.size]))
+            offset += num_events * EVENT.size
+            ticks = list(TICK.iter_unpack(data[offset:offset + num_ticks * TICK.size]))
+            offset += num_ticks * TICK.size
+            self.frames.append((events, ticks, alpha))
+
+    @property
+    def num_ticks(self):
+        return sum(len(ticks) for _, ticks, _ in self.frames)
+
+    @staticmethod
+    def get_event(event_type, value):
+        return pg.event.Event(event_type, {EVENT_VALUES[event_type]: value})
+
+
+class ReplayControls(Controls):
+    """
+    Controls played back from an InputLog: every update takes the next recorded tick
+    """
+    def __init__(self, log):
+        super().__init__(log.keys, log.pins)
+        self.quaternion = log.quaternion
+        self.ticks = (tick for _, ticks, _ in log.frames for tick in ticks)
+
+    def update(self):
+        key_bits, pin_bits, dx, dy, *values = next(self.ticks)
+        self.pressed_keys = frozenset(
+            key for i, key in enumerate(self.keys) if key_bits >> i & 1
+        )
+        self.pressed_pins = frozenset(
+            pin for i, pin in enumerate(self.pins) if pin_bits >> i & 1
+        )
+        self.mouse_rel = dx, dy
+        self.orientation = tuple(values[:3])
+        self.quaternion = tuple(values[3:])
@@ -0,0 +1,169 @@
+"""
+Compiles the tmx levels into uncompressed .npz files: the tile layers, player spawn and
+objects, the level vertex buffer and the navigation graph, tagged with a hash of the tmx
+and tilesets they came from. LevelMap maps a compiled level while its hash is current and
+parses the tmx otherwise.
+
+    python -m level_compiler [level_0.tmx ...]
+"""
+import argparse
+import glob
+import hashlib
+import math
+import mmap
+import os
+import struct
+import zipfile
+import numpy as np
+import pytmx
+from settings import TEX_SIZE, PLAYER_HEIGHT
+from level_grid import LevelGrid
+from path_finding import PathFinder
+from meshes.vectorized_level_mesh_builder import VectorizedLevelMeshBuilder
+
+# bump when the compiled arrays change
+VERSION = 1
+LEVEL_DIR = 'resources/levels'
+COMPILED_DIR = 'resources/levels/compiled'
+
+
+def get_source_hash(tmx_file):
+    # the tmx, every tileset next to it (tile gids resolve through them) and the settings
+    # that turn pixel positions into tiles
+    digest = hashlib.sha256(f'{VERSION} {TEX_SIZE} {PLAYER_HEIGHT}'.encode())
+    for path in [f'{LEVEL_DIR}/{tmx_file}'] + sorted(glob.glob(f'{LEVEL_DIR}/*.tsx')):
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return np.frombuffer(digest.digest(), dtype='uint8')
+
+
+def read_level(tmx_file):
+    # level arrays straight from the tmx, without the vertex buffer and graph
+    tiled_map = pytmx.TiledMap(f'{LEVEL_DIR}/{tmx_file}')
+    gid_map = tiled_map.tiledgidmap
+
+    def get_id(gid):
+        return gid_map[gid] - 1
+
+    def get_layer_ids(name):
+        # tile layer as a (width, depth) array of texture ids, -1 where there is no tile
+        gids = np.array(tiled_map.get_layer_by_name(name).data, dtype='int64').T
+        ids = np.full(gids.shape, -1, dtype='int16')
+        for gid in np.unique(gids[gids > 0]).tolist():
+            ids[gids == gid] = get_id(gid)
+        return ids
+
+    def get_objects(name):
+        # (n, 3) rows of tex id, tile x and tile z, in map order
+        objects = [
+            (get_id(obj.gid), int(obj.x / TEX_SIZE), int(obj.y / TEX_SIZE))
+            for obj in tiled_map.get_layer_by_name(name)
+        ]
+        return np.array(objects, dtype='int32').reshape(-1, 3)
+
+    player = tiled_map.get_layer_by_name('player').pop()
+    return {
+        'player_pos': np.array(
+            [player.x / TEX_SIZE, PLAYER_HEIGHT, player.y / TEX_SIZE], dtype='float64'
+        ),
+        'wall': get_layer_ids('walls'),
+        'floor': get_layer_ids('floors'),
+        'ceil': get_layer_ids('ceilings'),
+        'doors': get_objects('doors'),
+        'items': get_objects('items'),
+        'npcs': get_objects('npc'),
+    }
+
+
+def add_prebuilt(data):
+    # level vertex buffer and navigation graph of the arrays of read_level
+    data['vertex_data'] = VectorizedLevelMeshBuilder.build_vertex_data(
+        wall_grid=data['wall'], floor_grid=data['floor'], ceil_grid=data['ceil']
+    )
+    # graph of the level as loaded: only walls block navigation then
+    grid = LevelGrid(*data['wall'].shape)
+    grid.flags[data['wall'] >= 0] |= LevelGrid.WALL
+    data['graph_nodes'], data['graph_ends'] = PathFinder.get_graph_arrays(grid)
+    return data
+
+
+def prebuild_level(tmx_file):
+    # everything a level load needs short of the game objects and gpu buffers: the
+    # compiled level when it is current, else the same arrays built from the tmx
+    data = load_compiled_level(tmx_file)
+    if data is None:
+        data = add_prebuilt(read_level(tmx_file))
+    return data
+
+
+def compile_level(tmx_file):
+    data = add_prebuilt(read_level(tmx_file))
+    data['source_hash'] = get_source_hash(tmx_file)
+
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    path = get_compiled_path(tmx_file)
+    # np.savez appends .npz to names without it
+    tmp_path = f'{path}.tmp.npz'
+    np.savez(tmp_path, **data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def get_compiled_path(tmx_file):
+    return f'{COMPILED_DIR}/{os.path.splitext(tmx_file)[0]}.npz'
+
+
+def load_compiled_level(tmx_file):
+    # memory-mapped arrays of the compiled level, None when missing or out of date
+    path = get_compiled_path(tmx_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        data = load_arrays(path)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+    if 'source_hash' not in data or not np.array_equal(
+            data['source_hash'], get_source_hash(tmx_file)):
+        return None
+    return data
+
+
+def load_arrays(path):
+    # np.load can't memory-map the members of an npz, but stored members are plain .npy
+    # files at known offsets in the zip: map the file once and view each one past its headers
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f'{path}: {info.filename} is compressed')
+            name_size, extra_size = struct.unpack_from('<HH', data, info.header_offset + 26)
+            file.seek(info.header_offset + 30 + name_size + extra_size)
+            #
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            array = np.frombuffer(data, dtype=dtype, count=math.prod(shape), offset=file.tell())
+            arrays[os.path.splitext(info.filename)[0]] = array.reshape(
+                shape, order='F' if fortran_order else 'C'
+            )
+    return arrays
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('tmx_files', nargs='*', help=f'levels in {LEVEL_DIR}, all by default')
+    args = parser.parse_args()
+
+    tmx_files = args.tmx_files or sorted(
+        os.path.basename(path) for path in glob.glob(f'{LEVEL_DIR}/*.tmx')
+    )
+    for tmx_file in tmx_files:
+        path = compile_level(tmx_file)
+        print(f'{tmx_file} -> {path} ({os.path.getsize(path) / 1024:.1f} KiB)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class LevelGrid:
+    """
+    Dense per-tile occupancy of a level, indexed [x, z] like the tile maps of LevelMap.
+    Texture layers hold texture ids (-1 for an empty tile), flags is a bitmask of
+    what occupies each tile. Scalar lookups go through a flat memoryview of flags
+    """
+    WALL = 1
+    DOOR = 2
+    CLOSED_DOOR = 4
+    NPC = 8
+    ITEM = 16
+    # blocked for navigation at runtime, see PathFinder.set_blocked
+    BLOCKED = 32
+    # tiles that stop the player and rays
+    SOLID = WALL | CLOSED_DOOR
+    # tiles npcs path around; doors stay walkable since npcs open them
+    NAV_SOLID = WALL | BLOCKED
+
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        #
+        self.wall = np.full((width, depth), -1, dtype='int16')
+        self.floor = np.full((width, depth), -1, dtype='int16')
+        self.ceil = np.full((width, depth), -1, dtype='int16')
+        #
+        self.flags = np.zeros((width, depth), dtype='uint8')
+        self.cells = memoryview(self.flags).cast('B')
+        # bumped every time a door opens or closes
+        self.door_epoch = 0
+
+    @classmethod
+    def from_tile_maps(cls, width, depth, wall_map, floor_map=None, ceil_map=None):
+        grid = cls(width, depth)
+        grid.set_layer(grid.wall, wall_map)
+        grid.set_layer(grid.floor, floor_map or {})
+        grid.set_layer(grid.ceil, ceil_map or {})
+        grid.flags[grid.wall >= 0] |= cls.WALL
+        return grid
+
+    @staticmethod
+    def set_layer(layer, tile_map):
+        if tile_map:
+            tiles = np.array(list(tile_map.keys()), dtype='int64')
+            layer[tiles[:, 0], tiles[:, 1]] = list(tile_map.values())
+
+    @staticmethod
+    def to_tile_map(layer):
+        xs, zs = np.nonzero(layer >= 0)
+        return {
+            (x, z): tex_id for x, z, tex_id in zip(xs.tolist(), zs.tolist(), layer[xs, zs].tolist())
+        }
+
+    def index(self, x, z):
+        if 0 <= x < self.width and 0 <= z < self.depth:
+            return x * self.depth + z
+        return -1
+
+    def get_flags(self, x, z):
+        # outside of the map nothing is there, as with a missing key in the tile maps
+        if 0 <= x < self.width and 0 <= z < self.depth:
+            return self.cells[x * self.depth + z]
+        return 0
+
+    def is_wall(self, x, z):
+        return self.get_flags(x, z) & self.WALL
+
+    def is_solid(self, x, z):
+        return self.get_flags(x, z) & self.SOLID
+
+    def has_npc(self, x, z):
+        return self.get_flags(x, z) & self.NPC
+
+    def has_item(self, x, z):
+        return self.get_flags(x, z) & self.ITEM
+
+    def set_flag(self, x, z, flag, value):
+        i = x * self.depth + z
+        if value:
+            self.cells[i] |= flag
+        else:
+            self.cells[i] &= ~flag & 0xFF
+
+    def add_door(self, x, z, is_closed=True):
+        self.set_flag(x, z, self.DOOR, True)
+        self.set_door_closed(x, z, is_closed)
+
+    def set_door_closed(self, x, z, is_closed):
+        if bool(self.cells[x * self.depth + z] & self.CLOSED_DOOR) != bool(is_closed):
+            self.door_epoch += 1
+        self.set_flag(x, z, self.CLOSED_DOOR, is_closed)
+
+    def set_item(self, x, z, value):
+        self.set_flag(x, z, self.ITEM, value)
+
+    def set_npc_tiles(self, tiles):
+        self.flags &= ~np.uint8(self.NPC)
+        if tiles:
+            tiles = np.array(tiles, dtype='int64').reshape(-1, 2)
+            self.flags[tiles[:, 0], tiles[:, 1]] |= self.NPC
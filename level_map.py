@@ -1,79 +1,85 @@
-import pytmx
 from settings import *
+from level_grid import LevelGrid
+from level_compiler import read_level, load_compiled_level
+from game_objects.instance_store import InstanceStore
 from game_objects.door import Door
 from game_objects.item import Item
 from game_objects.npc import NPC
+from game_objects.npc_pool import NPCPool
 
 
 class LevelMap:
-    def __init__(self, eng, tmx_file='test.tmx'):
+    def __init__(self, eng, tmx_file='test.tmx', use_compiled=True, level_data=None):
         self.eng = eng
-        self.tiled_map = pytmx.TiledMap(f'resources/levels/{tmx_file}')
-        self.gid_map = self.tiled_map.tiledgidmap
+        # level arrays prefetched by the engine, else the memory-mapped compiled level
+        # while it is up to date, else parsed from the tmx
+        if level_data is None and use_compiled:
+            level_data = load_compiled_level(tmx_file)
+        self.level_data = level_data if level_data is not None else read_level(tmx_file)
+        # prebuilt level vertex buffer and navigation graph (nodes, ends), if any
+        self.vertex_data = self.level_data.get('vertex_data')
+        self.nav_graph = None
+        if 'graph_nodes' in self.level_data:
+            self.nav_graph = self.level_data['graph_nodes'], self.level_data['graph_ends']
 
-        self.width = self.tiled_map.width
-        self.depth = self.tiled_map.height
+        self.width, self.depth = self.level_data['wall'].shape
 
         self.wall_map, self.floor_map, self.ceil_map = {}, {}, {}
         self.door_map, self.item_map,  = {}, {}
         self.npc_map, self.npc_list = {}, []
+        # instance data of the doors, items and npcs for their instanced meshes
+        self.door_instances = InstanceStore()
+        self.item_instances = InstanceStore()
+        self.npc_instances = InstanceStore()
+        self.npc_pool = NPCPool(eng, self)
+        #
+        self.grid = LevelGrid(self.width, self.depth)
         #
         self.parse_level()
 
-    def get_id(self, gid):
-        return self.gid_map[gid] - 1
-
     def parse_level(self):
-        # get player pos
-        player = self.tiled_map.get_layer_by_name('player').pop()
-        player_pos = glm.vec3(player.x / TEX_SIZE, PLAYER_HEIGHT, player.y / TEX_SIZE)
-        # set pos
-        self.eng.player.position = player_pos
-
-        walls = self.tiled_map.get_layer_by_name('walls')
-        floors = self.tiled_map.get_layer_by_name('floors')
-        ceilings = self.tiled_map.get_layer_by_name('ceilings')
-
-        for ix in range(self.width):
-            for iz in range(self.depth):
-                if gid := walls.data[iz][ix]:
-                    # wall hash map
-                    self.wall_map[(ix, iz)] = self.get_id(gid)
+        data = self.level_data
+        # set player pos
+        self.eng.player.position = glm.vec3(*data['player_pos'].tolist())
 
-                if gid := floors.data[iz][ix]:
-                    # floor hash map
-                    self.floor_map[(ix, iz)] = self.get_id(gid)
+        # tile layers
+        self.grid.wall[:] = data['wall']
+        self.grid.floor[:] = data['floor']
+        self.grid.ceil[:] = data['ceil']
+        self.grid.flags[self.grid.wall >= 0] |= LevelGrid.WALL
 
-                if gid := ceilings.data[iz][ix]:
-                    # ceiling  hash map
-                    self.ceil_map[(ix, iz)] = self.get_id(gid)
+        # wall, floor and ceiling hash maps
+        self.wall_map = LevelGrid.to_tile_map(self.grid.wall)
+        self.floor_map = LevelGrid.to_tile_map(self.grid.floor)
+        self.ceil_map = LevelGrid.to_tile_map(self.grid.ceil)
 
         # get doors
-        door_objects = self.tiled_map.get_layer_by_name('doors')
-        for obj in door_objects:
+        for tex_id, *pos in data['doors'].tolist():
             # door hash map
-            pos = int(obj.x / TEX_SIZE), int(obj.y / TEX_SIZE)
-            door = Door(self, tex_id=self.get_id(obj.gid), x=pos[0], z=pos[1])
+            pos = tuple(pos)
+            door = Door(self, tex_id=tex_id, x=pos[0], z=pos[1])
             self.door_map[pos] = door
+            self.grid.add_door(*pos, is_closed=door.is_closed)
 
         # get items
-        items = self.tiled_map.get_layer_by_name('items')
-        for obj in items:
+        for tex_id, *pos in data['items'].tolist():
             # item hash map
-            pos = int(obj.x / TEX_SIZE), int(obj.y / TEX_SIZE)
-            item = Item(self, tex_id=self.get_id(obj.gid), x=pos[0], z=pos[1])
+            pos = tuple(pos)
+            item = Item(self, tex_id=tex_id, x=pos[0], z=pos[1])
             self.item_map[pos] = item
+            self.grid.set_item(*pos, True)
 
         # get npc
-        npc = self.tiled_map.get_layer_by_name('npc')
-        for obj in npc:
+        for tex_id, *pos in data['npcs'].tolist():
             # npc map
-            pos = int(obj.x / TEX_SIZE), int(obj.y / TEX_SIZE)
-            npc = NPC(self, tex_id=self.get_id(obj.gid), x=pos[0], z=pos[1])
+            pos = tuple(pos)
+            npc = NPC(self, tex_id=tex_id, x=pos[0], z=pos[1])
             self.npc_map[pos] = npc
             self.npc_list.append(npc)
+        self.grid.set_npc_tiles(list(self.npc_map.keys()))
 
         # update player data
         self.eng.player.wall_map = self.wall_map
         self.eng.player.door_map = self.door_map
         self.eng.player.item_map = self.item_map
+        self.eng.player.grid = self.grid
@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+from level_compiler import prebuild_level
+
+
+class LevelPrefetcher:
+    """
+    Prebuilds levels on a worker thread ahead of the transition to them: the tmx or compiled
+    level, the tile layers, the level vertex buffer and the navigation graph. The game
+    objects and gpu buffers are still made on the main thread by new_game
+    """
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level_prefetch')
+        # tmx file -> future of its level arrays
+        self.pending = {}
+
+    def prefetch(self, tmx_file):
+        if tmx_file not in self.pending:
+            self.pending[tmx_file] = self.pool.submit(prebuild_level, tmx_file)
+
+    def take(self, tmx_file):
+        # the prefetched level arrays, waiting for them if still in progress,
+        # None if the level was never prefetched or failed to load
+        future = self.pending.pop(tmx_file, None)
+        if future is None or future.exception() is not None:
+            return None
+        return future.result()
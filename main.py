@@ -1,11 +1,16 @@
+import argparse
+import random
 import sys
 import moderngl as mgl
 from engine import Engine
+from fixed_step import FixedStep
+from input_log import InputRecorder
 from settings import *
 
      
-class Game:
-    def __init__(self):
+class Game(FixedStep):
+    def __init__(self, controls=None, seed=None, record_path=None):
+        # controls: where the player's input comes from, the devices when None
         pg.init()
         pg.display.gl_set_attribute(pg.GL_CONTEXT_MAJOR_VERSION, MAJOR_VERSION)
         pg.display.gl_set_attribute(pg.GL_CONTEXT_MINOR_VERSION, MINOR_VERSION)
@@ -19,8 +24,11 @@ class Game:
         self.ctx.gc_mode = 'auto'
 
         self.clock = pg.time.Clock()
-        self.target_fps = 60
-        self.delta_time = 0
+        self.target_fps = MAX_FPS
+        # the simulation steps by tick_time ms, the frames render what time is left over
+        super().__init__(TICK_RATE)
+        self.accumulator = 0.0
+        self.alpha = 1.0
         self.time = 0
 
         pg.event.set_grab(True)
@@ -29,29 +37,36 @@ class Game:
         self.is_running = True
         self.fps_value = 0
 
-        self.engine = Engine(self)
+        # the seed is kept for recording, everything random in the game draws from it
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        random.seed(self.seed)
+        self.engine = Engine(self, controls=controls)
+        self.recorder = None
+        if record_path is not None:
+            self.recorder = InputRecorder(record_path, self.seed, TICK_RATE, self.engine.controls)
 
-        self.anim_trigger = False
-        self.anim_event = pg.USEREVENT + 0
-        pg.time.set_timer(self.anim_event, SYNC_PULSE)
+        self.is_live = controls is None
+        if self.is_live:
+            # buttons and imu, see LiveControls
+            self.engine.controls.start()
 
-        self.sound_trigger = False
-        self.sound_event = pg.USEREVENT + 1
-        pg.time.set_timer(self.sound_event, 750)
-
-        #GPIO Init Code
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(SHOOT_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(DOOR_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(TOGGLE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(FORWARD_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(BACKWARD_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
+    def tick(self):
+        self.step(self.engine)
+        if self.recorder is not None:
+            self.recorder.add_tick(self.engine.controls)
 
     def update(self):
-        self.engine.update()
+        # as many ticks as the time since the last frame holds, the rest carries over
+        self.accumulator += self.clock.tick(self.target_fps)
+        self.accumulator = min(self.accumulator, MAX_TICKS_PER_FRAME * self.tick_time)
+        while self.accumulator >= self.tick_time:
+            self.tick()
+            self.accumulator -= self.tick_time
+        self.alpha = self.accumulator / self.tick_time
+        if self.recorder is not None:
+            self.recorder.end_frame(self.alpha)
         #
-        self.delta_time = self.clock.tick(60)
         self.time = pg.time.get_ticks() * 0.001
         self.fps_value = int(self.clock.get_fps())
         pg.display.set_caption(f'{self.fps_value}')
@@ -64,32 +79,38 @@ class Game:
 
     def render(self):
         self.ctx.clear(color=BG_COLOR)
-        self.engine.render()
+        self.engine.render(self.alpha)
         pg.display.flip()
+
     def handle_events(self):
-        self.anim_trigger, self.sound_trigger = False, False
+        if self.is_live:
+            self.engine.controls.update_buttons()
     
         for event in pg.event.get():
             if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
                 self.is_running = False
             #
-            if event.type == self.anim_event:
-                self.anim_trigger = True
-            #
-            if event.type == self.sound_event:
-                self.sound_trigger = True
-            #
             self.engine.handle_events(event=event)
+            if self.recorder is not None:
+                self.recorder.add_event(event)
 
     def run(self):
         while self.is_running:
             self.handle_events()
             self.update()
             self.render()
+        if self.recorder is not None:
+            self.recorder.close(self.engine.player)
+        if self.is_live:
+            self.engine.controls.stop()
         pg.quit()
         sys.exit()
 
 
 if __name__ == '__main__':
-    game = Game()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--record', metavar='PATH', help='log the input for replay.py')
+    parser.add_argument('--seed', type=int, help='seed of the rng, random by default')
+    args = parser.parse_args()
+    game = Game(seed=args.seed, record_path=args.record)
     game.run()
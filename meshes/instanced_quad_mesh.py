@@ -1,40 +1,44 @@
-from game_objects.game_object import GameObject
+from game_objects.instance_store import InstanceStore
 from meshes.quad_mesh import QuadMesh
-from typing import Iterable, Any
 import moderngl as mgl
-import numpy as np
 
 
 class InstancedQuadMesh:
-    def __init__(self, eng, objects: Iterable[GameObject], shader_program: mgl.Program):
+    def __init__(self, eng, instances: InstanceStore, shader_program: mgl.Program):
         self.ctx = eng.app.ctx
         self.program = shader_program
         #
-        self.objects = objects
-        self.num_instances = len(objects)
+        self.instances = instances
+        self.num_instances = 0
 
         # quad vertex buffer
         self.quad_vbo = self.ctx.buffer(QuadMesh.get_vertex_data(self))
 
-        # data buffers for instancing
-        self.m_model_vbo: mgl.Buffer = None
-        self.tex_id_vbo: mgl.Buffer = None
+        # data buffers for instancing, one per mesh for its whole life, sized like the store
+        self.generation = instances.generation
+        self.m_model_vbo = self.ctx.buffer(reserve=instances.m_model.nbytes)
+        self.tex_id_vbo = self.ctx.buffer(reserve=instances.tex_id.nbytes)
         #
-        self.vao = self.get_vao() if self.num_instances else None
+        self.vao = self.get_vao()
 
     def update_buffers(self):
-        m_model_list, tex_id_list = [], []
-
-        for obj in self.objects:
-            m_model_list += sum(obj.m_model.to_list(), [])
-            tex_id_list += [obj.tex_id]
-
-        self.m_model_vbo = self.ctx.buffer(np.array(m_model_list, dtype='float32'))
-        self.tex_id_vbo = self.ctx.buffer(np.array(tex_id_list, dtype='int32'))
+        instances = self.instances
+        instances.update()
+        self.num_instances = len(instances)
+
+        first, last = instances.take_upload_range()
+        if self.generation != instances.generation:
+            # the store outgrew the buffers: orphaning resizes them in place, so the vao stays valid
+            self.m_model_vbo.orphan(instances.m_model.nbytes)
+            self.tex_id_vbo.orphan(instances.tex_id.nbytes)
+            self.generation = instances.generation
+            first, last = 0, self.num_instances
+
+        if first < last:
+            self.m_model_vbo.write(instances.m_model[first:last], offset=first * 64)
+            self.tex_id_vbo.write(instances.tex_id[first:last], offset=first * 4)
 
     def get_vao(self):
-        self.update_buffers()
-        #
         vao = self.ctx.vertex_array(
             self.program,
             [
@@ -47,6 +51,6 @@ class InstancedQuadMesh:
         return vao
 
     def render(self):
-        if len(self.objects):
-            self.vao = self.get_vao()
+        if len(self.instances):
+            self.update_buffers()
             self.vao.render(instances=self.num_instances)
@@ -1,4 +1,4 @@
-from meshes.level_mesh_builder import LevelMeshBuilder
+from meshes.vectorized_level_mesh_builder import VectorizedLevelMeshBuilder
 
 
 class LevelMesh:
@@ -11,7 +11,7 @@ class LevelMesh:
         self.fmt_size = sum(int(fmt[:1]) for fmt in self.vbo_format.split())
         self.vbo_attrs = ('in_position', 'in_tex_id', 'face_id', 'ao_id', 'flip_id')
 
-        self.mesh_builder = LevelMeshBuilder(self)
+        self.mesh_builder = VectorizedLevelMeshBuilder(self)
         self.vao = self.get_vao()
 
     def get_vao(self):
@@ -30,6 +30,9 @@ class LevelMesh:
         self.vao.render()
 
     def get_vertex_data(self):
-        vertex_data = self.mesh_builder.build_mesh()
+        # prebuilt by the level compiler, if the level was compiled
+        vertex_data = self.eng.level_map.vertex_data
+        if vertex_data is None:
+            vertex_data = self.mesh_builder.build_mesh()
         print('Num level vertices: ', len(vertex_data) // 7 * 3)
         return vertex_data
@@ -0,0 +1,128 @@
+import numpy as np
+
+# tile face slots, in the order LevelMeshBuilder emits them (slot == face_id)
+FLOOR, CEIL, BACK, FRONT, RIGHT, LEFT = range(6)
+
+# quad corners v0..v3 of each face: (dx, y, dz) relative to the tile origin
+FACE_CORNERS = np.array([
+    [(0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1)],  # floor
+    [(0, 1, 0), (1, 1, 0), (1, 1, 1), (0, 1, 1)],  # ceil
+    [(0, 0, 0), (0, 1, 0), (1, 1, 0), (1, 0, 0)],  # back
+    [(0, 0, 1), (0, 1, 1), (1, 1, 1), (1, 0, 1)],  # front
+    [(1, 0, 0), (1, 1, 0), (1, 1, 1), (1, 0, 1)],  # right
+    [(0, 0, 0), (0, 1, 0), (0, 1, 1), (0, 0, 1)],  # left
+], dtype='int64')
+
+# triangle corner order of each face: [face][flip_id]
+FACE_ORDER = np.array([
+    [(0, 3, 2, 0, 2, 1), (1, 0, 3, 1, 3, 2)],  # floor
+    [(0, 2, 3, 0, 1, 2), (1, 3, 0, 1, 2, 3)],  # ceil
+    [(0, 1, 2, 0, 2, 3), (3, 0, 1, 3, 1, 2)],  # back
+    [(0, 2, 1, 0, 3, 2), (3, 1, 0, 3, 2, 1)],  # front
+    [(0, 1, 2, 0, 2, 3), (3, 0, 1, 3, 1, 2)],  # right
+    [(0, 2, 1, 0, 3, 2), (3, 1, 0, 3, 2, 1)],  # left
+], dtype='int64')
+
+# neighbour tiles whose openness is summed into the ao value of each corner: [face][corner]
+_FLAT_AO = (
+    ((0, -1), (-1, -1), (-1, 0)),  # a + b + c
+    ((1, 0), (1, -1), (0, -1)),    # g + h + a
+    ((0, 1), (1, 1), (1, 0)),      # e + f + g
+    ((-1, 0), (-1, 1), (0, 1)),    # c + d + e
+)
+
+
+def _wall_ao(a, e):
+    return (a,), (a,), (e,), (e,)
+
+
+AO_NEIGHBOURS = (
+    _FLAT_AO,
+    _FLAT_AO,
+    _wall_ao((-1, -1), (1, -1)),  # back:  get_ao(x, z - 1, 'Z')
+    _wall_ao((-1, 1), (1, 1)),    # front: get_ao(x, z + 1, 'Z')
+    _wall_ao((1, -1), (1, 1)),    # right: get_ao(x + 1, z, 'X')
+    _wall_ao((-1, -1), (-1, 1)),  # left:  get_ao(x - 1, z, 'X')
+)
+
+
+def _face_templates():
+    # vertex attributes that only depend on (face, flip_id): corner position, face_id, flip_id
+    templates = np.zeros((6, 2, 6, 7), dtype='uint16')
+    for face in range(6):
+        for flip_id in range(2):
+            corners = FACE_CORNERS[face, FACE_ORDER[face, flip_id]]
+            templates[face, flip_id, :, 0:3] = corners
+            templates[face, flip_id, :, 4] = face
+            templates[face, flip_id, :, 6] = flip_id
+    return templates.reshape(12, 6, 7)
+
+
+FACE_TEMPLATES = _face_templates()
+
+# neighbour tile that must be open for a wall face to be exposed
+WALL_FACE_NEIGHBOURS = {BACK: (0, -1), FRONT: (0, 1), RIGHT: (1, 0), LEFT: (-1, 0)}
+
+
+class VectorizedLevelMeshBuilder:
+    """
+    Array version of LevelMeshBuilder. Produces the same '3u2 1u2 1u2 1u2 1u2'
+    vertex buffer, byte for byte, from the LevelGrid layers instead of walking the map
+    """
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.map = mesh.eng.level_map
+
+    def build_mesh(self):
+        grid = self.map.grid
+        return self.build_vertex_data(
+            wall_grid=grid.wall, floor_grid=grid.floor, ceil_grid=grid.ceil
+        )
+
+    @staticmethod
+    def build_vertex_data(wall_grid, floor_grid, ceil_grid):
+        # grids are (width, depth) texture ids indexed [x, z], -1 where the tile is empty
+        width, depth = wall_grid.shape
+        is_wall = wall_grid >= 0
+
+        # blocked tiles padded with a closed border, as is_blocked() treats the outside
+        blocked = np.ones((width + 2, depth + 2), dtype='bool')
+        blocked[1:-1, 1:-1] = is_wall
+        is_open = ~blocked
+
+        def open_at(dx, dz):
+            return is_open[1 + dx: width + 1 + dx, 1 + dz: depth + 1 + dz]
+
+        # exposed faces per tile, in emission order
+        face_mask = np.zeros((width, depth, 6), dtype='bool')
+        face_mask[..., FLOOR] = ~is_wall & (floor_grid >= 0)
+        face_mask[..., CEIL] = ~is_wall & (ceil_grid >= 0)
+        for face, (dx, dz) in WALL_FACE_NEIGHBOURS.items():
+            face_mask[..., face] = is_wall & open_at(dx, dz)
+
+        tex_grid = np.empty((width, depth, 6), dtype='uint16')
+        tex_grid[..., FLOOR] = floor_grid
+        tex_grid[..., CEIL] = ceil_grid
+        tex_grid[..., BACK:] = wall_grid[..., None]
+
+        # ambient occlusion of every face corner, [x, z, face, corner]
+        ao_grid = np.zeros((width, depth, 6, 4), dtype='uint8')
+        for face, corners in enumerate(AO_NEIGHBOURS):
+            for corner, neighbours in enumerate(corners):
+                for dx, dz in neighbours:
+                    ao_grid[:, :, face, corner] += open_at(dx, dz)
+
+        # one row per exposed face; nonzero keeps the x -> z -> face order
+        x, z, face = (axis.astype('int32') for axis in np.nonzero(face_mask))
+        tex_id = tex_grid[x, z, face]
+        ao = ao_grid[x, z, face]  # (n, 4)
+        flip_id = (ao[:, 1] + ao[:, 3]) > (ao[:, 0] + ao[:, 2])
+
+        # expand faces into two triangles each from per (face, flip) templates
+        variant = face * 2 + flip_id
+        vertex_data = FACE_TEMPLATES[variant]  # (n, 6, 7)
+        vertex_data[..., 0] += x[:, None].astype('uint16')
+        vertex_data[..., 2] += z[:, None].astype('uint16')
+        vertex_data[..., 3] = tex_id[:, None]
+        vertex_data[..., 5] = np.take_along_axis(ao, FACE_ORDER.reshape(12, 6)[variant], axis=1)
+        return vertex_data.reshape(-1)
@@ -1,6 +1,6 @@
-import smbus2
 import time
 import math
+import numpy as np
 
 class MPU9250:
     # MPU9250 I2C address
@@ -12,33 +12,118 @@ class MPU9250:
     ACCEL_XOUT_H = 0x3B
     GYRO_XOUT_H = 0x43
     MAGNETOMETER_DATA_ADDR = 0x03  # Magnetometer data starts from this register
-
-    def __init__(self, bus_number=1):
-        # Initialize I2C bus (assuming I2C 1)
-        self.bus = smbus2.SMBus(bus_number)
+    INT_PIN_CFG = 0x37
+    INT_PIN_CFG_BYPASS_EN = 0x02  # magnetometer on the main I2C bus
+    MAGNETOMETER_CNTL1 = 0x0A
+    MAGNETOMETER_CONTINUOUS_100HZ = 0x16  # 16 bit readings at 100 Hz
+    MAGNETOMETER_RATE = 100  # Hz
+
+    # FIFO registers
+    SMPLRT_DIV = 0x19
+    CONFIG = 0x1A
+    FIFO_EN = 0x23
+    USER_CTRL = 0x6A
+    FIFO_COUNTH = 0x72
+    FIFO_R_W = 0x74
+    FIFO_EN_ACCEL_GYRO = 0x78  # accel and gyro x, y, z into the FIFO
+    USER_CTRL_FIFO_EN = 0x40
+    USER_CTRL_FIFO_RST = 0x04
+    FIFO_SIZE = 512  # bytes
+
+    # ACCEL_XOUT_H to GYRO_ZOUT_L: accel x, y, z, temperature, gyro x, y, z
+    ACCEL_GYRO_SIZE = 14
+    # a FIFO record: accel x, y, z, gyro x, y, z
+    FIFO_RECORD_SIZE = 12
+    # SMBus block reads are limited to 32 bytes, read whole records
+    FIFO_BLOCK_SIZE = 32 // FIFO_RECORD_SIZE * FIFO_RECORD_SIZE
+
+    ACCEL_SCALE = 9.80665 / 16384.0
+    GYRO_SCALE = 1 / 131.0  # deg/s per lsb at +-250 dps
+
+    def __init__(self, bus_number=1, bus=None):
+        # Initialize I2C bus (assuming I2C 1), or use the given one (e.g. a FakeSMBus)
+        if bus is None:
+            import smbus2
+            bus = smbus2.SMBus(bus_number)
+        self.bus = bus
         self.previous_yaw = 0.0
         self.initial_yaw = None
         self.last_time = time.time()
+        # I2C transactions issued on the bus so far
+        self.num_transactions = 0
+        # times read_fifo found the FIFO full and reset it
+        self.num_fifo_overflows = 0
         self.initialize_mpu9250()
 
+    def write_register(self, register, value, device=MPU9250_ADDR):
+        self.num_transactions += 1
+        self.bus.write_byte_data(device, register, value)
+
+    def read_block(self, register, length, device=MPU9250_ADDR):
+        # consecutive registers in one transaction
+        self.num_transactions += 1
+        return bytes(self.bus.read_i2c_block_data(device, register, length))
+
+    def read_words(self, register, count, device=MPU9250_ADDR):
+        # big endian signed 16 bit words starting at register
+        return np.frombuffer(self.read_block(register, 2 * count, device), dtype='>i2')
+
     def read_word(self, register, device=MPU9250_ADDR):
-        high = self.bus.read_byte_data(device, register)
-        low = self.bus.read_byte_data(device, register + 1)
-        value = (high << 8) + low
-        if value >= 0x8000:  # Two's complement
-            value -= 0x10000
-        return value
+        return int(self.read_words(register, 1, device)[0])
 
     def initialize_mpu9250(self):
         # Wake up MPU9250 by writing 0 to PWR_MGMT_1 register
-        self.bus.write_byte_data(self.MPU9250_ADDR, self.PWR_MGMT_1, 0)
+        self.write_register(self.PWR_MGMT_1, 0)
         time.sleep(0.1)
 
+    def read_accel_gyro(self):
+        # accel (m/s^2) and raw gyro of the same sample, in one burst of the 14 data registers
+        words = self.read_words(self.ACCEL_XOUT_H, self.ACCEL_GYRO_SIZE // 2)
+        ax, ay, az = (words[:3] * self.ACCEL_SCALE).tolist()
+        gx, gy, gz = words[4:].tolist()
+        return (ax, ay, az), (gx, gy, gz)
+
+    def enable_fifo(self, sample_rate):
+        # the sensor samples accel and gyro into its FIFO at sample_rate Hz (of a 1 kHz base
+        # rate with the low pass filter on), read_fifo drains it
+        self.write_register(self.CONFIG, 1)
+        self.write_register(self.SMPLRT_DIV, max(0, min(255, round(1000 / sample_rate) - 1)))
+        self.write_register(self.USER_CTRL, self.USER_CTRL_FIFO_RST)
+        self.write_register(self.FIFO_EN, self.FIFO_EN_ACCEL_GYRO)
+        self.write_register(self.USER_CTRL, self.USER_CTRL_FIFO_EN)
+
+    def reset_fifo(self):
+        # empty the FIFO and keep sampling into it
+        self.write_register(self.USER_CTRL, self.USER_CTRL_FIFO_EN | self.USER_CTRL_FIFO_RST)
+
+    def disable_fifo(self):
+        self.write_register(self.FIFO_EN, 0)
+        self.write_register(self.USER_CTRL, self.USER_CTRL_FIFO_RST)
+
+    def read_fifo(self, max_samples=None):
+        # (n, 3) accel (m/s^2) and (n, 3) raw gyro of the samples waiting in the FIFO,
+        # oldest first, in blocks of FIFO_BLOCK_SIZE bytes
+        count = int(self.read_words(self.FIFO_COUNTH, 1)[0]) & 0x1FFF
+        if count > self.FIFO_SIZE - self.FIFO_RECORD_SIZE:
+            # full, or about to be: a full FIFO overwrites its oldest bytes (FIFO_MODE 0)
+            # and FIFO_SIZE is no multiple of a record, so every record read after that
+            # would start mid-record. Drop the samples and start over
+            self.reset_fifo()
+            self.num_fifo_overflows += 1
+            return np.empty((0, 3)), np.empty((0, 3))
+        num_samples = count // self.FIFO_RECORD_SIZE
+        if max_samples is not None:
+            num_samples = min(num_samples, max_samples)
+        size = num_samples * self.FIFO_RECORD_SIZE
+        data = b''.join(
+            self.read_block(self.FIFO_R_W, min(self.FIFO_BLOCK_SIZE, size - start))
+            for start in range(0, size, self.FIFO_BLOCK_SIZE)
+        )
+        words = np.frombuffer(data, dtype='>i2').reshape(-1, 6)
+        return words[:, :3] * self.ACCEL_SCALE, words[:, 3:].astype('float64')
+
     def get_accel_data(self):
-        scale = 9.80665 / 16384.0
-        ax = self.read_word(self.ACCEL_XOUT_H) * scale
-        ay = self.read_word(self.ACCEL_XOUT_H + 2) * scale
-        az = self.read_word(self.ACCEL_XOUT_H + 4) * scale 
+        ax, ay, az = (self.read_words(self.ACCEL_XOUT_H, 3) * self.ACCEL_SCALE).tolist()
         return ax, ay, az
 
     def get_rel_accel_data(self):
@@ -66,15 +151,22 @@ class MPU9250:
 
 
     def get_gyro_data(self):
-        gx = self.read_word(self.GYRO_XOUT_H)
-        gy = self.read_word(self.GYRO_XOUT_H + 2)
-        gz = self.read_word(self.GYRO_XOUT_H + 4)
+        gx, gy, gz = self.read_words(self.GYRO_XOUT_H, 3).tolist()
         return gx, gy, gz
 
+    def enable_magnetometer(self):
+        # the AK8963 answers on the bus once the MPU9250 bypasses its I2C master
+        self.write_register(self.INT_PIN_CFG, self.INT_PIN_CFG_BYPASS_EN)
+        self.write_register(
+            self.MAGNETOMETER_CNTL1, self.MAGNETOMETER_CONTINUOUS_100HZ,
+            device=self.MAGNETOMETER_ADDR
+        )
+
     def get_magnetometer_data(self):
-        mx = self.read_word(self.MAGNETOMETER_DATA_ADDR, device=self.MAGNETOMETER_ADDR)
-        my = self.read_word(self.MAGNETOMETER_DATA_ADDR + 2, device=self.MAGNETOMETER_ADDR)
-        mz = self.read_word(self.MAGNETOMETER_DATA_ADDR + 4, device=self.MAGNETOMETER_ADDR)
+        # little endian words, the status register after them is read to release the
+        # next reading
+        data = self.read_block(self.MAGNETOMETER_DATA_ADDR, 7, device=self.MAGNETOMETER_ADDR)
+        mx, my, mz = np.frombuffer(data[:6], dtype='<i2').tolist()
         return mx, my, mz
 
     def calculate_orientation(self, ax, ay, az, gx, gy, gz, dt):
@@ -89,15 +181,14 @@ class MPU9250:
         pitch = math.atan2(-ax, math.sqrt(ay**2 + az**2)) * 180 / math.pi
 
         # Integrate gyroscope data to calculate yaw
-        gyro_z = gz / 131.0  # Convert to degrees per second (assuming 250 dps scale)
+        gyro_z = gz * self.GYRO_SCALE  # Convert to degrees per second (assuming 250 dps scale)
         yaw = self.previous_yaw + gyro_z * dt
 
         return roll, pitch, yaw
 
     def update_yaw(self, dt):
         # Update yaw based on the gyroscope data
-        ax, ay, az = self.get_accel_data()
-        gx, gy, gz = self.get_gyro_data()
+        (ax, ay, az), (gx, gy, gz) = self.read_accel_gyro()
 
         # Calculate roll, pitch, and yaw
         roll, pitch, yaw = self.calculate_orientation(ax, ay, az, gx, gy, gz, dt)
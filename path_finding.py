@@ -1,49 +1,434 @@
-from collections import deque
-from functools import lru_cache
+from collections import deque, OrderedDict
+import heapq
+import math
+import numpy as np
+from settings import PATH_FLOW_FIELD, PATH_SEARCH, PATH_MAX_EXPANSIONS, PATH_CACHE_SIZE
+from level_grid import LevelGrid
+
+SQRT_2 = math.sqrt(2)
+
+
+def octile(x0, z0, x1, z1):
+    dx, dz = abs(x1 - x0), abs(z1 - z0)
+    return max(dx, dz) + (SQRT_2 - 1) * min(dx, dz)
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+class PathCache:
+    """
+    LRU cache of find() results keyed on (search engine, start tile, goal tile). Each
+    entry remembers the tiles of its path, so blocking a tile drops only the paths that
+    cross it. Searches leave npcs out, their moves don't touch the cache
+    """
+    def __init__(self, max_size=PATH_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        # flat tile index -> keys of the cached paths through that tile
+        self.by_tile = {}
+        #
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, step, tiles):
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = step, tiles
+        for tile in tiles:
+            self.by_tile.setdefault(tile, set()).add(key)
+        if len(self.entries) > self.max_size:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        _, tiles = self.entries.pop(key)
+        for tile in tiles:
+            keys = self.by_tile[tile]
+            keys.discard(key)
+            if not keys:
+                del self.by_tile[tile]
+
+    def drop_tile(self, tile):
+        for key in list(self.by_tile.get(tile, ())):
+            self.remove(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.by_tile.clear()
 
 
 class PathFinder:
-    def __init__(self, eng):
+    ways = ([-1, 0], [0, -1], [1, 0], [0, 1], [-1, -1], [1, -1], [1, 1], [-1, 1])
+
+    def __init__(self, eng, nav_graph=None):
         self.eng = eng
         self.level_map = eng.level_map
         self.wall_map = eng.level_map.wall_map
-        self.ways = ([-1, 0], [0, -1], [1, 0], [0, 1], [-1, -1], [1, -1], [1, 1], [-1, 1])
-        self.graph = {}
-        self.update_graph()
+        self.grid = eng.level_map.grid
+        # adjacency lists indexed by flat tile index (see LevelGrid.index), built from
+        # the grid unless a compiled level brings its (nodes, ends) arrays
+        self.graph = []
+        if nav_graph is None:
+            self.update_graph()
+        else:
+            self.set_graph(*nav_graph)
+        # next tile towards flow_goal and its distance in steps for every tile, -1 if unreachable
+        self.use_flow_field = PATH_FLOW_FIELD
+        self.flow_goal = None
+        self.flow_field: np.ndarray = None
+        self.flow_dist: np.ndarray = None
+        # search engine used by find(): 'bfs', 'astar' or 'jps'
+        self.search = PATH_SEARCH
+        self.max_expansions = PATH_MAX_EXPANSIONS
+        self.num_expanded = 0
+        # came-from tile of every tile reached by the last search, -1 if not reached
+        self.came_from = [-1] * (self.grid.width * self.grid.depth)
+        self.g_cost = [math.inf] * (self.grid.width * self.grid.depth)
+        self.touched = []
+        #
+        self.path_cache = PathCache()
+
+    def next_step(self, start_pos, end_pos):
+        if self.use_flow_field:
+            return self.get_flow_step(start_pos, end_pos)
+        return self.find(start_pos, end_pos)
+
+    def get_flow_step(self, start_pos, end_pos):
+        if end_pos != self.flow_goal:
+            self.update_flow_field(end_pos)
+
+        start, goal = self.grid.index(*start_pos), self.grid.index(*end_pos)
+        step = int(self.flow_field[start])
+        # on the goal or cut off from it: head straight for it, as find() does
+        if start == goal or step == -1:
+            return end_pos
+        # another npc stands on the next tile
+        if step != goal and self.grid.cells[step] & LevelGrid.NPC:
+            step = self.get_detour(start, step)
+        return divmod(step, self.grid.depth)
+
+    def next_steps(self, start_tiles, end_pos):
+        # next_step() for an (n, 2) array of start tiles, as an (n, 2) array
+        if not self.use_flow_field:
+            steps = [self.find(tuple(tile), end_pos) for tile in start_tiles.tolist()]
+            return np.array(steps, dtype='int32').reshape(-1, 2)
+
+        if end_pos != self.flow_goal:
+            self.update_flow_field(end_pos)
+
+        depth = self.grid.depth
+        goal = self.grid.index(*end_pos)
+        starts = start_tiles[:, 0] * depth + start_tiles[:, 1]
+        steps = self.flow_field[starts]
+        # on the goal or cut off from it: head straight for it
+        to_goal = (starts == goal) | (steps == -1)
+        # another npc stands on the next tile
+        blocked = ~to_goal & (steps != goal)
+        blocked[blocked] = self.grid.flags.ravel()[steps[blocked]] & LevelGrid.NPC != 0
+        for i in np.flatnonzero(blocked).tolist():
+            steps[i] = self.get_detour(int(starts[i]), int(steps[i]))
+        steps[to_goal] = goal
+        return np.stack(np.divmod(steps, depth), axis=1)
+
+    def get_detour(self, start, step):
+        # free neighbour that gets closer to the goal, else one that keeps the distance
+        cells, dist = self.grid.cells, self.flow_dist
+        free = [
+            node for node in self.graph[start]
+            if not cells[node] & LevelGrid.NPC and dist[node] != -1
+        ]
+        closer = [node for node in free if dist[node] < dist[start]]
+        if closer:
+            return closer[0]
+        level = [node for node in free if dist[node] == dist[start]]
+        return level[0] if level else step
+
+    def update_flow_field(self, goal_pos):
+        # reverse bfs from the goal; walls are not in the graph, npcs are handled per lookup
+        goal = self.grid.index(*goal_pos)
+        flow = [-1] * len(self.graph)
+        dist = [-1] * len(self.graph)
+        dist[goal] = 0
+        queue = deque([goal])
+
+        while queue:
+            cur_node = queue.popleft()
+            next_dist = dist[cur_node] + 1
+
+            for next_node in self.graph[cur_node]:
+                if dist[next_node] == -1:
+                    dist[next_node] = next_dist
+                    flow[next_node] = cur_node
+                    queue.append(next_node)
+
+        self.flow_goal = goal_pos
+        self.flow_field = np.array(flow, dtype='int32')
+        self.flow_dist = np.array(dist, dtype='int32')
 
-    @lru_cache
     def find(self, start_pos, end_pos):
-        visited = self.bfs(start_pos, end_pos)
-        path = [end_pos]
-        step = visited.get(end_pos, start_pos)
+        key = self.search, start_pos, end_pos
+        entry = self.path_cache.get(key)
+        if entry is None:
+            entry = self.search_path(start_pos, end_pos)
+            self.path_cache.put(key, *entry)
+        step, path = entry
+        # another npc stands on the next tile, the goal aside
+        if len(path) > 2 and self.grid.cells[path[-2]] & LevelGrid.NPC:
+            step = divmod(self.get_path_detour(path), self.grid.depth)
+        return step
+
+    def get_path_detour(self, path):
+        # free neighbour of the start that rejoins the path at the tile after the next,
+        # else the blocked next tile, to wait behind the npc
+        start, step, rejoin = path[-1], path[-2], path[-3]
+        cells = self.grid.cells
+        for node in self.graph[start]:
+            if not cells[node] & LevelGrid.NPC and (
+                    node == rejoin or rejoin in self.graph[node]):
+                return node
+        return step
+
+    def search_path(self, start_pos, end_pos):
+        # uncached find(): the next tile and the flat indices of the whole path, end to
+        # start. npcs move every tick, the searches go through them, see find
+        start, goal = self.grid.index(*start_pos), self.grid.index(*end_pos)
+        search = {'bfs': self.bfs, 'astar': self.astar, 'jps': self.jps}[self.search]
+        end = search(start, goal)
+        path = self.get_path(start, end) if end is not None else []
+        self.clear_search()
+        # on the goal or cut off from it: head straight for it
+        if len(path) < 2:
+            return end_pos, path
+        return divmod(path[-2], self.grid.depth), path
+
+    def get_path(self, start, end):
+        # tiles from end back to start, with the lines between jps jump points filled in
+        depth = self.grid.depth
+        path = [end]
+        node = end
+        while node != start:
+            prev = self.came_from[node]
+            (x0, z0), (x1, z1) = divmod(prev, depth), divmod(node, depth)
+            dx, dz = sign(x0 - x1), sign(z0 - z1)
+            while x1 != x0 or z1 != z0:
+                x1, z1 = x1 + dx, z1 + dz
+                path.append(x1 * depth + z1)
+            node = prev
+        return path
 
-        while step and step != start_pos:
-            path.append(step)
-            step = visited[step]
-        return path[-1]
+    def visit(self, node, came_from):
+        if self.came_from[node] == -1:
+            self.touched.append(node)
+        self.came_from[node] = came_from
+
+    def clear_search(self):
+        for node in self.touched:
+            self.came_from[node] = -1
+            self.g_cost[node] = math.inf
+        self.touched.clear()
 
     def bfs(self, start, goal):
         queue = deque([start])
-        visited = {start: None}
+        self.visit(start, start)
+        self.num_expanded = 0
 
         while queue:
             cur_node = queue.popleft()
+            self.num_expanded += 1
             if cur_node == goal:
-                break
+                return goal
             next_nodes = self.graph[cur_node]
 
             for next_node in next_nodes:
-                if next_node not in visited and next_node not in self.eng.level_map.npc_map:
+                if self.came_from[next_node] == -1:
                     queue.append(next_node)
-                    visited[next_node] = cur_node
-        return visited
+                    self.visit(next_node, cur_node)
+        return None
+
+    def astar(self, start, goal):
+        # octile-cost a* over the graph; returns the goal, or the node closest to it
+        # when the expansion budget runs out, or None when the goal can't be reached
+        depth = self.grid.depth
+        goal_x, goal_z = divmod(goal, depth)
+        self.visit(start, start)
+        self.g_cost[start] = 0.0
+        h = octile(*divmod(start, depth), goal_x, goal_z)
+        open_set = [(h, h, 0.0, start)]
+        best_h, best_node = h, start
+        self.num_expanded = 0
+
+        while open_set:
+            f, h, g, cur_node = heapq.heappop(open_set)
+            if g > self.g_cost[cur_node]:
+                continue
+            if cur_node == goal:
+                return goal
+            if h < best_h:
+                best_h, best_node = h, cur_node
+            self.num_expanded += 1
+            if self.num_expanded > self.max_expansions:
+                return best_node
+
+            cur_x, cur_z = divmod(cur_node, depth)
+            for next_node in self.graph[cur_node]:
+                next_x, next_z = divmod(next_node, depth)
+                next_g = g + (1.0 if cur_x == next_x or cur_z == next_z else SQRT_2)
+                if next_g < self.g_cost[next_node]:
+                    self.visit(next_node, cur_node)
+                    self.g_cost[next_node] = next_g
+                    next_h = octile(next_x, next_z, goal_x, goal_z)
+                    heapq.heappush(open_set, (next_g + next_h, next_h, next_g, next_node))
+        return None
+
+    def jps(self, start, goal):
+        # jump point search: a* that only expands the tiles where straight and diagonal
+        # runs over the uniform grid have to change direction
+        cells, width, depth = self.grid.cells, self.grid.width, self.grid.depth
+        blocking = LevelGrid.NAV_SOLID
+        goal_x, goal_z = divmod(goal, depth)
+
+        def walkable(x, z):
+            return 0 <= x < width and 0 <= z < depth and not cells[x * depth + z] & blocking
+
+        def jump(x, z, dx, dz):
+            while True:
+                x, z = x + dx, z + dz
+                if not walkable(x, z):
+                    return None
+                if x == goal_x and z == goal_z:
+                    return x, z
+                if dx and dz:
+                    if ((walkable(x - dx, z + dz) and not walkable(x - dx, z)) or
+                            (walkable(x + dx, z - dz) and not walkable(x, z - dz))):
+                        return x, z
+                    if jump(x, z, dx, 0) or jump(x, z, 0, dz):
+                        return x, z
+                elif dx:
+                    if ((walkable(x + dx, z + 1) and not walkable(x, z + 1)) or
+                            (walkable(x + dx, z - 1) and not walkable(x, z - 1))):
+                        return x, z
+                else:
+                    if ((walkable(x + 1, z + dz) and not walkable(x + 1, z)) or
+                            (walkable(x - 1, z + dz) and not walkable(x - 1, z))):
+                        return x, z
+
+        def get_directions(x, z, parent):
+            if parent == (x, z):
+                return self.ways
+            dx, dz = sign(x - parent[0]), sign(z - parent[1])
+            if dx and dz:
+                directions = [(dx, 0), (0, dz), (dx, dz)]
+                if not walkable(x - dx, z):
+                    directions.append((-dx, dz))
+                if not walkable(x, z - dz):
+                    directions.append((dx, -dz))
+            elif dx:
+                directions = [(dx, 0)]
+                if not walkable(x, z + 1):
+                    directions.append((dx, 1))
+                if not walkable(x, z - 1):
+                    directions.append((dx, -1))
+            else:
+                directions = [(0, dz)]
+                if not walkable(x + 1, z):
+                    directions.append((1, dz))
+                if not walkable(x - 1, z):
+                    directions.append((-1, dz))
+            return directions
+
+        self.visit(start, start)
+        self.g_cost[start] = 0.0
+        h = octile(*divmod(start, depth), goal_x, goal_z)
+        open_set = [(h, h, 0.0, start)]
+        best_h, best_node = h, start
+        self.num_expanded = 0
+
+        while open_set:
+            f, h, g, cur_node = heapq.heappop(open_set)
+            if g > self.g_cost[cur_node]:
+                continue
+            if cur_node == goal:
+                return goal
+            if h < best_h:
+                best_h, best_node = h, cur_node
+            self.num_expanded += 1
+            if self.num_expanded > self.max_expansions:
+                return best_node
+
+            cur_x, cur_z = divmod(cur_node, depth)
+            parent = divmod(self.came_from[cur_node], depth)
+            for dx, dz in get_directions(cur_x, cur_z, parent):
+                jump_point = jump(cur_x, cur_z, dx, dz)
+                if jump_point is None:
+                    continue
+                next_node = jump_point[0] * depth + jump_point[1]
+                next_g = g + octile(cur_x, cur_z, *jump_point)
+                if next_g < self.g_cost[next_node]:
+                    self.visit(next_node, cur_node)
+                    self.g_cost[next_node] = next_g
+                    next_h = octile(*jump_point, goal_x, goal_z)
+                    heapq.heappush(open_set, (next_g + next_h, next_h, next_g, next_node))
+        return None
 
     def get_next_nodes(self, x, y):
+        nodes = (self.grid.index(x + dx, y + dy) for dx, dy in self.ways)
         return [
-            (x + dx, y + dy) for dx, dy in self.ways if (x + dx, y + dy) not in self.wall_map
+            node for node in nodes if node != -1 and not self.grid.cells[node] & LevelGrid.NAV_SOLID
         ]
 
     def update_graph(self):
-        for y in range(self.level_map.depth):
-            for x in range(self.level_map.width):
-                self.graph[(x, y)] = self.graph.get((x, y), []) + self.get_next_nodes(x, y)
+        self.set_graph(*self.get_graph_arrays(self.grid))
+
+    @classmethod
+    def get_graph_arrays(cls, grid):
+        # every tile's walkable neighbours in the order of ways, read off shifted copies
+        # of the tile index grid with -1 on blocked tiles and around the border; as the
+        # concatenated neighbours of all tiles and the end of each tile's run
+        width, depth = grid.width, grid.depth
+        walkable = (grid.flags & LevelGrid.NAV_SOLID) == 0
+        padded = np.full((width + 2, depth + 2), -1, dtype='int32')
+        padded[1:-1, 1:-1] = np.where(walkable, np.arange(width * depth).reshape(width, depth), -1)
+        neighbours = np.stack([
+            padded[1 + dx: 1 + dx + width, 1 + dz: 1 + dz + depth].ravel() for dx, dz in cls.ways
+        ], axis=1)
+        is_next = neighbours != -1
+        return neighbours[is_next], np.cumsum(is_next.sum(axis=1), dtype='int32')
+
+    def set_graph(self, nodes, ends):
+        nodes, ends = nodes.tolist(), ends.tolist()
+        self.graph = [nodes[begin:end] for begin, end in zip([0] + ends, ends)]
+
+    def set_blocked(self, tile_pos, is_blocked):
+        # block or free one tile for navigation and patch the graph around it
+        x, z = tile_pos
+        if bool(self.grid.get_flags(x, z) & LevelGrid.BLOCKED) == bool(is_blocked):
+            return None
+        self.grid.set_flag(x, z, LevelGrid.BLOCKED, is_blocked)
+
+        for dx in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                node = self.grid.index(x + dx, z + dz)
+                if node != -1:
+                    self.graph[node] = self.get_next_nodes(x + dx, z + dz)
+
+        # a freed tile can shorten any path, a blocked one only breaks the paths across it
+        if is_blocked:
+            self.path_cache.drop_tile(self.grid.index(x, z))
+        else:
+            self.path_cache.clear()
+        self.flow_goal = None
@@ -1,14 +1,8 @@
 from itertools import cycle
 from camera import Camera
+from imu_fusion import get_euler_angles
 from settings import *
 import random
-import math
-
-def g(x):
-    B = 30
-    T = 0.1
-    return x*min(1, 1/(1 + math.exp(-1*B*(math.fabs(x) - T))))
-
 
 class PlayerAttribs:
     def __init__(self):
@@ -32,10 +26,12 @@ class Player(Camera):
         self.eng = eng
         self.sound = eng.sound
         self.play = eng.sound.play
+        self.controls = eng.controls
         super().__init__(position, yaw, pitch, roll)
 
         # these maps will update when instantiated LevelMap
         self.door_map, self.wall_map, self.item_map = None, None, None
+        self.grid = None
 
         # attribs
         self.health = self.eng.player_attribs.health
@@ -52,24 +48,25 @@ class Player(Camera):
         #
         self.key = None
 
-        #new variables
-        self.prev_shot_value = 1
-        self.prev_shot_time = 0
-
         self.toggle_index = 0
-        self.prev_toggle_value = 1
-        self.prev_toggle_time = 0
-        self.roll, self.pitch, self.yaw = mpu.get_sensor_data()
-
-        self.prev_pitch = 0 
-        self.prev_roll = 0
-        self.prev_yaw = 0
+        # the imu heading the player starts at faces the spawn yaw, mouse look turns the
+        # view on top of the imu by moving these offsets
+        self.imu_yaw_offset = self.yaw + get_euler_angles(self.controls.quaternion)[2]
+        self.imu_pitch_offset = self.pitch
+        # for the balancing runs, see headless
+        self.num_shots = 0
+        self.damage_taken = 0
 
 
     def handle_events(self, event):
-        # door interaction
-        if GPIO.input(DOOR_PIN) == 0:
-            self.interact_with_door()
+        # buttons, on the press edges gpio_input posts
+        if event.type == GPIO_PRESS_EVENT:
+            if event.pin == DOOR_PIN:
+                self.interact_with_door()
+            elif event.pin == TOGGLE_PIN:
+                self.toggle_weapon()
+            elif event.pin == SHOOT_PIN:
+                self.do_shot()
 
         if event.type == pg.KEYDOWN:
             if event.key == KEYS['INTERACT']:
@@ -83,29 +80,6 @@ class Player(Camera):
             elif event.key == KEYS['WEAPON_3']:
                 self.switch_weapon(weapon_id=ID.RIFLE_0)
 
-        if GPIO.input(TOGGLE_PIN) != self.prev_toggle_value:
-            if GPIO.input(TOGGLE_PIN) == 0 and (time.time() - self.prev_toggle_time) >= 0.1:
-                if self.toggle_index == 0:
-                    if self.weapons[ID.PISTOL_0]==1:
-                        self.toggle_index += 1
-                        self.switch_weapon(weapon_id=ID.PISTOL_0)
-
-                elif self.toggle_index == 1:
-                    if self.weapons[ID.RIFLE_0]==1:
-                        self.toggle_index += 1
-                        self.switch_weapon(weapon_id=ID.RIFLE_0)
-                    else:
-                        self.toggle_index -= 1
-                        self.switch_weapon(weapon_id=ID.KNIFE_0)
-                elif self.toggle_index == 2:
-                    self.toggle_index = 0 
-                    self.switch_weapon(weapon_id=ID.KNIFE_0)
-                    
-            self.prev_toggle_value = GPIO.input(TOGGLE_PIN)
-            self.prev_toggle_time = time.time()
-            print("TOGGLE INDEX:", self.toggle_index)
-
-
         # weapon by mouse wheel
         if event.type == pg.MOUSEWHEEL:
             weapon_id = next(self.weapon_cycle)
@@ -116,17 +90,30 @@ class Player(Camera):
         if event.type == pg.MOUSEBUTTONDOWN:
             if event.button == 1:
                 self.do_shot()
-    
-        if GPIO.input(SHOOT_PIN) != self.prev_shot_value:
-            if GPIO.input(SHOOT_PIN) == 0 and (time.time() - self.prev_shot_time) >= 0.1:
-                self.do_shot()
-                self.prev_shot = time.time()
 
-            self.prev_shot_value = GPIO.input(SHOOT_PIN)
+    def toggle_weapon(self):
+        if self.toggle_index == 0:
+            if self.weapons[ID.PISTOL_0]==1:
+                self.toggle_index += 1
+                self.switch_weapon(weapon_id=ID.PISTOL_0)
+
+        elif self.toggle_index == 1:
+            if self.weapons[ID.RIFLE_0]==1:
+                self.toggle_index += 1
+                self.switch_weapon(weapon_id=ID.RIFLE_0)
+            else:
+                self.toggle_index -= 1
+                self.switch_weapon(weapon_id=ID.KNIFE_0)
+        elif self.toggle_index == 2:
+            self.toggle_index = 0 
+            self.switch_weapon(weapon_id=ID.KNIFE_0)
 
     def update(self):
+        self.controls.update()
         self.mouse_control()
         self.keyboard_control()
+        # orientation fused on the imu thread, applied before the view matrix is built
+        self.set_orientation(self.controls.quaternion, self.imu_yaw_offset, self.imu_pitch_offset)
         super().update()
 
         # Player state updates
@@ -134,51 +121,6 @@ class Player(Camera):
         self.update_tile_position()
         self.pick_up_item()
 
-        # Get latest sensor readings
-        roll, pitch, yaw = mpu.get_sensor_data()
-
-        # Smoothing and Scaling
-        alpha = 0.25  # Smoothing factor (lower = more stable, higher = more responsive)
-        scale = 0.02  # Adjusted scaling for realistic motion tracking
-
-        # Invert and scale sensor values for game compatibility
-        yaw *= -scale
-        roll *= -scale
-        pitch *= scale
-
-        # Compute delta changes to avoid drift
-        delta_yaw = - self.prev_yaw + yaw
-        delta_roll = - self.prev_roll + roll
-        delta_pitch = - self.prev_pitch + pitch
-
-        # Apply a dead zone to ignore small, insignificant changes (reduces drift)
-        #dead_zone = 0.1  
-        #if abs(delta_yaw) < dead_zone: delta_yaw = 0
-        #if abs(delta_roll) < dead_zone: delta_roll = 0
-        #if abs(delta_pitch) < dead_zone: delta_pitch = 0
-        delta_yaw = g(delta_yaw)
-        delta_roll = g(delta_roll)
-        delta_pitch = g(delta_pitch)
-
-        # Apply smoothing filter
-        roll0 = self.prev_roll + (alpha * delta_roll)
-        pitch0 = self.prev_pitch + (alpha * delta_pitch)
-        yaw0 = self.prev_yaw + (alpha * delta_yaw)
-
-        # Update player orientation
-        self.yaw = yaw0
-        self.pitch = pitch0
-        self.roll = roll0
-
-        # Store previous values for the next update
-        self.prev_pitch = self.pitch
-        self.prev_yaw = self.yaw
-        self.prev_roll = self.roll
-
-        # Debug Output (Optional)
-        #print(f"Roll: {self.roll:.2f}, Pitch: {self.pitch:.2f}, Yaw: {self.yaw:.2f}")
-
-
     def check_health(self):
         if self.health <= 0:
             self.play(self.sound.player_death)
@@ -207,6 +149,7 @@ class Player(Camera):
     def do_shot(self):
         if self.weapon_id == ID.KNIFE_0:
             self.is_shot = True
+            self.num_shots += 1
             self.check_hit_on_npc()
             #
             self.play(self.sound.player_attack[ID.KNIFE_0])
@@ -215,6 +158,7 @@ class Player(Camera):
             consumption = WEAPON_SETTINGS[self.weapon_id]['ammo_consumption']
             if not self.is_shot and self.ammo >= consumption:
                 self.is_shot = True
+                self.num_shots += 1
                 self.check_hit_on_npc()
                 #
                 self.ammo -= consumption
@@ -226,7 +170,7 @@ class Player(Camera):
         self.tile_pos = int(self.position.x), int(self.position.z)
 
     def pick_up_item(self):
-        if self.tile_pos not in self.item_map:
+        if not self.grid.has_item(*self.tile_pos):
             return None
 
         item = self.item_map[self.tile_pos]
@@ -251,10 +195,14 @@ class Player(Camera):
         #
         elif item.tex_id == ID.KEY:
             self.key = 1
+            # the key door leads to the next level, load it in the background meanwhile
+            self.eng.prefetch_next_level()
         #
         self.play(self.sound.pick_up[item.tex_id])
         #
+        item.instances.remove(item)
         del self.item_map[self.tile_pos]
+        self.grid.set_item(*self.tile_pos, False)
 
     def interact_with_door(self):
         pos = self.position + self.forward
@@ -281,32 +229,35 @@ class Player(Camera):
             self.play(self.sound.open_door)
 
     def mouse_control(self):
-        mouse_dx, mouse_dy = pg.mouse.get_rel()
+        mouse_dx, mouse_dy = self.controls.mouse_rel
+        # turns the offsets the imu orientation is applied with, see set_orientation
         if mouse_dx:
-            self.rotate_yaw(delta_x=mouse_dx * MOUSE_SENSITIVITY)
+            self.imu_yaw_offset += mouse_dx * MOUSE_SENSITIVITY
         if mouse_dy:
-            self.rotate_pitch(delta_y=mouse_dy * MOUSE_SENSITIVITY)
+            self.imu_pitch_offset = glm.clamp(
+                self.imu_pitch_offset - mouse_dy * MOUSE_SENSITIVITY, -PITCH_MAX, PITCH_MAX
+            )
 
     def keyboard_control(self):
-        r, p, y = mpu.get_sensor_data()
+        r, p, y = self.controls.orientation
         #print("roll: ", r, p, y)
-        key_state = pg.key.get_pressed()
+        is_key_pressed = self.controls.is_key_pressed
         vel = PLAYER_SPEED * self.app.delta_time
         next_step = glm.vec2()
         #
 
-        if GPIO.input(FORWARD_PIN) == 0:
+        if self.controls.is_pin_pressed(FORWARD_PIN):
             next_step += self.move_forward(vel)
-        if GPIO.input(BACKWARD_PIN) == 0:
+        if self.controls.is_pin_pressed(BACKWARD_PIN):
             next_step += self.move_back(vel)
 
-        if key_state[KEYS['FORWARD']]:
+        if is_key_pressed(KEYS['FORWARD']):
             next_step += self.move_forward(vel)
-        if key_state[KEYS['BACK']]:
+        if is_key_pressed(KEYS['BACK']):
             next_step += self.move_back(vel)
-        if key_state[KEYS['STRAFE_R']]:
+        if is_key_pressed(KEYS['STRAFE_R']):
             next_step += self.move_right(vel)
-        if key_state[KEYS['STRAFE_L']]:
+        if is_key_pressed(KEYS['STRAFE_L']):
             next_step += self.move_left(vel)
         scale_r = 0.0012
         #print(r * scale_r, vel)
@@ -316,28 +267,6 @@ class Player(Camera):
             next_step += self.move_right(min(vel, -r * scale_r))
         self.move(next_step=next_step)
 
-    def keyboard_control2(self):
-        ax, ay, az = mpu.get_accel_data()
-        #print(ax, ay, az)
-        #key_state = pg.key.get_pressed()
-        vel = (PLAYER_SPEED) * self.app.delta_time
-
-        next_step = glm.vec2()
-        #if key_state[KEYS['FORWARD']]:
-        scale = 0.01
-        if ax > 0:
-            next_step += self.move_forward(vel*ax*scale)
-        #if key_state[KEYS['BACK']]:
-        else:
-            next_step += self.move_back(vel*-1*ax*scale)
-        if ay > 0:
-        #if key_state[KEYS['STRAFE_R']]:
-            next_step += self.move_right(vel*ay*scale)
-        #if key_state[KEYS['STRAFE_L']]:
-        else:
-            next_step += self.move_left(vel*-1*ay*scale)
-        #
-
     def move(self, next_step):
         if not self.is_collide(dx=next_step[0]):
             self.position.x += next_step[0]
@@ -354,9 +283,6 @@ class Player(Camera):
                 PLAYER_SIZE if dz > 0 else -PLAYER_SIZE if dz < 0 else 0)
                 )
         )
-        # check doors
-        if int_pos in self.door_map:
-            return self.door_map[int_pos].is_closed
-        # check walls
-        return int_pos in self.wall_map
+        # check walls and closed doors
+        return self.grid.is_solid(*int_pos)
     
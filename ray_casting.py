@@ -1,5 +1,45 @@
 import glm
-from settings import MAX_RAY_DIST
+import numpy as np
+from collections import OrderedDict
+from settings import MAX_RAY_DIST, RAY_BATCH_MIN_SIZE, VISIBILITY_CACHE_SIZE
+from level_grid import LevelGrid
+
+
+class VisibilityCache:
+    """
+    LRU cache of npc-to-player line of sight keyed on (npc tile, player tile, max_dist).
+    Emptied whenever the door epoch of the level grid moves on
+    """
+    def __init__(self, max_size=VISIBILITY_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.epoch = None
+        #
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key, epoch):
+        if epoch != self.epoch:
+            self.entries.clear()
+            self.epoch = epoch
+
+        hit = self.entries.get(key)
+        if hit is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return hit
+
+    def put(self, key, hit):
+        self.entries[key] = hit
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
 
 
 class RayCasting:
@@ -8,7 +48,10 @@ class RayCasting:
         self.level_map = eng.level_map
         self.wall_map = eng.level_map.wall_map
         self.door_map = eng.level_map.door_map
+        self.grid = eng.level_map.grid
         self.player = eng.player
+        #
+        self.visibility_cache = VisibilityCache()
 
     @staticmethod
     def get_init_data(pos1, pos2):
@@ -19,11 +62,129 @@ class RayCasting:
         max_ = delta_ * (1.0 - glm.fract(pos1)) if d_ > 0 else delta_ * glm.fract(pos1)
         return d_, delta_, max_
 
-    def run(self, start_pos, direction, max_dist=MAX_RAY_DIST, npc_to_player_flag=True):
+    @staticmethod
+    def get_init_data_batch(pos1, pos2):
+        # get_init_data over (num_rays, 3) arrays of start and end points
+        d_ = np.sign(pos2 - pos1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta_ = np.where(d_ != 0, np.minimum(d_ / (pos2 - pos1), 10000000.0), 10000000.0)
+        #
+        fract = pos1 - np.floor(pos1)
+        max_ = np.where(d_ > 0, delta_ * (1.0 - fract), delta_ * fract)
+        return d_.astype('int64'), delta_, max_
+
+    def get_visibility_key(self, start_pos, max_dist, target_tile):
+        target_tile = self.player.tile_pos if target_tile is None else target_tile
+        return int(start_pos[0]), int(start_pos[2]), *target_tile, max_dist
+
+    def run_batch(self, origins, directions, max_dists=MAX_RAY_DIST, target_tile=None):
+        """
+        run() for many npc-to-player rays: answers what it can from the visibility cache
+        and traces the rest in one trace_batch() call
+        """
+        origins = np.asarray(origins, dtype='float32').reshape(-1, 3)
+        directions = np.asarray(directions, dtype='float32').reshape(-1, 3)
+        max_dists = np.broadcast_to(np.asarray(max_dists, dtype='float32'), len(origins))
+        #
+        epoch = self.grid.door_epoch
+        keys = [
+            self.get_visibility_key(pos, max_dist, target_tile)
+            for pos, max_dist in zip(origins.tolist(), max_dists.tolist())
+        ]
+        hits = [self.visibility_cache.get(key, epoch) for key in keys]
+        misses = [i for i, hit in enumerate(hits) if hit is None]
+        if misses:
+            traced = self.trace_batch(
+                origins[misses], directions[misses], max_dists[misses], target_tile
+            )
+            for i, hit in zip(misses, traced.tolist()):
+                hits[i] = hit
+                self.visibility_cache.put(keys[i], hit)
+        return np.array(hits, dtype='bool')
+
+    def trace_batch(self, origins, directions, max_dists=MAX_RAY_DIST, target_tile=None):
+        """
+        Traces many rays towards target_tile (the player's tile by default) in one pass,
+        with the same stepping as trace(start_pos, direction, max_dist, npc_to_player_flag=True).
+        Returns a bool array: True where the ray reaches the target before a wall or a closed door
+        """
+        origins = np.asarray(origins, dtype='float32').reshape(-1, 3)
+        directions = np.asarray(directions, dtype='float32').reshape(-1, 3)
+        max_dists = np.broadcast_to(np.asarray(max_dists, dtype='float32'), len(origins))
+        target_x, target_z = self.player.tile_pos if target_tile is None else target_tile
+        #
+        num_rays = len(origins)
+        if num_rays < RAY_BATCH_MIN_SIZE:
+            rays = zip(origins.tolist(), directions.tolist(), max_dists.tolist())
+            return np.array([
+                self.trace(glm.vec3(*pos), glm.vec3(*direction), max_dist, target_tile=target_tile)
+                for pos, direction, max_dist in rays
+            ], dtype='bool')
+
+        # end points in float32, as glm computes them in trace()
+        pos1 = origins.astype('float64')
+        pos2 = (origins + directions * max_dists[:, None]).astype('float64')
+        step, delta, max_ = self.get_init_data_batch(pos1, pos2)
+
+        # every boundary crossing of every axis: max_ accumulated by delta, as in trace().
+        # an axis is crossed at most |pos2 - pos1| + 1 times before all of max_ exceed 1.0
+        # trace() always steps the axis with the smallest max, preferring z, then y, then x on ties,
+        # so a stable sort of the crossings laid out in z, y, x order visits them the same way
+        crossings, axes = [], []
+        for i in (2, 1, 0):
+            num_steps = int(np.ceil(np.abs(pos2[:, i] - pos1[:, i]).max())) + 2
+            axis_crossings = np.repeat(delta[:, i:i + 1], num_steps, axis=1)
+            axis_crossings[:, 0] = max_[:, i]
+            crossings.append(np.cumsum(axis_crossings, axis=1))
+            axes.append(np.full(num_steps, i))
+        crossings, axes = np.concatenate(crossings, axis=1), np.concatenate(axes)
+        order = np.argsort(crossings, axis=1, kind='stable')
+        crossings = np.take_along_axis(crossings, order, axis=1)
+        axis = axes[order]
+
+        # tile of the voxel entered before each crossing, checked while the next crossing is <= 1
+        x = np.empty_like(axis)
+        z = np.empty_like(axis)
+        x[:, 0], z[:, 0] = pos1[:, 0].astype('int64'), pos1[:, 2].astype('int64')
+        x[:, 1:] = (axis[:, :-1] == 0) * step[:, 0:1]
+        z[:, 1:] = (axis[:, :-1] == 2) * step[:, 2:3]
+        x, z = np.cumsum(x, axis=1), np.cumsum(z, axis=1)
+        in_range = crossings <= 1.0
+
+        inside = (x >= 0) & (x < self.grid.width) & (z >= 0) & (z < self.grid.depth)
+        tile_flags = np.zeros(x.shape, dtype='uint8')
+        tile_flags[inside] = self.grid.flags[x[inside], z[inside]]
+
+        # first tile that ends the ray: a wall or closed door, or the target
+        blocked = (tile_flags & LevelGrid.SOLID).astype('bool')
+        reached = (x == target_x) & (z == target_z)
+        stops = in_range & (blocked | reached)
+        first = np.argmax(stops, axis=1)[:, None]
+        return (
+            stops.any(axis=1) &
+            np.take_along_axis(reached & ~blocked, first, axis=1)[:, 0]
+        )
+
+    def run(self, start_pos, direction, max_dist=MAX_RAY_DIST, npc_to_player_flag=True,
+            target_tile=None):
+        # player to npc rays are never cached, they depend on where the player looks
+        if not npc_to_player_flag:
+            return self.trace(start_pos, direction, max_dist, npc_to_player_flag=False)
+
+        key = self.get_visibility_key(start_pos, max_dist, target_tile)
+        hit = self.visibility_cache.get(key, self.grid.door_epoch)
+        if hit is None:
+            hit = self.trace(start_pos, direction, max_dist, target_tile=target_tile)
+            self.visibility_cache.put(key, hit)
+        return hit
+
+    def trace(self, start_pos, direction, max_dist=MAX_RAY_DIST, npc_to_player_flag=True,
+              target_tile=None):
         #
         x1, y1, z1 = start_pos  # start point
         x2, y2, z2 = start_pos + direction * max_dist  # end point
         cur_voxel_pos = glm.ivec3(x1, y1, z1)
+        target_tile = self.player.tile_pos if target_tile is None else target_tile
 
         # init ray casting
         dx, delta_x, max_x = self.get_init_data(x1, x2)
@@ -33,22 +194,19 @@ class RayCasting:
         while not (max_x > 1.0 and max_y > 1.0 and max_z > 1.0):
             #
             cur_tile_pos = (cur_voxel_pos.x, cur_voxel_pos.z)
+            flags = self.grid.get_flags(*cur_tile_pos)
 
             # ----------------------------------------------
-            # check walls
-            if cur_tile_pos in self.wall_map:
+            # check walls and closed doors
+            if flags & LevelGrid.SOLID:
                 return False
-            # check closed doors
-            if cur_tile_pos in self.door_map:
-                if self.door_map[cur_tile_pos].is_closed:
-                    return False
 
             # check ray from npc or player
             if npc_to_player_flag:
-                if self.player.tile_pos == cur_tile_pos:
+                if target_tile == cur_tile_pos:
                     return True
             # from player to npc
-            elif cur_tile_pos in self.level_map.npc_map:
+            elif flags & LevelGrid.NPC:
                 return cur_tile_pos
             # ----------------------------------------------
             if max_x < max_y:
@@ -0,0 +1,141 @@
+"""
+Replays a session recorded with `python main.py --record session.rec` tick for tick and
+times every frame: the ticks the frame ran (events, Engine.update) and, with --render,
+drawing it in a window (Engine.render and the buffer swap). Without --render the ticks
+run on a HeadlessEngine. The replay is checked against the state the session ended in.
+
+--out saves the frame times, --compare prints them against the times saved from an
+earlier replay of the same session, e.g. on another commit.
+
+    python -m replay session.rec [--render] [--out times.npz] [--compare base.npz]
+"""
+import argparse
+import random
+import time
+import numpy as np
+import pygame as pg
+from headless import HeadlessEngine
+from input_log import InputLog, ReplayControls
+from main import Game
+from settings import TICK_RATE
+
+PERCENTILES = (50, 95, 99)
+
+
+class ReplayGame(Game):
+    """
+    Game in its window with the input of a log instead of the devices, one recorded frame
+    per frame as fast as they render, each drawn at its recorded alpha
+    """
+    def __init__(self, log):
+        super().__init__(controls=ReplayControls(log), seed=log.seed)
+        self.log = log
+
+    def replay(self):
+        num_frames = len(self.log.frames)
+        update_times, render_times = np.full(num_frames, np.nan), np.full(num_frames, np.nan)
+        for i, (events, ticks, alpha) in enumerate(self.log.frames):
+            # the window's own events, only to close it
+            for event in pg.event.get():
+                if event.type == pg.QUIT or (event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE):
+                    self.is_running = False
+            if not self.is_running:
+                break
+            start = time.perf_counter()
+            for event in events:
+                self.engine.handle_events(InputLog.get_event(*event))
+            for _ in ticks:
+                self.tick()
+            update_times[i] = time.perf_counter() - start
+            #
+            start = time.perf_counter()
+            self.alpha = alpha
+            self.time = self.num_ticks * self.tick_time * 0.001
+            self.render()
+            self.ctx.finish()
+            render_times[i] = time.perf_counter() - start
+        player, num_ticks = self.engine.player, self.num_ticks
+        pg.quit()
+        return player, num_ticks, update_times, render_times
+
+
+def replay_headless(log):
+    random.seed(log.seed)
+    eng = HeadlessEngine(ReplayControls(log))
+    update_times = np.empty(len(log.frames))
+    for i, (events, ticks, alpha) in enumerate(log.frames):
+        start = time.perf_counter()
+        for event in events:
+            eng.handle_events(InputLog.get_event(*event))
+        for _ in ticks:
+            eng.app.tick(eng)
+        update_times[i] = time.perf_counter() - start
+    return eng.player, eng.app.num_ticks, update_times, np.full(len(log.frames), np.nan)
+
+
+def check_end(log, player, num_ticks):
+    if log.end is None:
+        return 'the session did not close its log, nothing to check against'
+    end_ticks, end_position, end_health = log.end
+    position, health = tuple(player.position), player.health
+    if (num_ticks, position, health) == (end_ticks, end_position, end_health):
+        return f'matches the session: {num_ticks} ticks, health {health}'
+    return (f'DIVERGED from the session: {num_ticks} ticks, position {position}, health '
+            f'{health}, recorded {end_ticks} ticks, position {end_position}, health {end_health}')
+
+
+def get_stats(times):
+    times = times[~np.isnan(times)]
+    if not len(times):
+        return [np.nan] * (len(PERCENTILES) + 2)
+    return [times.mean(), *np.percentile(times, PERCENTILES), times.max()]
+
+
+def print_times(columns, baseline=None):
+    names = ['mean', *(f'p{p}' for p in PERCENTILES), 'max']
+    print(f'{"ms":>10} ' + ' '.join(f'{name:>8}' for name in names))
+    for column in ('update_ms', 'render_ms', 'frame_ms'):
+        if np.isnan(columns[column]).all():
+            continue
+        rows = [('', columns)] + ([('base', baseline)] if baseline is not None else [])
+        for label, times in rows:
+            stats = get_stats(times[column])
+            print(f'{label or column:>10} ' + ' '.join(f'{value:>8.2f}' for value in stats))
+        if baseline is not None:
+            change = [
+                (new / old - 1) * 100 if old else np.nan
+                for new, old in zip(get_stats(columns[column]), get_stats(baseline[column]))
+            ]
+            print(f'{"change %":>10} ' + ' '.join(f'{value:>+8.1f}' for value in change))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('log', help='input log of main.py --record')
+    parser.add_argument('--render', action='store_true', help='replay in a window')
+    parser.add_argument('--out', help='npz to save the frame times to')
+    parser.add_argument('--compare', help='npz of the frame times of an earlier replay')
+    args = parser.parse_args()
+
+    log = InputLog(args.log)
+    if log.tick_rate != TICK_RATE:
+        parser.error(f'{args.log} was recorded at {log.tick_rate} Hz, TICK_RATE is {TICK_RATE}')
+
+    if args.render:
+        player, num_ticks, update_times, render_times = ReplayGame(log).replay()
+    else:
+        player, num_ticks, update_times, render_times = replay_headless(log)
+    columns = {
+        'update_ms': update_times * 1e3,
+        'render_ms': render_times * 1e3,
+        'frame_ms': (update_times + np.nan_to_num(render_times)) * 1e3,
+    }
+    print(f'{args.log}: {len(log.frames)} frames, {log.num_ticks} ticks, seed {log.seed}')
+    print(check_end(log, player, num_ticks))
+    if args.out:
+        np.savez(args.out, **columns)
+    print_times(columns, dict(np.load(args.compare)) if args.compare else None)
+
+
+if __name__ == '__main__':
+    main()
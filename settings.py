@@ -2,9 +2,7 @@ import math
 import glm
 import pygame as pg
 from texture_id import ID
-import RPi.GPIO as GPIO
 import time
-from mpu9250 import MPU9250
 
 # opengl
 MAJOR_VERSION = 3
@@ -21,9 +19,24 @@ DOOR_PIN = 14
 TOGGLE_PIN = 27
 FORWARD_PIN = 17
 BACKWARD_PIN = 4
+GPIO_PINS = (SHOOT_PIN, DOOR_PIN, TOGGLE_PIN, FORWARD_PIN, BACKWARD_PIN)
+# the buttons post these events on press and release, see GPIOInput
+GPIO_PRESS_EVENT = pg.USEREVENT + 2
+GPIO_RELEASE_EVENT = pg.USEREVENT + 3
+# presses within this many ms of the last edge are contact bounce
+GPIO_BOUNCE_TIME = 100
 
-#mpu thing
-mpu = MPU9250()
+# the mpu is sampled on a background thread, started by the game, see IMUService
+IMU_SAMPLE_RATE = 500  # Hz, 200 to 1000
+IMU_BUFFER_SIZE = 1024  # samples
+# let the sensor buffer the samples and read IMU_FIFO_SAMPLES of them per bus poll
+IMU_USE_FIFO = False
+IMU_FIFO_SAMPLES = 8
+# orientation filter, 'madgwick' or 'mahony', with the magnetometer correcting the heading
+IMU_FUSION = 'madgwick'
+IMU_USE_MAGNETOMETER = False
+# seconds the imu must rest at startup while the gyro bias is measured
+IMU_CALIBRATION_TIME = 1.0
 
 # control keys
 KEYS = {
@@ -72,16 +85,45 @@ BG_COLOR = glm.vec3(0.1, 0.16, 0.25)
 # textures
 TEX_SIZE = 256
 TEXTURE_UNIT_0 = 0
+# gpu memory for the texture layers a level uses, least recently used levels' layers are evicted
+TEXTURE_MEMORY_BUDGET = 64 * 2 ** 20  # bytes
 
 # walls
 WALL_SIZE = 1
 H_WALL_SIZE = WALL_SIZE / 2
 
+# simulation
+# the world steps at a fixed tick rate whatever the frame rate, rendering interpolates
+TICK_RATE = 60  # Hz
+# ticks run in one frame at most, a longer stall slows the game down instead of piling up
+MAX_TICKS_PER_FRAME = 5
+# frame rate cap, 0 for none
+MAX_FPS = 60
+# speeds and chances per tick below were tuned at this tick rate
+BASE_TICK_RATE = 60  # Hz
+
 # timer
-SYNC_PULSE = 10  # ms
+# ms between animation steps, a step every frame at the old 60 fps
+SYNC_PULSE = 1000 / 60
+# ms between enemy attack sounds
+SOUND_PULSE = 750
 
 # ray casting
 MAX_RAY_DIST = 20
+# batches smaller than this are traced ray by ray, where the python loop is faster
+RAY_BATCH_MIN_SIZE = 32
+# npc-to-player line of sight results kept between frames
+VISIBILITY_CACHE_SIZE = 4096
+
+# path finding
+# npcs follow one flow field from the player's tile instead of a bfs each
+PATH_FLOW_FIELD = True
+# engine behind PathFinder.find: 'bfs', 'astar' (octile heuristic) or 'jps' (jump point search)
+PATH_SEARCH = 'bfs'
+# node expansions an a* or jps search may spend before settling for the closest tile reached
+PATH_MAX_EXPANSIONS = 4096
+# find() results kept until a tile on their path gets blocked, npcs are routed around per lookup
+PATH_CACHE_SIZE = 1024
 
 # animations
 ANIM_DOOR_SPEED = 0.03
@@ -1,3 +1,4 @@
+import hashlib
 from settings import *
 from texture_id import ID
 
@@ -19,15 +20,15 @@ class ShaderProgram:
 
     def set_uniforms_on_init(self):
         # level
-        self.level['m_proj'].write(self.player.m_proj)
+        self.eng.camera_block.bind(self.level)
         self.level['u_texture_array_0'] = TEXTURE_UNIT_0
 
         # instanced door
-        self.instanced_door['m_proj'].write(self.player.m_proj)
+        self.eng.camera_block.bind(self.instanced_door)
         self.instanced_door['u_texture_array_0'] = TEXTURE_UNIT_0
 
         # billboard
-        self.instanced_billboard['m_proj'].write(self.player.m_proj)
+        self.eng.camera_block.bind(self.instanced_billboard)
         self.instanced_billboard['u_texture_array_0'] = TEXTURE_UNIT_0
 
         # hud
@@ -36,17 +37,97 @@ class ShaderProgram:
         # weapon
         self.weapon['u_texture_array_0'] = TEXTURE_UNIT_0
 
+    def set_texture_layers(self, layer_by_id):
+        # resident layer of every tex id, after the textures of a level are loaded
+        layer_by_id = layer_by_id.astype('int32')
+        for program in (self.level, self.instanced_door, self.instanced_billboard,
+                        self.instanced_hud, self.weapon):
+            program['u_layers'].write(layer_by_id)
+
     def update(self):
-        self.level['m_view'].write(self.player.m_view)
-        self.instanced_door['m_view'].write(self.player.m_view)
-        self.instanced_billboard['m_view'].write(self.player.m_view)
+        self.eng.camera_block.update(self.player, self.eng.app.time)
 
     def get_program(self, shader_name):
+        return self.eng.program_registry.get(shader_name)
+
+
+class CameraBlock:
+    """
+    std140 uniform buffer with the camera data of the 3d programs, written with one buffer
+    write per frame however many programs read it:
+
+        layout (std140) uniform Camera {
+            mat4 m_proj;       // offset 0
+            mat4 m_view;       // 64
+            mat4 m_view_proj;  // 128
+            vec3 cam_pos;      // 192
+            float time;        // 204
+        };
+    """
+    BINDING = 0
+    SIZE = 208
+
+    def __init__(self, ctx):
+        self.buffer = ctx.buffer(reserve=self.SIZE)
+        self.buffer.bind_to_uniform_block(self.BINDING)
+
+    def bind(self, program):
+        program['Camera'].binding = self.BINDING
+
+    def update(self, camera, time):
+        self.buffer.write(b''.join((
+            camera.m_proj.to_bytes(),
+            camera.m_view.to_bytes(),
+            (camera.m_proj * camera.m_view).to_bytes(),
+            glm.vec4(camera.view_position, time).to_bytes(),
+        )))
+
+
+class ProgramRegistry:
+    """
+    Shader programs of one context, compiled once and shared by the ShaderPrograms of
+    every level. Programs are keyed by a hash of their sources, so an edited shader
+    gets compiled again after clear(). moderngl has no way to load a program binary, so
+    compiled shaders only persist between runs through the driver's own shader cache
+    """
+    def __init__(self, ctx):
+        self.ctx = ctx
+        # shader name -> (vertex shader, fragment shader)
+        self.sources = {}
+        # source hash -> program
+        self.programs = {}
+        self.num_compiles = 0
+
+    def get(self, shader_name):
+        if shader_name not in self.sources:
+            self.sources[shader_name] = self.read_sources(shader_name)
+        vertex_shader, fragment_shader = self.sources[shader_name]
+        key = hashlib.sha256(f'{vertex_shader}\0{fragment_shader}'.encode()).hexdigest()
+
+        if key not in self.programs:
+            self.programs[key] = self.ctx.program(
+                vertex_shader=vertex_shader, fragment_shader=fragment_shader
+            )
+            self.num_compiles += 1
+        return self.programs[key]
+
+    @staticmethod
+    def read_sources(shader_name):
         with open(f'shaders/{shader_name}.vert') as file:
             vertex_shader = file.read()
 
         with open(f'shaders/{shader_name}.frag') as file:
             fragment_shader = file.read()
 
-        program = self.ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
-        return program
+        # shaders index their u_layers uniform by tex id
+        defines = f'#define NUM_TEXTURES {NUM_TEXTURES}\n'
+        return tuple(
+            shader.replace('\n', f'\n{defines}', 1) for shader in (vertex_shader, fragment_shader)
+        )
+
+    def clear(self):
+        # reread the sources on the next get(), releasing the programs they replace
+        self.sources.clear()
+        for program in self.programs.values():
+            program.release()
+        self.programs.clear()
@@ -5,14 +5,21 @@ layout (location = 1) in vec2 in_uv;
 layout (location = 2) in mat4 m_model;
 layout (location = 4) in int in_tex_id;
 
-uniform mat4 m_proj, m_view;
+layout (std140) uniform Camera {
+    mat4 m_proj;
+    mat4 m_view;
+    mat4 m_view_proj;
+    vec3 cam_pos;
+    float time;
+};
+uniform int u_layers[NUM_TEXTURES];
 
 out vec2 uv;
 flat out int tex_id;
 
 void main() {
     uv = in_uv;
-    tex_id = in_tex_id;
+    tex_id = u_layers[in_tex_id];
 
-    gl_Position = m_proj * m_view * m_model * in_position;
+    gl_Position = m_view_proj * m_model * in_position;
 }
\ No newline at end of file
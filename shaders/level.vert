@@ -6,7 +6,14 @@ layout (location = 2) in int face_id;
 layout (location = 3) in int ao_id;
 layout (location = 4) in int flip_id;
 
-uniform mat4 m_proj, m_view;
+layout (std140) uniform Camera {
+    mat4 m_proj;
+    mat4 m_view;
+    mat4 m_view_proj;
+    vec3 cam_pos;
+    float time;
+};
+uniform int u_layers[NUM_TEXTURES];
 
 flat out int tex_id;
 out vec2 uv;
@@ -34,11 +41,11 @@ const int uv_indices[24] = int[24](
 
 
 void main() {
-    tex_id = in_tex_id;
+    tex_id = u_layers[in_tex_id];
     int uv_index = gl_VertexID % 6  + ((face_id & 1) + flip_id * 2) * 6;
     uv = uv_coords[uv_indices[uv_index]];
 
     shading = face_shading[face_id] * ao_values[ao_id];
 
-    gl_Position = m_proj * m_view * vec4(in_position, 1.0);
+    gl_Position = m_view_proj * vec4(in_position, 1.0);
 }
@@ -5,8 +5,9 @@ in vec2 uv;
 
 uniform sampler2DArray u_texture_array_0;
 uniform int tex_id;
+uniform int u_layers[NUM_TEXTURES];
 
 
 void main() {
-    frag_color = texture(u_texture_array_0, vec3(uv, tex_id));
+    frag_color = texture(u_texture_array_0, vec3(uv, u_layers[tex_id]));
 }
\ No newline at end of file
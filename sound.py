@@ -1,3 +1,4 @@
+from collections import defaultdict
 import pygame as pg
 from texture_id import *
 from settings import MAX_SOUND_CHANNELS
@@ -63,3 +64,20 @@ class Sound:
         self.channel += 1
         if self.channel == MAX_SOUND_CHANNELS:
             self.channel = 0
+
+
+class SilentSound:
+    """
+    Sound without a mixer, for running the simulation headless: every sound Sound holds
+    is None here and play does nothing
+    """
+    def __init__(self):
+        self.player_attack = defaultdict(type(None))
+        self.player_hurt = self.player_death = self.player_missed = self.open_door = None
+        self.pick_up = defaultdict(type(None))
+        self.enemy_attack = defaultdict(type(None))
+        self.spotted = defaultdict(type(None))
+        self.death = defaultdict(type(None))
+
+    def play(self, sound):
+        pass
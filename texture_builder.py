@@ -1,40 +1,125 @@
 import math
+import os
 import pathlib
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
 import pygame as pg
 from settings import TEX_SIZE
 
 
+def load_layer(path, layer):
+    # decode one texture into its (tex_size, tex_size, 4) rgba layer, clipped like a blit
+    texture = pg.image.load(path)
+    width, height = texture.get_size()
+    pixels = np.frombuffer(pg.image.tostring(texture, 'RGBA', False), dtype='uint8')
+    pixels = pixels.reshape(height, width, 4)[:layer.shape[0], :layer.shape[1]]
+    layer[:pixels.shape[0], :pixels.shape[1]] = pixels
+
+
+def load_shared_layers(shm_name, shape, paths_by_layer):
+    # process pool worker: decode straight into the layers array of the parent
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        layers = np.ndarray(shape, dtype='uint8', buffer=shm.buf)
+        for i, path in paths_by_layer:
+            load_layer(path, layers[i])
+        del layers
+    finally:
+        shm.close()
+
+
 class TextureArrayBuilder:
-    def __init__(self, should_build=True):
+    """
+    Decodes the numbered textures into one (layers, tex_size, tex_size, 4) rgba array on
+    a pool of threads, or of processes sharing the array. The texture array and sprite
+    sheet pngs are written afterwards on a background thread, see export_thread
+    """
+    def __init__(self, should_build=True, num_workers=None, use_processes=False,
+                 save_sprite_sheet=True):
+        self.num_workers = num_workers
+        self.use_processes = use_processes
+        self.layers: np.ndarray = None
+        self.export_thread: threading.Thread = None
         if should_build:
             # main textures
-            self.build(
-                load_path='assets/textures',
+            self.layers = self.build(load_path='assets/textures')
+            self.export_thread = self.export(
+                self.layers,
                 texture_array_path='assets/texture_array/texture_array.png',
-                sprite_sheet_path='assets/sprite_sheet/sprite_sheet.png'
+                sprite_sheet_path='assets/sprite_sheet/sprite_sheet.png' if save_sprite_sheet else None
             )
 
-    def build(self, load_path, texture_array_path, sprite_sheet_path, tex_size=TEX_SIZE):
+    @staticmethod
+    def get_texture_paths(load_path='assets/textures'):
         texture_paths = [
             item for item in pathlib.Path(load_path).rglob('*.png') if item.is_file()
         ]
-        texture_paths = sorted(
+        return sorted(
             texture_paths,
             key=lambda tex_path: int(re.search('\\d+', str(tex_path)).group(0))
         )
-        # empty tex array
-        texture_array = pg.Surface([tex_size, tex_size * len(texture_paths)], pg.SRCALPHA, 32)
 
-        # empty sprite_sheet
-        size = int(math.sqrt(len(texture_paths))) + 1
-        sheet_size = tex_size * size
-        sprite_sheet = pg.Surface([sheet_size, sheet_size], pg.SRCALPHA, 32)
+    def build(self, load_path, tex_size=TEX_SIZE):
+        # layer i is the i-th texture of the numeric sort, whichever worker decodes it
+        texture_paths = self.get_texture_paths(load_path)
+        shape = len(texture_paths), tex_size, tex_size, 4
+        if self.use_processes:
+            return self.build_in_processes(texture_paths, shape)
 
-        for i, path in enumerate(texture_paths):
-            texture = pg.image.load(path)
-            texture_array.blit(texture, (0, i * tex_size))
-            sprite_sheet.blit(texture, ((i % size) * tex_size, (i // size) * tex_size))
+        layers = np.zeros(shape, dtype='uint8')
+        with ThreadPoolExecutor(self.num_workers) as pool:
+            for _ in pool.map(load_layer, texture_paths, layers):
+                pass
+        return layers
 
-        pg.image.save(sprite_sheet, sprite_sheet_path)
+    def build_in_processes(self, texture_paths, shape):
+        num_workers = self.num_workers or os.cpu_count() or 1
+        shm = shared_memory.SharedMemory(create=True, size=math.prod(shape))
+        try:
+            shared_layers = np.ndarray(shape, dtype='uint8', buffer=shm.buf)
+            shared_layers[:] = 0
+            # one strided batch per worker, to pay for attaching the memory once
+            batches = [
+                list(enumerate(texture_paths))[i::num_workers] for i in range(num_workers)
+            ]
+            with ProcessPoolExecutor(num_workers) as pool:
+                for _ in pool.map(load_shared_layers, [shm.name] * num_workers,
+                                  [shape] * num_workers, batches):
+                    pass
+            layers = shared_layers.copy()
+            del shared_layers
+        finally:
+            shm.close()
+            shm.unlink()
+        return layers
+
+    def export(self, layers, texture_array_path, sprite_sheet_path=None):
+        # the pngs are only for inspecting the textures, keep them off the startup path
+        thread = threading.Thread(
+            target=self.save_pngs, args=(layers, texture_array_path, sprite_sheet_path)
+        )
+        thread.start()
+        return thread
+
+    @staticmethod
+    def save_pngs(layers, texture_array_path, sprite_sheet_path=None):
+        num_layers, tex_size = layers.shape[:2]
+        # layers stacked top to bottom
+        texture_array = pg.image.frombuffer(
+            layers.tobytes(), (tex_size, tex_size * num_layers), 'RGBA'
+        )
         pg.image.save(texture_array, texture_array_path)
+
+        if sprite_sheet_path is None:
+            return None
+        # square grid of layers, row by row
+        size = int(math.sqrt(num_layers)) + 1
+        sheet = np.zeros((size * tex_size, size * tex_size, 4), dtype='uint8')
+        for i, layer in enumerate(layers):
+            y, x = (i // size) * tex_size, (i % size) * tex_size
+            sheet[y: y + tex_size, x: x + tex_size] = layer
+        sprite_sheet = pg.image.frombuffer(sheet.tobytes(), sheet.shape[1::-1], 'RGBA')
+        pg.image.save(sprite_sheet, sprite_sheet_path)
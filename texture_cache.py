@@ -0,0 +1,59 @@
+import hashlib
+import json
+import mmap
+import os
+from settings import TEX_SIZE
+
+
+class TextureArrayCache:
+    """
+    Ready-to-upload RGBA layers of the texture array in a raw file, keyed on a hash of
+    the names, mtimes and sizes of the source textures. A warm start maps the file and
+    hands it to ctx.texture_array without encoding or decoding any png
+    """
+    # bump when the layout of the cached data changes
+    VERSION = 1
+
+    def __init__(self, texture_paths, cache_path='assets/texture_array/texture_array.rgba',
+                 tex_size=TEX_SIZE):
+        self.texture_paths = texture_paths
+        self.cache_path = cache_path
+        self.meta_path = f'{cache_path}.json'
+        self.tex_size = tex_size
+        self.key = self.get_key()
+
+    def get_key(self):
+        sources = []
+        for path in self.texture_paths:
+            stat = os.stat(path)
+            sources.append([str(path), stat.st_mtime_ns, stat.st_size])
+        data = json.dumps([self.VERSION, self.tex_size, sources])
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def load(self):
+        # (width, height, layers) and a read-only mmap of the layers, None on a miss
+        try:
+            with open(self.meta_path) as file:
+                meta = json.load(file)
+            if meta['key'] != self.key:
+                return None
+            width, height, num_layers = meta['size']
+            with open(self.cache_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size != width * height * num_layers * 4:
+                    return None
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, KeyError):
+            return None
+        return (width, height, num_layers), data
+
+    def save(self, size, data):
+        # data first, then the key that validates it, each swapped in whole
+        self.write(self.cache_path, 'wb', data)
+        self.write(self.meta_path, 'w', json.dumps({'key': self.key, 'size': list(size)}))
+
+    @staticmethod
+    def write(path, mode, data):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, mode) as file:
+            file.write(data)
+        os.replace(tmp_path, path)
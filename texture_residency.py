@@ -0,0 +1,147 @@
+import numpy as np
+from settings import *
+
+# drawn on every level: the hud icons, digits and screen effects, and every weapon frame
+GLOBAL_TEX_IDS = frozenset(
+    [tex_id for tex_id in HUD_SETTINGS if tex_id < NUM_TEXTURES] +
+    list(range(ID.DIGIT_0, ID.DIGIT_9 + 1)) +
+    [tex_id for weapon_id in WEAPON_SETTINGS
+     for tex_id in range(weapon_id, weapon_id + WEAPON_NUM_FRAMES)]
+)
+
+
+class TextureResidency:
+    """
+    Keeps on the gpu only the texture layers the current level draws, in compact slots of
+    a texture array no larger than the memory budget. Shaders look their layer up by tex id
+    in layer_by_id, so game objects keep using texture ids. Layers of earlier levels stay
+    resident for reuse until the budget needs their slots
+    """
+    def __init__(self, textures, memory_budget=TEXTURE_MEMORY_BUDGET):
+        self.textures = textures
+        self.width, self.height, self.num_ids = textures.size
+        self.layer_nbytes = self.width * self.height * 4
+        # a full mip chain adds a third on top of the base level
+        self.max_layers = min(self.num_ids, memory_budget // (self.layer_nbytes * 4 // 3))
+        #
+        self.texture_array = None
+        self.capacity = 0
+        # slot of every tex id, -1 when not resident
+        self.slot_by_id = np.full(self.num_ids, -1, dtype='int32')
+        self.id_by_slot = []
+        # level number of the last level that used a slot
+        self.last_use = []
+        self.num_level = 0
+        self.level_stats = []
+
+    @property
+    def layer_by_id(self):
+        # non-resident ids sample slot 0 rather than an undefined layer
+        return np.maximum(self.slot_by_id, 0)
+
+    @staticmethod
+    def get_level_tex_ids(level_map):
+        grid = level_map.grid
+        tex_ids = set(np.unique(np.concatenate(
+            [grid.wall.ravel(), grid.floor.ravel(), grid.ceil.ravel()]
+        )).tolist())
+        tex_ids.discard(-1)
+        #
+        tex_ids.update(door.tex_id for door in level_map.door_map.values())
+        tex_ids.update(item.tex_id for item in level_map.item_map.values())
+        # every animation frame of the npcs and the items they drop
+        pool = level_map.npc_pool
+        for npc_id in set(pool.npc_id[:pool.num_npcs].tolist()):
+            settings = NPC_SETTINGS[npc_id]
+            for state, tex_id in settings['state_tex_id'].items():
+                tex_ids.update(range(tex_id, tex_id + settings['num_frames'][state]))
+            if settings['drop_item'] is not None:
+                tex_ids.add(settings['drop_item'])
+        return tex_ids | GLOBAL_TEX_IDS
+
+    def load_level(self, level_map):
+        tex_ids = self.get_level_tex_ids(level_map)
+        num_uploaded = self.make_resident(tex_ids)
+        #
+        stats = {
+            'level': self.num_level,
+            'used_layers': len(tex_ids),
+            'resident_layers': len(self.id_by_slot),
+            'uploaded_layers': num_uploaded,
+            'memory': self.get_memory_size(),
+        }
+        self.level_stats.append(stats)
+        self.num_level += 1
+        print(f'Texture layers: {stats["used_layers"]} used, {stats["resident_layers"]} '
+              f'resident, {num_uploaded} uploaded, {stats["memory"] / 2 ** 20:.1f} MiB')
+        return stats
+
+    def make_resident(self, tex_ids):
+        tex_ids = sorted(set(tex_ids))
+        if len(tex_ids) > self.max_layers:
+            raise ValueError(
+                f'{len(tex_ids)} texture layers do not fit the {self.max_layers} layer budget'
+            )
+        missing = [tex_id for tex_id in tex_ids if self.slot_by_id[tex_id] == -1]
+        for tex_id in tex_ids:
+            if self.slot_by_id[tex_id] != -1:
+                self.last_use[self.slot_by_id[tex_id]] = self.num_level
+
+        # grow the array up to the budget, then reuse the least recently used slots
+        num_free = self.capacity - len(self.id_by_slot)
+        if len(missing) > num_free and self.capacity < self.max_layers:
+            self.grow(min(self.max_layers, len(self.id_by_slot) + len(missing)))
+        slots = list(range(len(self.id_by_slot), self.capacity))[:len(missing)]
+        if len(slots) < len(missing):
+            slots += self.evict(len(missing) - len(slots))
+
+        for tex_id, slot in zip(missing, slots):
+            if slot == len(self.id_by_slot):
+                self.id_by_slot.append(tex_id)
+                self.last_use.append(self.num_level)
+            else:
+                self.id_by_slot[slot] = tex_id
+                self.last_use[slot] = self.num_level
+            self.slot_by_id[tex_id] = slot
+            self.write_layer(tex_id, slot)
+        if missing:
+            self.textures.build_mipmaps(self.texture_array)
+        return len(missing)
+
+    def evict(self, num_slots):
+        # slots of layers the current level doesn't use, least recently used first
+        slots = [
+            slot for slot in range(len(self.id_by_slot)) if self.last_use[slot] < self.num_level
+        ]
+        slots = sorted(slots, key=lambda slot: self.last_use[slot])[:num_slots]
+        for slot in slots:
+            self.slot_by_id[self.id_by_slot[slot]] = -1
+        return slots
+
+    def grow(self, capacity):
+        # a texture array can't be resized, so upload the resident layers to a larger one
+        old_texture_array = self.texture_array
+        self.capacity = capacity
+        self.texture_array = self.textures.get_texture_array(
+            (self.width, self.height, capacity), data=None
+        )
+        self.texture_array.use(location=TEXTURE_UNIT_0)
+        for slot, tex_id in enumerate(self.id_by_slot):
+            self.write_layer(tex_id, slot)
+        if old_texture_array is not None:
+            old_texture_array.release()
+
+    def write_layer(self, tex_id, slot):
+        start = tex_id * self.layer_nbytes
+        self.texture_array.write(
+            self.textures.data[start: start + self.layer_nbytes],
+            viewport=(0, 0, slot, self.width, self.height, 1)
+        )
+
+    def get_memory_size(self):
+        # bytes of the texture array with its mip chain
+        return self.capacity * self.layer_nbytes * 4 // 3
+
+    def release(self):
+        if self.texture_array is not None:
+            self.texture_array.release()
@@ -1,6 +1,8 @@
 import moderngl as mgl
 from settings import *
 from texture_builder import TextureArrayBuilder
+from texture_cache import TextureArrayCache
+from texture_residency import TextureResidency
 
 
 class Textures:
@@ -8,27 +10,54 @@ class Textures:
         self.eng = eng
         self.ctx = eng.ctx
 
-        # build texture arrays
-        TextureArrayBuilder(should_build=True)
-
-        # load textures
-        self.texture_array = self.load('texture_array/texture_array.png')
-
-        # assign texture unit
-        self.texture_array.use(location=TEXTURE_UNIT_0)
-
-    def load(self, file_path):
-        texture = pg.image.load(f'assets/{file_path}')
+        # texture array layers from the cache, built from the textures on a miss
+        cache = TextureArrayCache(TextureArrayBuilder.get_texture_paths())
+        cached = cache.load()
+        if cached is None:
+            layers = TextureArrayBuilder(should_build=True).layers
+            self.size, self.data = self.get_array_layer_data(layers)
+            cache.save(self.size, self.data)
+        else:
+            self.size, self.data = cached
+
+        # layers go to the gpu as levels need them, on texture unit 0
+        self.residency = TextureResidency(self)
+
+    @property
+    def texture_array(self):
+        return self.residency.texture_array
+
+    @property
+    def layer_by_id(self):
+        return self.residency.layer_by_id
+
+    def load_level(self, level_map):
+        return self.residency.load_level(level_map)
+
+    @staticmethod
+    def get_layer_data(texture):
+        # layers stacked top to bottom in a surface, as flipped rgba bytes
         texture = pg.transform.flip(texture, flip_x=True, flip_y=False)
 
         num_layers = texture.get_height() // texture.get_width()
-        texture = self.eng.ctx.texture_array(
-            size=(texture.get_width(), texture.get_height() // num_layers, num_layers),
-            components=4,
-            data=pg.image.tostring(texture, 'RGBA', False)
-        )
+        size = texture.get_width(), texture.get_height() // num_layers, num_layers
+        return size, pg.image.tostring(texture, 'RGBA', False)
+
+    @staticmethod
+    def get_array_layer_data(layers):
+        # (layers, height, width, 4) rgba array, flipped like the surfaces
+        num_layers, height, width = layers.shape[:3]
+        return (width, height, num_layers), layers[:, :, ::-1].tobytes()
+
+    def get_texture_array(self, size, data=None):
+        texture = self.eng.ctx.texture_array(size=size, components=4, data=data)
 
         texture.anisotropy = 32.0
+        self.build_mipmaps(texture)
+        return texture
+
+    @staticmethod
+    def build_mipmaps(texture):
+        # build_mipmaps switches the filter to linear, set it back after every rebuild
         texture.build_mipmaps()
         texture.filter = (mgl.NEAREST, mgl.NEAREST)
-        return texture
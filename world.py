@@ -0,0 +1,19 @@
+from game_objects.weapon import Weapon
+
+
+class World:
+    """
+    What a level simulates every tick besides the player, without gl: the doors, the npcs
+    and the weapon, whose shot animation decides when the player can fire again. The
+    rendered and the headless engine both step it, Scene only draws it
+    """
+    def __init__(self, eng):
+        self.eng = eng
+        self.doors = eng.level_map.door_map.values()
+        self.weapon = Weapon(eng)
+
+    def update(self):
+        for door in self.doors:
+            door.update()
+        self.eng.level_map.npc_pool.update()
+        self.weapon.update()